@@ -1 +1,7 @@
-admin.site.register(Note)
\ No newline at end of file
+from django.contrib import admin
+from .models import Note, NoteStats, PermanentToken, SyncJob
+
+admin.site.register(Note)
+admin.site.register(NoteStats)
+admin.site.register(PermanentToken)
+admin.site.register(SyncJob)
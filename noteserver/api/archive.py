@@ -0,0 +1,168 @@
+# journal/archive.py
+# Выгрузка и загрузка журнала в NDJSON (одна заметка — одна строка JSON).
+# И экспорт, и импорт идут порциями: память не зависит от числа заметок.
+import gzip
+import json
+import os
+import sys
+import uuid
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import router, transaction
+
+from .models import Note
+from .renderers import dumps
+from .search import index_notes
+from .serializers import NoteRowMapper
+from .stats import update_stats
+from .sync import SYNC_UPDATE_FIELDS, _chunks, notify_notes_changed, now_ms
+from .tombstones import forget_deletions
+
+# Автор — по имени пользователя: id в другой базе может не совпасть
+EXPORT_FIELDS = ['id', 'author_username', 'author_name', 'subject', 'text',
+                 'created_at', 'updated_at', 'uploaded_at', 'version']
+
+
+# ====== Экспорт =======
+def export_queryset(author=None, since=None):
+    queryset = Note.objects.order_by('updated_at', 'id')
+    if author is not None:
+        queryset = queryset.filter(author=author)
+    if since is not None:
+        queryset = queryset.filter(updated_at__gt=since)
+    return queryset
+
+
+def export_lines(queryset, chunk_size=None):
+    # Серверный курсор (.iterator) — строки читаются из БД порциями по chunk_size
+    mapper = NoteRowMapper(EXPORT_FIELDS)
+    rows = mapper.rows(queryset).iterator(chunk_size=chunk_size or settings.NOTES_EXPORT_CHUNK_SIZE)
+    for row in rows:
+        yield dumps(mapper.to_dict(row)) + b'\n'
+
+
+def open_output(path, compress=None):
+    # "-" — stdout; .gz (или compress=True) — gzip
+    if compress is None:
+        compress = path.endswith('.gz')
+    if path == '-':
+        return gzip.GzipFile(fileobj=sys.stdout.buffer, mode='wb') if compress else sys.stdout.buffer
+    return gzip.open(path, 'wb') if compress else open(path, 'wb')
+
+
+# ====== Импорт =======
+def open_input(path):
+    if path == '-':
+        return sys.stdin.buffer
+    with open(path, 'rb') as f:
+        magic = f.read(2)
+    return gzip.open(path, 'rb') if magic == b'\x1f\x8b' else open(path, 'rb')
+
+
+def read_checkpoint(path):
+    if not path or not os.path.exists(path):
+        return 0
+    with open(path) as f:
+        return json.load(f)['line']
+
+
+def write_checkpoint(path, line):
+    # Через временный файл: оборванная запись не должна испортить checkpoint
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump({"line": line}, f)
+    os.replace(tmp, path)
+
+
+def _resolve_authors(usernames, authors):
+    # authors — кэш username -> id на весь импорт; недостающих догружаем одним запросом
+    missing = usernames - authors.keys()
+    if missing:
+        authors.update(User.objects.filter(username__in=missing).values_list('username', 'id'))
+        # Неизвестных пользователей запоминаем тоже — второй раз не ищем
+        authors.update({username: None for username in missing - authors.keys()})
+
+
+def _build(records, authors):
+    # Повтор id в порции — побеждает последняя строка, как в build_notes: одна строка на id
+    # в INSERT ... ON CONFLICT (PostgreSQL иначе падает, SQLite — считает заметку дважды)
+    latest = {}
+    for data in records:
+        note_uuid = uuid.UUID(str(data['id']))
+        latest.pop(note_uuid, None)
+        latest[note_uuid] = data
+
+    notes = []
+    for note_uuid, data in latest.items():
+        author_id = authors.get(data.get('author_username'))
+        if author_id is None:
+            continue
+        notes.append(Note(
+            id=note_uuid,
+            author_id=author_id,
+            author_name=data.get('author_name', ''),
+            subject=data.get('subject', ''),
+            text=data.get('text', ''),
+            text_length=len(data.get('text', '')),
+            created_at=data['created_at'],
+            updated_at=data['updated_at'],
+            uploaded_at=data['uploaded_at'],
+            version=data.get('version', 1),
+        ))
+    return notes
+
+
+def import_lines(lines, chunk_size=None, start=0, on_chunk=None):
+    """
+    Загружает заметки из NDJSON порциями: каждая порция — одна транзакция с bulk_create,
+    существующие заметки (по id) перезаписываются. start — сколько строк пропустить (checkpoint),
+    on_chunk(line) вызывается после коммита порции. Возвращает (загружено, пропущено).
+    """
+    chunk_size = chunk_size or settings.NOTES_EXPORT_CHUNK_SIZE
+    db = router.db_for_write(Note)
+    authors = {}
+    imported = skipped = 0
+    line_no = 0
+    records = []
+
+    def flush():
+        nonlocal imported, skipped
+        _resolve_authors({data.get('author_username') for data in records}, authors)
+        notes = _build(records, authors)
+        with transaction.atomic(using=db):
+            # Прежние версии перезаписываемых заметок уходят из сводки, новые — приходят
+            previous = []
+            for chunk in _chunks(notes, settings.NOTES_SYNC_BATCH_SIZE):
+                previous.extend(Note.objects.using(db).filter(id__in=[note.id for note in chunk])
+                                .values_list('author_id', 'subject', 'text_length', 'updated_at'))
+            Note.objects.using(db).bulk_create(
+                notes, batch_size=settings.NOTES_SYNC_BATCH_SIZE,
+                update_conflicts=True, unique_fields=['id'],
+                update_fields=['author', *SYNC_UPDATE_FIELDS, 'version'],
+            )
+            for chunk in _chunks(notes, settings.NOTES_SYNC_BATCH_SIZE):
+                forget_deletions([note.id for note in chunk], using=db)
+                index_notes(chunk, using=db)
+            if notes:
+                update_stats(
+                    removed=previous,
+                    added=[(note.author_id, note.subject, note.text_length, note.updated_at) for note in notes],
+                    using=db,
+                )
+                notify_notes_changed("import", now_ms(), using=db)
+        imported += len(notes)
+        skipped += len(records) - len(notes)
+        records.clear()
+        if on_chunk is not None:
+            on_chunk(line_no)
+
+    for line_no, line in enumerate(lines, start=1):
+        if line_no <= start or not line.strip():
+            continue
+        records.append(json.loads(line))
+        if len(records) == chunk_size:
+            flush()
+    if records:
+        flush()
+    return imported, skipped
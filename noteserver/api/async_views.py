@@ -0,0 +1,165 @@
+# journal/async_views.py
+# Async-версии SyncNotesView и UpdatesView для ASGI (включаются NOTES_ASYNC_VIEWS, см. urls.py).
+# Чтения идут через async ORM (aget, afirst, async for), кэш — через aget/aset (или одним
+# переходом в поток для многошаговых операций), медленный клиент не держит поток.
+# Ответы, коды ошибок, лимиты и права — те же, что у DRF-вьюх из views.py.
+import json
+
+from asgiref.sync import sync_to_async
+from django.db import router
+from django.http import HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework.exceptions import APIException, AuthenticationFailed, NotAuthenticated, ParseError
+
+from .authentication import PermanentTokenAuthentication
+from .feed import apaginate, astream_notes, feed_queryset, parse_feed_params
+from .models import Note
+from .permissions import IsNotStudent
+from .renderers import dumps
+from .roles import STUDENTS, ahas_role
+from .serializers import NoteRowMapper
+from .subscriptions import aget_subscription, subscription_filter
+from .sync import now_ms
+from .throttling import acheck_throttles
+from .tombstones import alist_deletions, needs_full_resync
+from .views import sync_notes_response, wants_ack, wants_async
+from . import idempotency, watermark
+
+
+def _json(data, status=200):
+    return HttpResponse(dumps(data), status=status, content_type='application/json')
+
+
+def _error_response(exc, status=None):
+    # Тело и Retry-After — как у exception_handler DRF
+    data = exc.detail if isinstance(exc.detail, (list, dict)) else {"detail": exc.detail}
+    response = _json(data, status=status or exc.status_code)
+    if getattr(exc, 'wait', None):
+        response['Retry-After'] = '%d' % exc.wait
+    return response
+
+
+async def _authenticate(request):
+    # У PermanentTokenAuthentication нет WWW-Authenticate, поэтому APIView отвечает 403, а не 401
+    try:
+        result = await PermanentTokenAuthentication().aauthenticate(request)
+    except AuthenticationFailed as e:
+        return None, _error_response(e, status=403)
+    if result is None:
+        return None, _error_response(NotAuthenticated(), status=403)
+    # Для UserBucketThrottle
+    request.user = result[0]
+    return result[0], None
+
+
+def _load_json(request):
+    # Как JSONParser DRF: пустое тело — пустой словарь
+    if not request.body:
+        return {}
+    try:
+        return json.loads(request.body)
+    except ValueError as e:
+        raise ParseError(f'JSON parse error - {e}')
+
+
+@csrf_exempt
+@require_POST
+async def sync_notes(request):
+    user, error = await _authenticate(request)
+    if error:
+        return error
+    if await ahas_role(user, STUDENTS):
+        return _json(IsNotStudent.message, status=403)
+
+    try:
+        await acheck_throttles(request, 'sync')
+        data = _load_json(request)
+    except APIException as e:
+        return _error_response(e)
+    notes = data.get("notes", []) if isinstance(data, dict) else []
+    if not isinstance(notes, list):
+        notes = []
+    try:
+        key = idempotency.request_key(request)
+    except ValueError as e:
+        return _json({"error": str(e)}, status=400)
+    ack, queued = wants_ack(request), wants_async(request)
+
+    if key is not None:
+        digest = idempotency.request_digest(notes, ack, queued)
+        replay = await idempotency.abegin(user, key, digest)
+        if replay is not None:
+            return replay
+    try:
+        # Запись — одна транзакция с select_for_update, а async ORM транзакций не умеет:
+        # квота, очередь или пакетная запись уходят в поток одним переходом
+        body, code = await sync_to_async(sync_notes_response)(user, notes, ack, queued)
+    except Exception as e:
+        if key is not None:
+            await idempotency.aabort(user, key)
+        if isinstance(e, APIException):
+            return _error_response(e)
+        raise
+
+    if key is not None:
+        return await idempotency.afinish(user, key, digest, body, code)
+    return _json(body, status=code)
+
+
+@require_GET
+async def updates(request):
+    user, error = await _authenticate(request)
+    if error:
+        return error
+    try:
+        await acheck_throttles(request, 'updates')
+    except APIException as e:
+        return _error_response(e)
+
+    try:
+        since, deleted_since, cursor, deleted_cursor, limit, fields = parse_feed_params(request.GET)
+    except ValueError:
+        return _json({"error": "Invalid since, cursor, limit or fields"}, status=400)
+
+    mark = await watermark.acurrent()
+    etag = watermark.feed_etag(user.pk, request.get_full_path(), mark)
+    if not needs_full_resync(deleted_since, now_ms()):
+        not_modified = watermark.not_modified(request, etag, mark)
+        if not_modified is not None:
+            return not_modified
+    watermark.pin_if_recent(mark)
+
+    # Поток читается после PrimaryPinMiddleware — базу выбираем здесь
+    queryset = Note.objects.using(router.db_for_read(Note))
+    scoped = False
+    if request.GET.get("scope") != "all":
+        subjects, authors = await aget_subscription(user)
+        if subjects or authors:
+            queryset = queryset.filter(subscription_filter(subjects, authors))
+            scoped = True
+
+    notes = feed_queryset(queryset, since, cursor)
+    mapper = NoteRowMapper(fields)
+    server_time = now_ms()
+
+    head = {
+        "success": True,
+        "serverTime": server_time,
+        "scoped": scoped,
+    }
+    if cursor is None or deleted_cursor is not None:
+        head["deleted"], head["deleted_cursor"] = await alist_deletions(deleted_since, deleted_cursor)
+    if cursor is None:
+        head["fullResyncRequired"] = needs_full_resync(deleted_since, server_time)
+
+    if limit is None or request.GET.get("stream") == "1":
+        return watermark.set_validators(astream_notes(notes, head, mapper, limit), etag, server_time)
+
+    page, next_cursor = await apaginate(notes, limit, mapper)
+    response = _json({
+        **head,
+        "notes": page,
+        "next_cursor": next_cursor,
+    })
+    return watermark.set_validators(response, etag, server_time)
@@ -1,27 +1,88 @@
 # journal/authentication.py
+from django.db import router
 from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
 from .models import PermanentToken
+from . import token_cache
+from .routers import apin_if_recent_writer, pin_if_recent_writer, replica_enabled
+
+
+def load_token_user(token):
+    tokens = PermanentToken.objects.select_related('user')
+    try:
+        user = tokens.get(token=token).user
+    except PermanentToken.DoesNotExist:
+        if not replica_enabled():
+            raise
+    else:
+        if not pin_if_recent_writer(user.pk):
+            return user
+    # Реплика могла отстать: токен только что выдан или уже сброшен (reset-token) — сверяемся с default
+    return tokens.using(router.db_for_write(PermanentToken)).get(token=token).user
+
+
+async def aload_token_user(token):
+    tokens = PermanentToken.objects.select_related('user')
+    try:
+        user = (await tokens.aget(token=token)).user
+    except PermanentToken.DoesNotExist:
+        if not replica_enabled():
+            raise
+    else:
+        if not await apin_if_recent_writer(user.pk):
+            return user
+    return (await tokens.using(router.db_for_write(PermanentToken)).aget(token=token)).user
+
+
+def header_token(request):
+    # Формат: "Bearer <token>" или просто "<token>"; None — заголовка нет
+    auth_header = request.headers.get('Authorization')
+    if not auth_header:
+        return None
+    if auth_header.startswith('Bearer '):
+        return auth_header.split(' ')[1]
+    return auth_header
 
 
 class PermanentTokenAuthentication(BaseAuthentication):
     def authenticate(self, request):
-        auth_header = request.headers.get('Authorization')
-
-        if not auth_header:
+        token = header_token(request)
+        if token is None:
             return None
 
         try:
-            # Формат: "Bearer <token>" или просто "<token>"
-            if auth_header.startswith('Bearer '):
-                token = auth_header.split(' ')[1]
+            # Обычно пользователь берётся из кэша — без запросов к БД
+            user = token_cache.get_user(token)
+            if user is None:
+                # Метку недавней записи load_token_user проверяет сам
+                user = load_token_user(token)
+                token_cache.set_user(token, user)
             else:
-                token = auth_header
+                # Недавно писал — до конца запроса читаем с default (read-your-writes)
+                pin_if_recent_writer(user.pk)
+            return (user, None)
 
-            permanent_token = PermanentToken.objects.get(token=token)
-            return (permanent_token.user, None)
+        except PermanentToken.DoesNotExist:
+            raise AuthenticationFailed('Invalid token')
+        except Exception as e:
+            raise AuthenticationFailed(f'Authentication error: {str(e)}')
+
+    async def aauthenticate(self, request):
+        # Для async-вьюх (ASGI): кэш — через aget/aset, промах читается через async ORM
+        token = header_token(request)
+        if token is None:
+            return None
+
+        try:
+            user = await token_cache.aget_user(token)
+            if user is None:
+                user = await aload_token_user(token)
+                await token_cache.aset_user(token, user)
+            else:
+                await apin_if_recent_writer(user.pk)
+            return (user, None)
 
         except PermanentToken.DoesNotExist:
             raise AuthenticationFailed('Invalid token')
         except Exception as e:
-            raise AuthenticationFailed(f'Authentication error: {str(e)}')
\ No newline at end of file
+            raise AuthenticationFailed(f'Authentication error: {str(e)}')
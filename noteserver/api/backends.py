@@ -0,0 +1,28 @@
+# journal/backends.py
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+
+class TokenModelBackend(ModelBackend):
+    """
+    ModelBackend, который загружает пользователя вместе с PermanentToken одним запросом:
+    после входа CustomLoginView берёт токен из user.permanenttoken без второго запроса.
+    Повторное хеширование устаревшего хеша делает check_password, как и в ModelBackend.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = (UserModel._default_manager.select_related('permanenttoken')
+                    .get(**{UserModel.USERNAME_FIELD: username}))
+        except UserModel.DoesNotExist:
+            # Хешируем впустую, чтобы время ответа не выдавало, существует ли пользователь
+            UserModel().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
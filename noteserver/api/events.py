@@ -0,0 +1,97 @@
+# journal/events.py
+# Асинхронная лента изменений (ASGI): long-poll и Server-Sent Events.
+# Соединение «паркуется» на notifier и просыпается только когда
+# SyncNotesView / DeleteNoteView закоммитили изменения.
+import math
+import time
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import AuthenticationFailed
+
+from .authentication import PermanentTokenAuthentication
+from .models import Note, NoteTombstone
+from .notifier import get_notifier
+from .renderers import dumps
+from .sync import now_ms
+
+
+async def _authenticate(request):
+    # 403, как у APIView и async_views: у PermanentTokenAuthentication нет WWW-Authenticate
+    try:
+        result = await PermanentTokenAuthentication().aauthenticate(request)
+    except AuthenticationFailed as e:
+        return None, JsonResponse({"error": str(e.detail)}, status=403)
+    if result is None:
+        return None, JsonResponse({"error": "Authentication credentials were not provided."}, status=403)
+    return result[0], None
+
+
+@require_GET
+async def poll_updates(request):
+    # GET notes/poll?since=<ms>&timeout=<s> — отвечает сразу, если есть изменения,
+    # иначе ждёт уведомления не дольше timeout
+    user, error = await _authenticate(request)
+    if error:
+        return error
+
+    try:
+        since = int(request.GET.get("since", 0))
+        timeout = float(request.GET.get("timeout", settings.NOTES_LONGPOLL_TIMEOUT))
+    except ValueError:
+        return JsonResponse({"error": "Invalid since or timeout"}, status=400)
+    # nan проходит мимо min() и повесил бы соединение
+    if not math.isfinite(timeout):
+        return JsonResponse({"error": "Invalid since or timeout"}, status=400)
+    timeout = min(max(timeout, 0), settings.NOTES_LONGPOLL_TIMEOUT)
+
+    notifier = get_notifier()
+    # Версию запоминаем до проверки БД, чтобы не пропустить изменение между ними
+    version = notifier.version
+    # Удаление не оставляет строки в Note — смотрим и надгробия
+    changed = (await Note.objects.filter(updated_at__gt=since).aexists()
+               or await NoteTombstone.objects.filter(deleted_at__gt=since).aexists())
+    if not changed:
+        changed = await notifier.wait(version, timeout) is not None
+
+    return JsonResponse({
+        "success": True,
+        "changed": changed,
+        "serverTime": now_ms(),
+    })
+
+
+def _sse(event_id, event, data):
+    return b'id: %d\nevent: %s\ndata: %s\n\n' % (event_id, event.encode(), dumps(data))
+
+
+@require_GET
+async def event_stream(request):
+    # GET notes/events — поток SSE; только под ASGI (WSGI держал бы поток на каждое соединение)
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({"error": "Event stream requires an ASGI server"}, status=501)
+
+    user, error = await _authenticate(request)
+    if error:
+        return error
+
+    notifier = get_notifier()
+
+    async def generate():
+        version = notifier.version
+        deadline = time.monotonic() + settings.NOTES_SSE_MAX_AGE
+        yield b'retry: 3000\n\n'
+        while time.monotonic() < deadline:
+            result = await notifier.wait(version, settings.NOTES_SSE_HEARTBEAT)
+            if result is None:
+                yield b': keepalive\n\n'
+                continue
+            version, event = result
+            yield _sse(version, event.get("type", "changed"), event)
+
+    response = StreamingHttpResponse(generate(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
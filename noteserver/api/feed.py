@@ -0,0 +1,141 @@
+# journal/feed.py
+import base64
+import uuid
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+
+from .renderers import dumps
+from .serializers import parse_note_fields
+
+
+# ====== Курсор (keyset-пагинация по (updated_at, id)) =======
+def encode_cursor(updated_at, note_id):
+    raw = f"{updated_at}:{note_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    # Возвращает (updated_at, id) или None; при битом курсоре — ValueError
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        updated_at, note_id = base64.urlsafe_b64decode(padded).decode().split(':', 1)
+        return int(updated_at), uuid.UUID(note_id)
+    except (TypeError, UnicodeDecodeError, ValueError):
+        raise ValueError('Invalid cursor')
+
+
+def parse_limit(value):
+    # None — лимит не задан (старый режим: вся лента целиком)
+    if value in (None, ''):
+        return None
+    limit = int(value)
+    if limit <= 0:
+        raise ValueError('Invalid limit')
+    return min(limit, settings.NOTES_FEED_MAX_LIMIT)
+
+
+def feed_queryset(queryset, since, cursor=None):
+    if cursor is not None:
+        updated_at, note_id = cursor
+        # Строгий порядок по (updated_at, id): заметки с одинаковым updated_at не теряются и не дублируются
+        queryset = queryset.filter(Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, id__gt=note_id))
+    else:
+        queryset = queryset.filter(updated_at__gt=since)
+    return queryset.order_by('updated_at', 'id')
+
+
+def parse_feed_params(params):
+    # (since, deleted_since, cursor, deleted_cursor, limit, fields) из query-параметров ленты;
+    # ошибки — ValueError
+    since = int(params.get("since", 0))
+    deleted_since = int(params.get("deleted_since", since))
+    cursor = decode_cursor(params.get("cursor"))
+    deleted_cursor = decode_cursor(params.get("deleted_cursor"))
+    limit = parse_limit(params.get("limit"))
+    fields = parse_note_fields(params.get("fields"))
+    if cursor is not None and limit is None:
+        limit = settings.NOTES_FEED_PAGE_SIZE
+    return since, deleted_since, cursor, deleted_cursor, limit, fields
+
+
+def paginate(queryset, limit, mapper):
+    # Берём на одну строку больше, чтобы понять, есть ли следующая страница
+    return _page(list(mapper.rows(queryset[:limit + 1])), limit, mapper)
+
+
+async def apaginate(queryset, limit, mapper):
+    return _page([row async for row in mapper.rows(queryset[:limit + 1])], limit, mapper)
+
+
+def _page(rows, limit, mapper):
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(*mapper.cursor_key(rows[-1]))
+    return [mapper.to_dict(row) for row in rows], next_cursor
+
+
+# ====== Потоковая выдача =======
+def stream_notes(queryset, head, mapper, limit=None):
+    """
+    Отдаёт ленту через генератор: строки читаются из БД порциями (.iterator),
+    сериализуются по одной и сразу уходят клиенту — без сборки общего списка в памяти.
+    """
+    def generate():
+        # head — остальные поля ответа ({"success", "serverTime", ...}), notes дописываем следом
+        yield dumps(head)[:-1] + b',"notes":['
+
+        rows = mapper.rows(queryset if limit is None else queryset[:limit + 1])
+        last = None
+        next_cursor = None
+        for count, row in enumerate(rows.iterator(chunk_size=settings.NOTES_FEED_CHUNK_SIZE)):
+            if limit is not None and count == limit:
+                next_cursor = encode_cursor(*mapper.cursor_key(last))
+                break
+            yield (b',' if count else b'') + dumps(mapper.to_dict(row))
+            last = row
+
+        yield b'],"next_cursor":' + dumps(next_cursor) + b'}'
+
+    return StreamingHttpResponse(generate(), content_type='application/json')
+
+
+async def _aiter_rows(queryset, chunk_size):
+    # aiterator() для values_list открывает курсор прямо в event loop (SynchronousOnlyOperation):
+    # серверный курсор .iterator() создаём лениво, а порции забираем в потоке соединения
+    rows = queryset.iterator(chunk_size=chunk_size)
+    fetch = sync_to_async(lambda: list(islice(rows, chunk_size)))
+    while True:
+        chunk = await fetch()
+        for row in chunk:
+            yield row
+        if len(chunk) < chunk_size:
+            return
+
+
+def astream_notes(queryset, head, mapper, limit=None):
+    # То же для ASGI: ожидание медленного клиента не занимает поток
+    async def generate():
+        yield dumps(head)[:-1] + b',"notes":['
+
+        rows = mapper.rows(queryset if limit is None else queryset[:limit + 1])
+        last = None
+        next_cursor = None
+        count = 0
+        async for row in _aiter_rows(rows, settings.NOTES_FEED_CHUNK_SIZE):
+            if limit is not None and count == limit:
+                next_cursor = encode_cursor(*mapper.cursor_key(last))
+                break
+            yield (b',' if count else b'') + dumps(mapper.to_dict(row))
+            last = row
+            count += 1
+
+        yield b'],"next_cursor":' + dumps(next_cursor) + b'}'
+
+    return StreamingHttpResponse(generate(), content_type='application/json')
@@ -0,0 +1,71 @@
+# journal/fields.py
+import base64
+import zlib
+
+from django.conf import settings
+from django.db import models
+
+try:
+    import zstandard
+except ImportError:  # zstandard не установлен — сжимаем zlib
+    zstandard = None
+
+# Сжатое значение: маркер + имя алгоритма + ":" + base64. \x1f не встречается в обычном тексте,
+# а если встретится в начале строки — такую строку тоже кодируем, чтобы не спутать
+MARKER = '\x1f'
+ALGORITHMS = ('zlib', 'zstd')
+
+
+def _compress(data, algorithm, level):
+    if algorithm == 'zstd':
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    return zlib.compress(data, level)
+
+
+def _decompress(data, algorithm):
+    if algorithm == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("Note text is zstd-compressed but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+def compress_text(value):
+    config = settings.NOTES_TEXT_COMPRESSION
+    if len(value) < config['THRESHOLD'] and not value.startswith(MARKER):
+        return value
+
+    algorithm = 'zstd' if config['ALGORITHM'] == 'zstd' and zstandard is not None else 'zlib'
+    packed = base64.b64encode(_compress(value.encode(), algorithm, config['LEVEL'])).decode('ascii')
+    encoded = f'{MARKER}{algorithm}:{packed}'
+    # Плохо сжимаемый текст (base64 добавляет треть) храним как есть
+    if len(encoded) >= len(value) and not value.startswith(MARKER):
+        return value
+    return encoded
+
+
+def decompress_text(value):
+    if not value or not value.startswith(MARKER):
+        return value
+    algorithm, _, packed = value[1:].partition(':')
+    if algorithm not in ALGORITHMS:
+        # Строка, записанная до CompressedTextField, просто начинается с \x1f
+        return value
+    return _decompress(base64.b64decode(packed), algorithm).decode()
+
+
+class CompressedTextField(models.TextField):
+    """
+    TextField, который хранит длинные значения (от NOTES_TEXT_COMPRESSION['THRESHOLD'] символов)
+    сжатыми. Для кода значение всегда обычная строка; старые несжатые строки читаются как есть.
+    Поиск по содержимому (icontains и т.п.) на сжатых строках не работает — для этого индекс поиска.
+    """
+
+    def from_db_value(self, value, expression, connection):
+        return decompress_text(value)
+
+    def get_prep_value(self, value):
+        value = super().get_prep_value(value)
+        if value is None:
+            return value
+        return compress_text(value)
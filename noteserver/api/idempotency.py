@@ -0,0 +1,104 @@
+# journal/idempotency.py
+# Idempotency-Key для POST notes/sync: клиент на плохой сети повторяет запрос, потеряв ответ.
+# Первый запрос с ключом выполняется и сохраняет ответ в кэше, повторы получают его копию,
+# не трогая Note. Ключи — в пространстве пользователя; digest запроса ловит повтор ключа
+# с другим телом.
+import hashlib
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+
+from .renderers import dumps
+
+HEADER = 'Idempotency-Key'
+REPLAY_HEADER = 'Idempotent-Replayed'
+
+
+def _config():
+    return settings.NOTES_IDEMPOTENCY
+
+
+def _cache():
+    return caches[_config()['CACHE_ALIAS']]
+
+
+def _key(user_id, key):
+    return f'idempotency:{user_id}:{hashlib.sha256(key.encode()).hexdigest()}'
+
+
+def _json(body, status, headers=None):
+    return HttpResponse(body, status=status, content_type='application/json', headers=headers)
+
+
+def request_key(request):
+    # Значение заголовка или None; слишком длинный или непечатный ключ — ValueError
+    key = request.headers.get(HEADER)
+    if key is None:
+        return None
+    if not key or len(key) > _config()['MAX_KEY_LENGTH'] or not key.isprintable():
+        raise ValueError(f"{HEADER} must be 1-{_config()['MAX_KEY_LENGTH']} printable characters")
+    return key
+
+
+def request_digest(notes, ack, queued):
+    # Режим ответа входит в digest: тот же ключ с ?response=ack — уже другой запрос
+    payload = json.dumps([notes, ack, queued], sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def begin(user, key, digest):
+    """
+    Захватывает ключ. None — запрос новый, его нужно выполнить и закрыть finish/abort;
+    иначе готовый ответ: копия сохранённого, 409 (первый запрос ещё идёт) или 422 (другое тело).
+    """
+    cache = _cache()
+    cache_key = _key(user.pk, key)
+    # add атомарен: из одновременных повторов выполняется только один
+    entry = None
+    for _ in range(2):
+        if cache.add(cache_key, {"digest": digest, "status": None}, _config()['LOCK_TTL']):
+            return None
+        entry = cache.get(cache_key)
+        if entry is not None:
+            break
+    if entry is None:
+        # Запись дважды истекла между add и get — считаем, что первый запрос ещё идёт
+        entry = {"digest": digest, "status": None}
+
+    if entry["digest"] != digest:
+        return _json(dumps({"error": f"{HEADER} was already used with a different request"}), 422)
+    if entry["status"] is None:
+        return _json(dumps({"error": f"A request with this {HEADER} is still in progress"}), 409,
+                     headers={'Retry-After': '1'})
+    return _json(entry["body"], entry["status"], headers={REPLAY_HEADER: 'true'})
+
+
+def finish(user, key, digest, data, status):
+    # Сохраняет ответ (уже сериализованный — повтор отдаёт байты как есть) и возвращает его
+    body = dumps(data)
+    _cache().set(_key(user.pk, key), {"digest": digest, "status": status, "body": body}, _config()['TTL'])
+    return _json(body, status)
+
+
+def abort(user, key):
+    # Запрос не дошёл до ответа (исключение, 429) — повтор с тем же ключом выполнится заново
+    _cache().delete(_key(user.pk, key))
+
+
+# ====== Для async-вьюх =======
+# begin — до четырёх обращений к кэшу: в поток одним переходом; finish/abort — по одному, aset/adelete
+async def abegin(user, key, digest):
+    return await sync_to_async(begin, thread_sensitive=False)(user, key, digest)
+
+
+async def afinish(user, key, digest, data, status):
+    body = dumps(data)
+    await _cache().aset(_key(user.pk, key), {"digest": digest, "status": status, "body": body}, _config()['TTL'])
+    return _json(body, status)
+
+
+async def aabort(user, key):
+    await _cache().adelete(_key(user.pk, key))
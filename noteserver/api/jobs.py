@@ -0,0 +1,112 @@
+# journal/jobs.py
+# Очередь асинхронной синхронизации: POST /notes/sync?mode=async кладёт пачку в SyncJob,
+# воркеры manage.py run_sync_workers применяют её тем же пакетным путём, что и обычный sync.
+import logging
+
+from django.conf import settings
+from django.db import connections, router, transaction
+
+from .models import SyncJob
+from .routers import mark_written
+from .sync import apply_sync_batch, now_ms
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_sync_job(user, raw_notes, now, ack=False):
+    # В очередь попадают только словари — остальное build_notes всё равно отбросит
+    payload = [n for n in raw_notes if isinstance(n, dict)]
+    job = SyncJob.objects.create(user=user, payload=payload, ack=ack, created_at=now)
+    # Клиент сразу опрашивает notes/sync/jobs/<id>, а потом читает ленту — до того, как реплика догонит
+    mark_written(user.pk)
+    return job
+
+
+def claim_job():
+    """Забирает самую старую ожидающую задачу и переводит её в running; None — очередь пуста."""
+    db = router.db_for_write(SyncJob)
+    skip_locked = connections[db].features.has_select_for_update_skip_locked
+
+    with transaction.atomic(using=db):
+        pending = (SyncJob.objects.using(db)
+                   .filter(status=SyncJob.PENDING, run_after__lte=now_ms())
+                   .order_by('created_at'))
+        if skip_locked:
+            # PostgreSQL: параллельные воркеры не ждут друг друга на одной строке
+            pending = pending.select_for_update(skip_locked=True)
+        job_id = pending.values_list('id', flat=True).first()
+        if job_id is None:
+            return None
+
+        # Условный UPDATE — без skip_locked (SQLite) задачу мог перехватить другой воркер
+        claimed = SyncJob.objects.using(db).filter(id=job_id, status=SyncJob.PENDING).update(
+            status=SyncJob.RUNNING, started_at=now_ms(),
+        )
+        if not claimed:
+            return None
+
+    job = SyncJob.objects.using(db).select_related('user').get(id=job_id)
+    # attempts считаем после захвата: упавший воркер тоже тратит попытку
+    job.attempts += 1
+    job.save(update_fields=['attempts'])
+    return job
+
+
+def retry_delay(attempts):
+    # Экспоненциальная пауза (мс): сбой БД или блокировка не успевают пройти за мгновенный повтор
+    config = settings.SYNC_JOBS
+    return min(config['RETRY_BACKOFF'] * 2 ** max(attempts - 1, 0), config['RETRY_BACKOFF_MAX']) * 1000
+
+
+def process_job(job):
+    try:
+        result = apply_sync_batch(job.user, job.payload, now_ms(), ack=job.ack)
+    except Exception as exc:
+        logger.exception("Sync job %s failed", job.id)
+        retry = job.attempts < settings.SYNC_JOBS['MAX_ATTEMPTS']
+        job.status = SyncJob.PENDING if retry else SyncJob.FAILED
+        job.error = str(exc)
+        job.finished_at = None if retry else now_ms()
+        if retry:
+            job.run_after = now_ms() + retry_delay(job.attempts)
+        job.save(update_fields=['status', 'error', 'finished_at', 'run_after'])
+        return job
+
+    job.status = SyncJob.DONE
+    job.result = result
+    job.error = ''
+    job.finished_at = now_ms()
+    # Пачка уже применена — тело больше не нужно
+    job.payload = []
+    job.save(update_fields=['status', 'result', 'error', 'finished_at', 'payload'])
+    return job
+
+
+def requeue_stale(now=None):
+    """
+    Задачи воркеров, умерших посреди пачки, возвращаем в очередь; исчерпавшие MAX_ATTEMPTS
+    (пачка, видимо, сама роняет воркер) — в failed, иначе они крутились бы вечно.
+    Возвращает число возвращённых в очередь.
+    """
+    now = now_ms() if now is None else now
+    horizon = now - settings.SYNC_JOBS['STALE_AFTER'] * 1000
+    stale = SyncJob.objects.filter(status=SyncJob.RUNNING, started_at__lt=horizon)
+    max_attempts = settings.SYNC_JOBS['MAX_ATTEMPTS']
+    failed = stale.filter(attempts__gte=max_attempts).update(
+        status=SyncJob.FAILED, error="Worker stopped while processing the job", finished_at=now,
+    )
+    if failed:
+        logger.error("%d stale sync jobs failed after %d attempts", failed, max_attempts)
+    return stale.filter(attempts__lt=max_attempts).update(status=SyncJob.PENDING)
+
+
+def run_pending(limit=None):
+    # Обрабатывает задачи, пока очередь не опустеет (или limit задач); возвращает число обработанных
+    processed = 0
+    while limit is None or processed < limit:
+        job = claim_job()
+        if job is None:
+            break
+        process_job(job)
+        processed += 1
+    return processed
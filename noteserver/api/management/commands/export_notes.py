@@ -0,0 +1,41 @@
+import sys
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from api.archive import export_lines, export_queryset, open_output
+
+
+class Command(BaseCommand):
+    help = "Выгружает заметки в NDJSON (или NDJSON.gz) порциями через серверный курсор"
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Путь к файлу; "-" — stdout; .gz — сжать gzip')
+        parser.add_argument('--gzip', action='store_true', help='Сжать gzip независимо от расширения')
+        parser.add_argument('--author', help='Только заметки этого пользователя (username)')
+        parser.add_argument('--since', type=int, help='Только заметки с updated_at больше (мс)')
+        parser.add_argument('--chunk-size', type=int, default=settings.NOTES_EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        author = None
+        if options['author']:
+            author = User.objects.filter(username=options['author']).first()
+            if author is None:
+                raise CommandError(f"User {options['author']} not found")
+
+        queryset = export_queryset(author=author, since=options['since'])
+        total = 0
+        output = open_output(options['output'], compress=options['gzip'] or None)
+        try:
+            for line in export_lines(queryset, chunk_size=options['chunk_size']):
+                output.write(line)
+                total += 1
+        finally:
+            # stdout не закрываем; GzipFile поверх stdout закрывается — дописывает трейлер
+            if output is sys.stdout.buffer:
+                output.flush()
+            else:
+                output.close()
+        # stdout занят данными — итог пишем в stderr
+        self.stderr.write(self.style.SUCCESS(f"Exported {total} notes"))
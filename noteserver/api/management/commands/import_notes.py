@@ -0,0 +1,46 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.archive import import_lines, open_input, read_checkpoint, write_checkpoint
+
+
+class Command(BaseCommand):
+    help = "Загружает заметки из NDJSON (или NDJSON.gz) порциями; после сбоя продолжает с checkpoint"
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help='Путь к файлу (gzip определяется автоматически); "-" — stdin')
+        parser.add_argument('--chunk-size', type=int, default=settings.NOTES_EXPORT_CHUNK_SIZE)
+        parser.add_argument('--checkpoint', help='Файл checkpoint (по умолчанию <input>.checkpoint)')
+        parser.add_argument('--restart', action='store_true', help='Игнорировать checkpoint и начать сначала')
+
+    def handle(self, *args, **options):
+        checkpoint = options['checkpoint']
+        if checkpoint is None and options['input'] != '-':
+            checkpoint = f"{options['input']}.checkpoint"
+
+        start = 0 if options['restart'] else read_checkpoint(checkpoint)
+        if start:
+            self.stdout.write(f"Resuming after line {start}")
+
+        def on_chunk(line):
+            if checkpoint:
+                write_checkpoint(checkpoint, line)
+            self.stdout.write(f"Imported up to line {line}")
+
+        source = open_input(options['input'])
+        try:
+            imported, skipped = import_lines(source, chunk_size=options['chunk_size'], start=start,
+                                             on_chunk=on_chunk)
+        finally:
+            if options['input'] != '-':
+                source.close()
+
+        # Всё загружено — checkpoint больше не нужен
+        if checkpoint and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        message = f"Imported {imported} notes"
+        if skipped:
+            message += f", skipped {skipped} with unknown authors"
+        self.stdout.write(self.style.SUCCESS(message))
@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.sync import now_ms
+from api.tombstones import DAY_MS, prune
+
+
+class Command(BaseCommand):
+    help = "Удаляет надгробия удалённых заметок старше горизонта хранения"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.NOTE_TOMBSTONE_RETENTION_DAYS,
+            help='Горизонт хранения в днях (по умолчанию NOTE_TOMBSTONE_RETENTION_DAYS)',
+        )
+
+    def handle(self, *args, **options):
+        before = now_ms() - options['days'] * DAY_MS
+        deleted = prune(before)
+        self.stdout.write(self.style.SUCCESS(f"Pruned {deleted} tombstones older than {options['days']} days"))
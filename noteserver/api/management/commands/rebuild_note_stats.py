@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api.stats import rebuild_stats
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает сводку NoteStats (автор, предмет) по всей таблице заметок"
+
+    def handle(self, *args, **options):
+        total = rebuild_stats()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {total} stats rows"))
@@ -0,0 +1,68 @@
+import multiprocessing
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from api.jobs import requeue_stale, run_pending
+
+
+def _worker(poll_interval, once):
+    # Соединения родителя нельзя делить с дочерним процессом — каждый открывает свои
+    connections.close_all()
+    requeue_interval = settings.SYNC_JOBS['REQUEUE_INTERVAL']
+    requeued_at = time.monotonic()
+    while True:
+        # Воркер мог умереть посреди пачки и после старта пула — подбираем такие задачи на ходу
+        if time.monotonic() - requeued_at >= requeue_interval:
+            requeue_stale()
+            requeued_at = time.monotonic()
+        processed = run_pending()
+        if once:
+            return
+        if not processed:
+            time.sleep(poll_interval)
+
+
+class Command(BaseCommand):
+    help = "Запускает пул процессов, применяющих асинхронные пачки /notes/sync (SyncJob)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=settings.SYNC_JOBS['PROCESSES'],
+            help='Число процессов-воркеров (по умолчанию SYNC_JOBS["PROCESSES"])',
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=settings.SYNC_JOBS['POLL_INTERVAL'],
+            help='Пауза в секундах, когда очередь пуста',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Разобрать текущую очередь и выйти',
+        )
+
+    def handle(self, *args, **options):
+        requeued = requeue_stale()
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} stale jobs")
+
+        processes = max(1, options['processes'])
+        if processes == 1:
+            _worker(options['poll_interval'], options['once'])
+            return
+
+        connections.close_all()
+        workers = [
+            multiprocessing.Process(target=_worker, args=(options['poll_interval'], options['once']))
+            for _ in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            for worker in workers:
+                worker.terminate()
+        self.stdout.write(self.style.SUCCESS(f"Sync workers stopped ({processes} processes)"))
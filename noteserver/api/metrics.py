@@ -0,0 +1,89 @@
+# journal/metrics.py
+# Гистограммы по маршрутам в памяти процесса + вывод в текстовом формате Prometheus.
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+SIZE_BUCKETS = (100, 1000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+METRICS = {
+    # имя: (описание, границы корзин)
+    'noteserver_request_duration_seconds': ("Request wall time", DURATION_BUCKETS),
+    'noteserver_db_queries': ("SQL queries per request", QUERY_BUCKETS),
+    'noteserver_db_duration_seconds': ("Time spent in SQL per request", DURATION_BUCKETS),
+    'noteserver_serialization_duration_seconds': ("Time spent rendering JSON per request", DURATION_BUCKETS),
+    'noteserver_response_size_bytes': ("Response body size (non-streaming responses)", SIZE_BUCKETS),
+}
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels):
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in labels)
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._responses = defaultdict(int)
+
+    def observe_request(self, route, method, status, values):
+        labels = (('route', route), ('method', method))
+        with self._lock:
+            self._responses[labels + (('status', status),)] += 1
+            for name, value in values.items():
+                key = (name, labels)
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = self._histograms[key] = Histogram(METRICS[name][1])
+                histogram.observe(value)
+
+    def render(self):
+        with self._lock:
+            lines = [
+                '# HELP noteserver_responses_total Responses by route, method and status',
+                '# TYPE noteserver_responses_total counter',
+            ]
+            for labels, count in sorted(self._responses.items()):
+                lines.append(f'noteserver_responses_total{{{_labels(labels)}}} {count}')
+
+            for name, (description, _) in METRICS.items():
+                lines.append(f'# HELP {name} {description}')
+                lines.append(f'# TYPE {name} histogram')
+                for (metric, labels), histogram in sorted(self._histograms.items()):
+                    if metric != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets + ('+Inf',), histogram.counts):
+                        cumulative += count
+                        bucket_labels = _labels(labels + (('le', bound),))
+                        lines.append(f'{name}_bucket{{{bucket_labels}}} {cumulative}')
+                    lines.append(f'{name}_sum{{{_labels(labels)}}} {histogram.sum}')
+                    lines.append(f'{name}_count{{{_labels(labels)}}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._responses.clear()
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,239 @@
+# journal/middleware.py
+import cProfile
+import io
+import pstats
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.http import JsonResponse
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+from rest_framework.exceptions import AuthenticationFailed
+
+try:
+    import brotli
+except ImportError:  # brotli не установлен — остаётся только gzip
+    brotli = None
+
+from .authentication import PermanentTokenAuthentication
+from .metrics import registry
+from .routers import reset_primary, use_primary
+
+re_accepts_br = _lazy_re_compile(r"\bbr\b")
+
+
+def _brotli_sequence(sequence):
+    compressor = brotli.Compressor()
+    for chunk in sequence:
+        data = compressor.process(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def _abrotli_sequence(sequence):
+    compressor = brotli.Compressor()
+    async for chunk in sequence:
+        data = compressor.process(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Сжатие ответов ленты заметок: brotli, если он установлен и клиент его принимает,
+    иначе gzip. Сжимаются только пути из COMPRESSION_PATH_PREFIXES — ответы с токенами
+    (login, register, reset-token) не сжимаем из-за BREACH.
+    """
+
+    async def __acall__(self, request):
+        # Сжатие не трогает БД: под ASGI выполняем его в event loop, без перехода в поток,
+        # который MiddlewareMixin делает для process_response
+        response = await self.get_response(request)
+        return self.process_response(request, response)
+
+    def process_response(self, request, response):
+        if not request.path.startswith(tuple(settings.COMPRESSION_PATH_PREFIXES)):
+            return response
+        # SSE не сжимаем: события должны уходить клиенту сразу
+        if response.get("Content-Type", "").startswith("text/event-stream"):
+            return response
+
+        ae = request.META.get("HTTP_ACCEPT_ENCODING", "")
+        if brotli is None or not re_accepts_br.search(ae):
+            return super().process_response(request, response)
+
+        if not response.streaming and len(response.content) < 200:
+            return response
+        if response.has_header("Content-Encoding"):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = _abrotli_sequence(response.streaming_content)
+            else:
+                response.streaming_content = _brotli_sequence(response.streaming_content)
+            del response.headers["Content-Length"]
+        else:
+            compressed_content = brotli.compress(response.content)
+            if len(compressed_content) >= len(response.content):
+                return response
+            response.content = compressed_content
+            response.headers["Content-Length"] = str(len(response.content))
+
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = "br"
+
+        return response
+
+
+# ====== Метрики и профилирование запросов =======
+class QueryRecorder:
+    def __init__(self, keep_sql=False):
+        self.keep_sql = keep_sql
+        self.count = 0
+        self.seconds = 0.0
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.seconds += elapsed
+            if self.keep_sql:
+                self.queries.append({"sql": sql, "ms": round(elapsed * 1000, 3)})
+
+
+class ProfilingMiddleware:
+    """
+    Для каждого маршрута пишет в гистограммы (api/metrics.py): время запроса, число и время
+    SQL-запросов, время рендеринга JSON и размер ответа. С ?profile=1 администратор
+    получает вместо ответа дамп cProfile и список SQL-запросов этого запроса.
+    Под ASGI (async-путь) SQL не считается: запросы идут в других потоках.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not settings.REQUEST_METRICS_ENABLED:
+            return self.get_response(request)
+
+        profiling = request.GET.get(settings.REQUEST_PROFILING_PARAM) == '1' and self._is_staff(request)
+        recorder = QueryRecorder(keep_sql=profiling)
+        profiler = cProfile.Profile() if profiling else None
+
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            if profiler:
+                profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                if profiler:
+                    profiler.disable()
+        wall = time.perf_counter() - started
+
+        self._record(request, response, wall, recorder)
+        if profiler:
+            return self._profile_response(request, response, wall, recorder, profiler)
+        return response
+
+    async def __acall__(self, request):
+        if not settings.REQUEST_METRICS_ENABLED:
+            return await self.get_response(request)
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self._record(request, response, time.perf_counter() - started, None)
+        return response
+
+    @staticmethod
+    def _is_staff(request):
+        # Профилировщик и сбор SQL включаем только администратору. Мы первые в цепочке и
+        # аутентификация DRF ещё не прошла — пользователя берём по токену сами (обычно из кэша)
+        try:
+            result = PermanentTokenAuthentication().authenticate(request)
+        except AuthenticationFailed:
+            return False
+        return result is not None and result[0].is_staff
+
+    def _record(self, request, response, wall, recorder):
+        match = getattr(request, 'resolver_match', None)
+        route = match.route if match else 'unmatched'
+        values = {
+            'noteserver_request_duration_seconds': wall,
+            'noteserver_serialization_duration_seconds': getattr(request, 'serialization_seconds', 0.0),
+        }
+        if recorder is not None:
+            values['noteserver_db_queries'] = recorder.count
+            values['noteserver_db_duration_seconds'] = recorder.seconds
+        if not response.streaming:
+            values['noteserver_response_size_bytes'] = len(response.content)
+        registry.observe_request(route, request.method, response.status_code, values)
+
+    def _profile_response(self, request, response, wall, recorder, profiler):
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(50)
+        return JsonResponse({
+            "path": request.path,
+            "status": response.status_code,
+            "wall_ms": round(wall * 1000, 3),
+            "db_ms": round(recorder.seconds * 1000, 3),
+            "serialization_ms": round(getattr(request, 'serialization_seconds', 0.0) * 1000, 3),
+            "queries": recorder.queries,
+            "profile": output.getvalue(),
+        })
+
+
+class PrimaryPinMiddleware:
+    """
+    Каждый запрос начинается с чтения с реплики: под WSGI поток переиспользуется,
+    и флаг «читать с default» от прошлого запроса не должен в него протечь.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        token = use_primary(False)
+        try:
+            return self.get_response(request)
+        finally:
+            reset_primary(token)
+
+    async def __acall__(self, request):
+        token = use_primary(False)
+        try:
+            return await self.get_response(request)
+        finally:
+            reset_primary(token)
@@ -0,0 +1,52 @@
+# Полнотекстовый индекс заметок: на PostgreSQL — таблица с tsvector и GIN-индексом,
+# на SQLite — виртуальная таблица FTS5. Индекс заполняется из приложения (api/search.py).
+
+from django.db import migrations
+
+POSTGRES_SQL = [
+    """
+    CREATE TABLE api_note_search (
+        note_id uuid PRIMARY KEY REFERENCES api_note (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,
+        document tsvector NOT NULL
+    )
+    """,
+    "CREATE INDEX api_note_search_document_idx ON api_note_search USING GIN (document)",
+]
+
+SQLITE_SQL = [
+    "CREATE VIRTUAL TABLE api_note_fts USING fts5("
+    "note_id UNINDEXED, subject, text, tokenize = 'unicode61 remove_diacritics 2')",
+]
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        for sql in POSTGRES_SQL:
+            schema_editor.execute(sql)
+    elif vendor == 'sqlite':
+        try:
+            for sql in SQLITE_SQL:
+                schema_editor.execute(sql)
+        except Exception:
+            # SQLite собран без FTS5 — поиск работает через LIKE
+            pass
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute("DROP TABLE IF EXISTS api_note_search")
+    elif vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS api_note_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_note_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:24
+
+import api.fields
+from django.conf import settings
+from django.db import migrations
+from django.db.models.functions import Length
+
+CHUNK_SIZE = 500
+
+
+def compress_existing(apps, schema_editor):
+    # Поле уже CompressedTextField: прочитать и сохранить длинные тексты — значит сжать их
+    Note = apps.get_model('api', 'Note')
+    db = schema_editor.connection.alias
+    notes = (Note.objects.using(db)
+             .annotate(size=Length('text'))
+             .filter(size__gte=settings.NOTES_TEXT_COMPRESSION['THRESHOLD'])
+             .only('id', 'text'))
+    batch = []
+    for note in notes.iterator(chunk_size=CHUNK_SIZE):
+        batch.append(note)
+        if len(batch) == CHUNK_SIZE:
+            Note.objects.using(db).bulk_update(batch, ['text'])
+            batch = []
+    if batch:
+        Note.objects.using(db).bulk_update(batch, ['text'])
+
+
+def decompress_existing(apps, schema_editor):
+    # В состоянии миграций поле здесь всё ещё CompressedTextField и сжало бы текст обратно —
+    # поэтому распаковываем сырым SQL
+    Note = apps.get_model('api', 'Note')
+    connection = schema_editor.connection
+    qn = connection.ops.quote_name
+    table, pk, text = qn(Note._meta.db_table), qn(Note._meta.pk.column), qn('text')
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT {pk}, {text} FROM {table} WHERE {text} LIKE %s", [api.fields.MARKER + '%'])
+        rows = cursor.fetchall()
+        cursor.executemany(
+            f"UPDATE {table} SET {text} = %s WHERE {pk} = %s",
+            [(api.fields.decompress_text(value), note_id) for note_id, value in rows],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_sync_jobs'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='note',
+            name='text',
+            field=api.fields.CompressedTextField(),
+        ),
+        migrations.RunPython(compress_existing, decompress_existing),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, Sum
+from django.db.models.functions import Length
+
+
+def fill_stats(apps, schema_editor):
+    # Начальное заполнение сводки по уже существующим заметкам
+    Note = apps.get_model('api', 'Note')
+    NoteStats = apps.get_model('api', 'NoteStats')
+    db = schema_editor.connection.alias
+    rows = (Note.objects.using(db).order_by().values('author_id', 'subject')
+            .annotate(note_count=Count('id'), text_size=Sum(Length('text')), last_updated_at=Max('updated_at')))
+    NoteStats.objects.using(db).bulk_create([NoteStats(**row) for row in rows], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_note_text_compression'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NoteStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.CharField(max_length=200)),
+                ('note_count', models.PositiveIntegerField(default=0)),
+                ('text_size', models.BigIntegerField(default=0)),
+                ('last_updated_at', models.BigIntegerField(blank=True, null=True)),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='note_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('author', 'subject'), name='note_stats_author_subject_uniq')],
+            },
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+    ]
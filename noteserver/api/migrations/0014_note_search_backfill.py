@@ -0,0 +1,66 @@
+# Заполняет полнотекстовый индекс (0009) заметками, созданными до него: приложение индексирует
+# только то, что синхронизируется после миграции. Текст читаем через модель — CompressedTextField
+# (0012) отдаёт его распакованным, как и index_notes.
+
+from django.conf import settings
+from django.db import migrations
+
+CHUNK_SIZE = 500
+
+
+def _table_exists(cursor, name):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = %s", [name])
+    return cursor.fetchone() is not None
+
+
+def _index_chunk(connection, cursor, vendor, notes):
+    pk = notes[0]._meta.pk
+    ids = [pk.get_db_prep_value(note.id, connection) for note in notes]
+    if vendor == 'postgresql':
+        config = settings.NOTES_SEARCH_CONFIG
+        cursor.executemany(
+            "INSERT INTO api_note_search (note_id, document) VALUES "
+            "(%s, setweight(to_tsvector(%s::regconfig, %s), 'A') || setweight(to_tsvector(%s::regconfig, %s), 'B')) "
+            "ON CONFLICT (note_id) DO UPDATE SET document = EXCLUDED.document",
+            [(note_id, config, note.subject, config, note.text) for note_id, note in zip(ids, notes)],
+        )
+    else:
+        cursor.execute(f"DELETE FROM api_note_fts WHERE note_id IN ({', '.join(['%s'] * len(ids))})", ids)
+        cursor.executemany(
+            "INSERT INTO api_note_fts (note_id, subject, text) VALUES (%s, %s, %s)",
+            [(note_id, note.subject, note.text) for note_id, note in zip(ids, notes)],
+        )
+
+
+def backfill_search_index(apps, schema_editor):
+    Note = apps.get_model('api', 'Note')
+    connection = schema_editor.connection
+    vendor = connection.vendor
+    if vendor not in ('postgresql', 'sqlite'):
+        return
+
+    with connection.cursor() as cursor:
+        # SQLite без FTS5: таблицы нет, поиск работает через LIKE
+        if vendor == 'sqlite' and not _table_exists(cursor, 'api_note_fts'):
+            return
+        batch = []
+        notes = Note.objects.using(connection.alias).only('id', 'subject', 'text').order_by()
+        for note in notes.iterator(chunk_size=CHUNK_SIZE):
+            batch.append(note)
+            if len(batch) == CHUNK_SIZE:
+                _index_chunk(connection, cursor, vendor, batch)
+                batch = []
+        if batch:
+            _index_chunk(connection, cursor, vendor, batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_note_stats'),
+    ]
+
+    operations = [
+        # Обратно — ничего: таблицы индекса удаляет откат 0009
+        migrations.RunPython(backfill_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_note_search_backfill'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='syncjob',
+            name='run_after',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
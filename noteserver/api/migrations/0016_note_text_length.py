@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:00
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Sum
+
+CHUNK_SIZE = 500
+
+
+def fill_text_length(apps, schema_editor):
+    # Длина распакованного текста: модель отдаёт его уже без сжатия (CompressedTextField)
+    Note = apps.get_model('api', 'Note')
+    db = schema_editor.connection.alias
+    batch = []
+    for note in Note.objects.using(db).only('id', 'text').iterator(chunk_size=CHUNK_SIZE):
+        note.text_length = len(note.text)
+        batch.append(note)
+        if len(batch) == CHUNK_SIZE:
+            Note.objects.using(db).bulk_update(batch, ['text_length'])
+            batch = []
+    if batch:
+        Note.objects.using(db).bulk_update(batch, ['text_length'])
+
+
+def refill_stats(apps, schema_editor):
+    # 0013 посчитала text_size по сжатому тексту — пересобираем сводку по text_length
+    Note = apps.get_model('api', 'Note')
+    NoteStats = apps.get_model('api', 'NoteStats')
+    db = schema_editor.connection.alias
+    NoteStats.objects.using(db).all().delete()
+    rows = (Note.objects.using(db).order_by().values('author_id', 'subject')
+            .annotate(note_count=Count('id'), text_size=Sum('text_length'), last_updated_at=Max('updated_at')))
+    NoteStats.objects.using(db).bulk_create([NoteStats(**row) for row in rows], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_sync_job_run_after'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='note',
+            name='text_length',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_text_length, migrations.RunPython.noop),
+        migrations.RunPython(refill_stats, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,11 @@
 # journal/models.py
-from django.db import models
+from django.db import models, router, transaction
 from django.contrib.auth.models import User
 import uuid
 import secrets
 
+from .fields import CompressedTextField
+
 
 class PermanentToken(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
@@ -19,15 +21,42 @@ class PermanentToken(models.Model):
         super().save(*args, **kwargs)
 
 
+class NoteQuerySet(models.QuerySet):
+    def delete(self):
+        # Удаление в обход API (shell, админка) ведёт тот же учёт, что и API: см. sync.delete_notes
+        from .sync import DELETE_FIELDS, delete_notes
+        db = self._db or router.db_for_write(self.model)
+        with transaction.atomic(using=db, savepoint=False):
+            rows = list(self.using(db).select_for_update().values_list(*DELETE_FIELDS))
+            deleted = delete_notes(rows, using=db)
+        return deleted, ({self.model._meta.label: deleted} if deleted else {})
+
+
 class Note(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     author = models.ForeignKey(User, on_delete=models.CASCADE)
     author_name = models.CharField(max_length=150, blank=True)
     subject = models.CharField(max_length=200)
-    text = models.TextField()
+    # Длинные тексты хранятся сжатыми (NOTES_TEXT_COMPRESSION)
+    text = CompressedTextField()
+    # Длина текста в символах (до сжатия) — для сводки NoteStats; ставят пути записи и save()
+    text_length = models.PositiveIntegerField(default=0)
     created_at = models.BigIntegerField()
     updated_at = models.BigIntegerField()
     uploaded_at = models.BigIntegerField()
+    # Серверная версия для оптимистичной блокировки при синхронизации
+    version = models.PositiveIntegerField(default=1)
+
+    objects = NoteQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Keyset-пагинация ленты /notes/updates
+            models.Index(fields=['updated_at', 'id'], name='note_updated_id_idx'),
+            # Лента по подпискам (см. FeedSubscription)
+            models.Index(fields=['subject', 'updated_at'], name='note_subject_updated_idx'),
+            models.Index(fields=['author', 'updated_at'], name='note_author_updated_idx'),
+        ]
 
     def __str__(self):
         return f"{self.subject} — {self.author.username}"
@@ -35,4 +64,89 @@ class Note(models.Model):
     def save(self, *args, **kwargs):
         if not self.author_name and self.author:
             self.author_name = self.author.username
-        super().save(*args, **kwargs)
\ No newline at end of file
+        self.text_length = len(self.text or '')
+        super().save(*args, **kwargs)
+
+    def delete(self, using=None, keep_parents=False):
+        return Note.objects.using(using or router.db_for_write(Note, instance=self)).filter(pk=self.pk).delete()
+
+
+class NoteTombstone(models.Model):
+    # След удалённой заметки: по нему клиенты узнают об удалении через ленту /notes/updates
+    id = models.UUIDField(primary_key=True)
+    author = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    deleted_at = models.BigIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['deleted_at', 'id'], name='tombstone_deleted_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.id} (deleted at {self.deleted_at})"
+
+
+
+class FeedSubscription(models.Model):
+    # На какие предметы и авторов подписано устройство: /notes/updates отдаёт только их заметки
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='feed_subscription')
+    subjects = models.JSONField(default=list, blank=True)
+    authors = models.JSONField(default=list, blank=True)  # id пользователей
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user.username}: {len(self.subjects)} subjects, {len(self.authors)} authors"
+
+
+class NoteStats(models.Model):
+    # Сводка по (автор, предмет) для /notes/stats; пересчитывается точечно из sync/удаления/импорта
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='note_stats')
+    subject = models.CharField(max_length=200)
+    note_count = models.PositiveIntegerField(default=0)
+    # Суммарная длина текста в символах (Note.text_length, без учёта сжатия)
+    text_size = models.BigIntegerField(default=0)
+    last_updated_at = models.BigIntegerField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['author', 'subject'], name='note_stats_author_subject_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.author_id} / {self.subject}: {self.note_count}"
+
+
+class SyncJob(models.Model):
+    # Пачка заметок из асинхронного POST /notes/sync; применяется воркерами run_sync_workers
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    payload = models.JSONField()
+    ack = models.BooleanField(default=False)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    created_at = models.BigIntegerField()
+    started_at = models.BigIntegerField(null=True, blank=True)
+    finished_at = models.BigIntegerField(null=True, blank=True)
+    # Не брать в работу раньше этого момента (мс): пауза перед повтором упавшей задачи
+    run_after = models.BigIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='syncjob_status_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.id} ({self.status})"
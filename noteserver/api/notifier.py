@@ -0,0 +1,89 @@
+# journal/notifier.py
+# Уведомления об изменениях заметок для long-poll / SSE.
+# Бэкенд задаётся в settings.NOTES_NOTIFIER; по умолчанию — в памяти процесса.
+import asyncio
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class BaseNotifier:
+    def publish(self, event):
+        raise NotImplementedError
+
+    @property
+    def version(self):
+        raise NotImplementedError
+
+    async def wait(self, after, timeout):
+        """Ждёт события с версией > after; возвращает (version, event) или None по таймауту."""
+        raise NotImplementedError
+
+
+def _resolve(future, value):
+    if not future.done():
+        future.set_result(value)
+
+
+class InProcessNotifier(BaseNotifier):
+    """
+    Счётчик версий + список ожидающих future. publish() вызывается из синхронных
+    view (в потоке), поэтому будим ожидающих через loop.call_soon_threadsafe.
+    Работает в пределах одного процесса: для нескольких воркеров нужен общий бэкенд.
+    """
+
+    def __init__(self, **options):
+        self._lock = threading.Lock()
+        self._version = 0
+        self._last_event = None
+        self._waiters = set()
+
+    @property
+    def version(self):
+        return self._version
+
+    def publish(self, event):
+        with self._lock:
+            self._version += 1
+            self._last_event = event
+            value = (self._version, event)
+            waiters = list(self._waiters)
+            self._waiters.clear()
+
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(_resolve, future, value)
+            except RuntimeError:  # цикл событий уже закрыт
+                pass
+
+    async def wait(self, after, timeout):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        waiter = (loop, future)
+        with self._lock:
+            if self._version > after:
+                return self._version, self._last_event
+            self._waiters.add(waiter)
+
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            with self._lock:
+                self._waiters.discard(waiter)
+
+
+_notifier = None
+_notifier_lock = threading.Lock()
+
+
+def get_notifier():
+    global _notifier
+    if _notifier is None:
+        with _notifier_lock:
+            if _notifier is None:
+                config = settings.NOTES_NOTIFIER
+                _notifier = import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
+    return _notifier
@@ -0,0 +1,51 @@
+# journal/passwords.py
+# Проверка пароля — дорогой по CPU/памяти хеш. Одновременно считается не больше
+# LOGIN_HASH_WORKERS хешей, ждут или считаются не больше LOGIN_MAX_PENDING входов,
+# остальные получают отказ (PasswordCheckBusy), прождав не дольше LOGIN_QUEUE_TIMEOUT.
+# Хеш считается в потоке запроса: переход в другой поток в sync-вьюхе ничего не даёт,
+# а запросы входа уходили бы из потока запроса (и из метрик ProfilingMiddleware).
+import threading
+
+from django.conf import settings
+from django.contrib.auth import authenticate
+
+_slots = None
+_hashing = None
+_lock = threading.Lock()
+
+
+class PasswordCheckBusy(Exception):
+    pass
+
+
+def _limits():
+    # (места в очереди, одновременные хеши)
+    global _slots, _hashing
+    if _slots is None:
+        with _lock:
+            if _slots is None:
+                _hashing = threading.BoundedSemaphore(settings.LOGIN_HASH_WORKERS)
+                _slots = threading.BoundedSemaphore(settings.LOGIN_MAX_PENDING)
+    return _slots, _hashing
+
+
+def _acquire_slot():
+    slots, _ = _limits()
+    if not slots.acquire(timeout=settings.LOGIN_QUEUE_TIMEOUT):
+        raise PasswordCheckBusy()
+    return slots
+
+
+def check_credentials(request, username, password):
+    """Пользователь или None; PasswordCheckBusy — очередь переполнена или хеши заняты слишком долго."""
+    slots = _acquire_slot()
+    try:
+        hashing = _limits()[1]
+        if not hashing.acquire(timeout=settings.LOGIN_QUEUE_TIMEOUT):
+            raise PasswordCheckBusy()
+        try:
+            return authenticate(request, username=username, password=password)
+        finally:
+            hashing.release()
+    finally:
+        slots.release()
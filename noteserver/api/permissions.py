@@ -0,0 +1,18 @@
+# journal/permissions.py
+from rest_framework.permissions import BasePermission
+
+from .roles import STUDENTS, TEACHERS, has_role
+
+
+class IsTeacher(BasePermission):
+    message = {"error": "You do not have permission to perform this action"}
+
+    def has_permission(self, request, view):
+        return has_role(request.user, TEACHERS)
+
+
+class IsNotStudent(BasePermission):
+    message = {"error": "Forbidden: Students cannot sync notes to server"}
+
+    def has_permission(self, request, view):
+        return not has_role(request.user, STUDENTS)
@@ -0,0 +1,54 @@
+# journal/renderers.py
+import json
+import time
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # orjson не установлен — работаем через стандартный json
+    orjson = None
+
+_encoder = JSONEncoder()
+
+
+def dumps(data):
+    # Компактный JSON в байтах; формат совпадает с JSONRenderer DRF
+    if orjson is not None:
+        try:
+            return orjson.dumps(data, default=_encoder.default)
+        except (TypeError, orjson.JSONEncodeError):
+            pass
+    return json.dumps(data, cls=JSONEncoder, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        renderer_context = renderer_context or {}
+        started = time.perf_counter()
+        if data is None:
+            body = b''
+        elif self.get_indent(accepted_media_type or '', renderer_context):
+            # С отступами (application/json; indent=4) — обычный рендерер DRF
+            body = super().render(data, accepted_media_type, renderer_context)
+        else:
+            body = dumps(data)
+
+        # Время сериализации — для ProfilingMiddleware
+        request = renderer_context.get('request')
+        if request is not None:
+            django_request = request._request
+            django_request.serialization_seconds = (
+                getattr(django_request, 'serialization_seconds', 0.0) + time.perf_counter() - started
+            )
+        return body
+
+
+class PrometheusRenderer(BaseRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return data.encode(self.charset) if isinstance(data, str) else dumps(data)
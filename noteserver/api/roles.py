@@ -0,0 +1,64 @@
+# journal/roles.py
+# Роли пользователя (= имена групп). Загружаются один раз и хранятся
+# на объекте пользователя и в общем кэше; сбрасываются сигналами m2m_changed.
+from django.conf import settings
+from django.core.cache import cache
+
+from . import token_cache
+from .routers import mark_written
+
+TEACHERS = 'teachers'
+STUDENTS = 'students'
+
+
+def _key(user_id):
+    return f'auth:roles:{user_id}'
+
+
+def get_roles(user):
+    if not user or not user.is_authenticated:
+        return ()
+
+    roles = getattr(user, '_roles', None)
+    if roles is None:
+        roles = cache.get(_key(user.pk))
+        if roles is None:
+            roles = tuple(user.groups.values_list('name', flat=True))
+            cache.set(_key(user.pk), roles, settings.ROLE_CACHE_TTL)
+        user._roles = roles
+    return roles
+
+
+async def aget_roles(user):
+    # То же для async-вьюх: кэш — через aget/aset, группы — через async ORM
+    if not user or not user.is_authenticated:
+        return ()
+
+    roles = getattr(user, '_roles', None)
+    if roles is None:
+        roles = await cache.aget(_key(user.pk))
+        if roles is None:
+            roles = tuple([name async for name in user.groups.values_list('name', flat=True)])
+            await cache.aset(_key(user.pk), roles, settings.ROLE_CACHE_TTL)
+        user._roles = roles
+    return roles
+
+
+def has_role(user, role):
+    return role in get_roles(user)
+
+
+async def ahas_role(user, role):
+    return role in await aget_roles(user)
+
+
+def invalidate_roles(user_ids):
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    cache.delete_many([_key(user_id) for user_id in user_ids])
+    # Закэшированные объекты пользователей несут роли в атрибуте _roles
+    token_cache.invalidate_users(user_ids)
+    # Роли перечитаем с default: реплика ещё может отдать старые группы
+    for user_id in user_ids:
+        mark_written(user_id)
@@ -0,0 +1,71 @@
+# journal/routers.py
+# Чтение — с реплики (алиас REPLICA_DATABASE), запись — в default.
+# Read-your-writes: после записи пользователь на DATABASE_REPLICA_STICKY_SECONDS
+# «прилипает» к default — метка в кэше, проверяется при аутентификации.
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_DATABASE = 'replica'
+
+# True — до конца запроса читаем с default (сбрасывает PrimaryPinMiddleware)
+_use_primary = ContextVar('use_primary', default=False)
+
+
+def replica_enabled():
+    return REPLICA_DATABASE in settings.DATABASES
+
+
+def _key(user_id):
+    return f'db:primary:{user_id}'
+
+
+def use_primary(flag=True):
+    return _use_primary.set(flag)
+
+
+def reset_primary(token):
+    _use_primary.reset(token)
+
+
+def mark_written(user_id):
+    # Пользователь только что писал: его чтения идут в default, пока реплика догоняет
+    if not replica_enabled():
+        return
+    _use_primary.set(True)
+    cache.set(_key(user_id), True, settings.DATABASE_REPLICA_STICKY_SECONDS)
+
+
+def pin_if_recent_writer(user_id):
+    # True — пользователь недавно писал, и чтения этого запроса уже переключены на default
+    if replica_enabled() and cache.get(_key(user_id)):
+        _use_primary.set(True)
+        return True
+    return False
+
+
+async def apin_if_recent_writer(user_id):
+    # То же для async-вьюх: флаг ставится в контексте корутины, кэш читается без блокировки цикла
+    if replica_enabled() and await cache.aget(_key(user_id)):
+        _use_primary.set(True)
+        return True
+    return False
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not replica_enabled() or _use_primary.get():
+            return DEFAULT_DB_ALIAS
+        # Внутри транзакции читаем то же, что пишем
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return REPLICA_DATABASE
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплика — копия default, связи между ними допустимы
+        return True
@@ -0,0 +1,170 @@
+# journal/search.py
+# Полнотекстовый поиск по subject и text.
+#   PostgreSQL: api_note_search (tsvector + GIN), ранжирование ts_rank;
+#   SQLite:     api_note_fts (FTS5), ранжирование bm25;
+#   прочие БД:  icontains без ранжирования.
+# Индекс обновляется из приложения при sync/save/delete (см. index_notes/unindex_notes),
+# поэтому в него всегда попадает исходный текст заметки.
+import re
+
+from django.conf import settings
+from django.db import connections, router
+from django.db.models import Q
+
+from .models import Note
+
+POSTGRES_TABLE = 'api_note_search'
+SQLITE_TABLE = 'api_note_fts'
+NOTE_TABLE = Note._meta.db_table
+
+_fts_available = {}
+
+
+def _connection(using=None):
+    return connections[using or router.db_for_write(Note)]
+
+
+def _backend(connection):
+    if connection.vendor == 'postgresql':
+        return 'postgresql'
+    if connection.vendor == 'sqlite':
+        if connection.alias not in _fts_available:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE name = %s", [SQLITE_TABLE])
+                _fts_available[connection.alias] = cursor.fetchone() is not None
+        if _fts_available[connection.alias]:
+            return 'sqlite'
+    return None
+
+
+def _note_ids(connection, ids):
+    pk = Note._meta.pk
+    return [pk.get_db_prep_value(note_id, connection) for note_id in ids]
+
+
+# ====== Обновление индекса =======
+def index_notes(notes, using=None):
+    # notes — объекты Note (или что угодно с id, subject, text)
+    notes = list(notes)
+    connection = _connection(using)
+    backend = _backend(connection)
+    if not notes or backend is None:
+        return
+
+    ids = _note_ids(connection, [note.id for note in notes])
+    with connection.cursor() as cursor:
+        if backend == 'postgresql':
+            config = settings.NOTES_SEARCH_CONFIG
+            cursor.executemany(
+                f"INSERT INTO {POSTGRES_TABLE} (note_id, document) VALUES "
+                f"(%s, setweight(to_tsvector(%s::regconfig, %s), 'A') || setweight(to_tsvector(%s::regconfig, %s), 'B')) "
+                f"ON CONFLICT (note_id) DO UPDATE SET document = EXCLUDED.document",
+                [(note_id, config, note.subject, config, note.text) for note_id, note in zip(ids, notes)],
+            )
+        else:
+            cursor.execute(
+                f"DELETE FROM {SQLITE_TABLE} WHERE note_id IN ({', '.join(['%s'] * len(ids))})", ids
+            )
+            cursor.executemany(
+                f"INSERT INTO {SQLITE_TABLE} (note_id, subject, text) VALUES (%s, %s, %s)",
+                [(note_id, note.subject, note.text) for note_id, note in zip(ids, notes)],
+            )
+
+
+def unindex_notes(ids, using=None):
+    # На PostgreSQL строки индекса удаляет ON DELETE CASCADE
+    ids = list(ids)
+    connection = _connection(using)
+    if not ids or _backend(connection) != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {SQLITE_TABLE} WHERE note_id IN ({', '.join(['%s'] * len(ids))})",
+            _note_ids(connection, ids),
+        )
+
+
+def rebuild(chunk_size=1000, using=None):
+    connection = _connection(using)
+    backend = _backend(connection)
+    if backend is None:
+        return 0
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {POSTGRES_TABLE if backend == 'postgresql' else SQLITE_TABLE}")
+
+    total = 0
+    chunk = []
+    for note in Note.objects.using(connection.alias).only('id', 'subject', 'text').iterator(chunk_size=chunk_size):
+        chunk.append(note)
+        if len(chunk) == chunk_size:
+            index_notes(chunk, using=connection.alias)
+            total += len(chunk)
+            chunk = []
+    index_notes(chunk, using=connection.alias)
+    return total + len(chunk)
+
+
+# ====== Поиск =======
+def _fts5_query(query):
+    # Пользовательский ввод не должен ломать синтаксис MATCH: берём слова в кавычки,
+    # последнее — префиксом (поиск по мере набора)
+    words = re.findall(r'\w+', query)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def search_notes(query, author=None, subject=None, limit=50, offset=0):
+    """Возвращает список (id заметки, rank) в порядке убывания релевантности."""
+    connection = connections[router.db_for_read(Note)]
+    backend = _backend(connection)
+
+    if backend is None:
+        # Запасной путь без индекса: LIKE по text не находит длинные (сжатые) тексты
+        queryset = Note.objects.filter(Q(subject__icontains=query) | Q(text__icontains=query))
+        if author is not None:
+            queryset = queryset.filter(author_id=author)
+        if subject is not None:
+            queryset = queryset.filter(subject=subject)
+        ids = queryset.order_by('-updated_at', 'id').values_list('id', flat=True)[offset:offset + limit]
+        return [(note_id, None) for note_id in ids]
+
+    filters = []
+    params = []
+    if author is not None:
+        filters.append("n.author_id = %s")
+        params.append(author)
+    if subject is not None:
+        filters.append("n.subject = %s")
+        params.append(subject)
+    extra = ''.join(f" AND {condition}" for condition in filters)
+
+    if backend == 'postgresql':
+        sql = (
+            f"SELECT n.id, ts_rank(s.document, q) AS rank "
+            f"FROM {POSTGRES_TABLE} s JOIN {NOTE_TABLE} n ON n.id = s.note_id, "
+            f"websearch_to_tsquery(%s::regconfig, %s) q "
+            f"WHERE s.document @@ q{extra} "
+            f"ORDER BY rank DESC, n.updated_at DESC LIMIT %s OFFSET %s"
+        )
+        params = [settings.NOTES_SEARCH_CONFIG, query, *params, limit, offset]
+    else:
+        match = _fts5_query(query)
+        if match is None:
+            return []
+        # bm25: чем меньше, тем релевантнее; subject весит больше text
+        sql = (
+            f"SELECT n.id, -bm25({SQLITE_TABLE}, 0.0, 10.0, 1.0) AS rank "
+            f"FROM {SQLITE_TABLE} f JOIN {NOTE_TABLE} n ON n.id = f.note_id "
+            f"WHERE {SQLITE_TABLE} MATCH %s{extra} "
+            f"ORDER BY rank DESC, n.updated_at DESC LIMIT %s OFFSET %s"
+        )
+        params = [match, *params, limit, offset]
+
+    pk = Note._meta.pk
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [(pk.to_python(note_id), rank) for note_id, rank in cursor.fetchall()]
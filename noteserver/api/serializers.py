@@ -8,7 +8,86 @@ class NoteSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Note
-        fields = ['id', 'author', 'author_username', 'author_name', 'subject', 'text', 'created_at', 'updated_at', 'uploaded_at']
+        fields = ['id', 'author', 'author_username', 'author_name', 'subject', 'text', 'created_at', 'updated_at', 'uploaded_at', 'version']
+
+    def __init__(self, *args, **kwargs):
+        # fields=[...] — отдать только выбранные поля
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+# Короткое подтверждение для синхронизации: клиент уже знает остальные поля
+NOTE_ACK_FIELDS = ['id', 'updated_at', 'uploaded_at', 'version']
+
+
+# Заголовки без текста: клиент по ним решает, какие тела догрузить через /notes/bodies
+NOTE_HEADER_FIELDS = [name for name in NoteSerializer.Meta.fields if name != 'text']
+NOTE_BODY_FIELDS = ['id', 'text', 'updated_at', 'version']
+
+
+def parse_note_fields(value):
+    # "id,subject,updated_at" -> список полей; id отдаётся всегда; "headers" — всё, кроме text
+    if not value:
+        return None
+    if value == 'headers':
+        return list(NOTE_HEADER_FIELDS)
+    fields = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = set(fields) - set(NoteSerializer.Meta.fields)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    if 'id' not in fields:
+        fields.insert(0, 'id')
+    return fields
+
+# ====== Быстрый путь чтения заметок =======
+# Поле ответа NoteSerializer -> колонка для values_list (author_username — через JOIN)
+NOTE_COLUMNS = {
+    'id': 'id',
+    'author': 'author_id',
+    'author_username': 'author__username',
+    'author_name': 'author_name',
+    'subject': 'subject',
+    'text': 'text',
+    'created_at': 'created_at',
+    'updated_at': 'updated_at',
+    'uploaded_at': 'uploaded_at',
+    'version': 'version',
+}
+
+
+class NoteRowMapper:
+    """
+    Читает заметки через values_list и собирает dict того же вида, что NoteSerializer,
+    без создания моделей и интроспекции полей на каждой строке.
+    """
+
+    def __init__(self, fields=None):
+        self.fields = tuple(fields or NoteSerializer.Meta.fields)
+        self.columns = [NOTE_COLUMNS[name] for name in self.fields]
+        # Ключ курсора (updated_at, id) нужен всегда, даже если поля не запрошены
+        for column in ('updated_at', 'id'):
+            if column not in self.columns:
+                self.columns.append(column)
+        self._width = len(self.fields)
+        self._id_pos = self.fields.index('id') if 'id' in self.fields else None
+        self._updated_pos = self.columns.index('updated_at')
+        self._cursor_id_pos = self.columns.index('id')
+
+    def rows(self, queryset):
+        return queryset.values_list(*self.columns)
+
+    def to_dict(self, row):
+        data = dict(zip(self.fields, row[:self._width]))
+        if self._id_pos is not None:
+            data['id'] = str(row[self._id_pos])
+        return data
+
+    def cursor_key(self, row):
+        return row[self._updated_pos], row[self._cursor_id_pos]
+
 
 class RegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
@@ -0,0 +1,97 @@
+# journal/signals.py
+from django.contrib.auth.models import Group, User
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import token_cache, watermark
+from .models import Note, PermanentToken
+from .roles import invalidate_roles
+from .search import index_notes
+from .stats import update_stats
+from .sync import now_ms
+from .tombstones import forget_deletions, record_deletions
+
+
+# ====== Сброс кэша токенов =======
+@receiver(post_delete, sender=PermanentToken)
+@receiver(post_save, sender=PermanentToken)
+def invalidate_token_cache(sender, instance, **kwargs):
+    token_cache.invalidate_token(instance.token)
+
+
+@receiver(post_delete, sender=User)
+@receiver(post_save, sender=User)
+def invalidate_user_token_cache(sender, instance, **kwargs):
+    token_cache.invalidate_user(instance.pk)
+
+
+# ====== Сброс кэша ролей =======
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidate_roles_on_membership_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        # user.groups.add/remove/clear — затронут один пользователь
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            invalidate_roles([instance.pk])
+        return
+
+    # group.user_set.* — затронуты пользователи из pk_set
+    if action in ('post_add', 'post_remove'):
+        invalidate_roles(pk_set)
+    elif action == 'pre_clear':
+        # После clear состав группы уже не узнать — запоминаем заранее
+        instance._cleared_user_ids = list(instance.user_set.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        invalidate_roles(getattr(instance, '_cleared_user_ids', []))
+
+
+@receiver(pre_delete, sender=Group)
+@receiver(post_save, sender=Group)
+def invalidate_roles_on_group_change(sender, instance, created=False, **kwargs):
+    if not created:
+        invalidate_roles(instance.user_set.values_list('pk', flat=True))
+
+
+# ====== Надгробия =======
+@receiver(pre_delete, sender=User)
+def record_deleted_user_notes(sender, instance, **kwargs):
+    # Заметки пользователя удалятся каскадом — оставляем по ним надгробия
+    record_deletions(Note.objects.filter(author=instance).values_list('id', 'author_id'), now_ms())
+    watermark.touch(using=kwargs.get('using'))
+
+
+# ====== Полнотекстовый индекс =======
+# Только post_save: обработчик post_delete у Note отключил бы быстрое (одним DELETE) удаление.
+# Все удаления идут через sync.delete_notes (NoteQuerySet.delete, Note.delete) — он чистит индекс сам.
+@receiver(post_save, sender=Note)
+def index_saved_note(sender, instance, raw=False, using=None, **kwargs):
+    if not raw:
+        index_notes([instance], using=using)
+
+
+# ====== Водяной знак ленты =======
+# Пакетный sync и удаления сдвигают его через notify_notes_changed; здесь — одиночные save()
+@receiver(post_save, sender=Note)
+def touch_watermark_on_save(sender, instance, raw=False, using=None, **kwargs):
+    if not raw:
+        watermark.touch(using=using)
+
+
+# ====== Сводка NoteStats =======
+# Одиночные save() (админка, shell): пакетные пути ведут сводку сами и save() не вызывают
+@receiver(pre_save, sender=Note)
+def remember_note_stats_row(sender, instance, raw=False, using=None, **kwargs):
+    if not raw:
+        instance._stats_previous = (Note.objects.using(using).filter(pk=instance.pk)
+                                    .values_list('author_id', 'subject', 'text_length', 'updated_at').first())
+
+
+@receiver(post_save, sender=Note)
+def update_stats_on_save(sender, instance, raw=False, using=None, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_stats_previous', None)
+    update_stats(removed=[previous] if previous else [],
+                 added=[(instance.author_id, instance.subject, instance.text_length, instance.updated_at)],
+                 using=using)
+    # Заметку с тем же id восстановили — надгробие больше не нужно
+    forget_deletions([instance.pk], using=using)
@@ -0,0 +1,175 @@
+# journal/stats.py
+# Сводная таблица NoteStats: число заметок, объём текста и последнее изменение по (автор, предмет).
+# Пути записи передают сюда строки, которые ушли из групп и пришли в них, — сводка меняется
+# приращениями, без пересчёта групп по таблице Note.
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Count, Max, OuterRef, Q, Subquery, Sum
+
+from .models import Note, NoteStats
+
+
+def _aggregate(queryset):
+    return (queryset.order_by().values('author_id', 'subject')
+            .annotate(note_count=Count('id'), text_size=Sum('text_length'), last_updated_at=Max('updated_at')))
+
+
+def _save(rows, using):
+    NoteStats.objects.using(using).bulk_create(
+        [NoteStats(**row) for row in rows],
+        batch_size=settings.NOTES_SYNC_BATCH_SIZE,
+        update_conflicts=True, unique_fields=['author', 'subject'],
+        update_fields=['note_count', 'text_size', 'last_updated_at'],
+    )
+
+
+def _group_filter(groups):
+    condition = Q()
+    for author_id, subject in groups:
+        condition |= Q(author_id=author_id, subject=subject)
+    return condition
+
+
+def _case(connection, column, groups, values, field):
+    # CASE WHEN автор = .. AND предмет = .. THEN .. END по группам; для PostgreSQL — с приведением типа
+    qn = connection.ops.quote_name
+    case = 'CASE %s END' % ' '.join(
+        ['WHEN %s = %%s AND %s = %%s THEN %%s' % (qn(column[0]), qn(column[1]))] * len(groups))
+    if connection.features.requires_casted_case_in_updates:
+        case = 'CAST(%s AS %s)' % (case, field.db_type(connection))
+    params = []
+    for group, value in zip(groups, values):
+        params += [*group, value]
+    return case, params
+
+
+def _apply_deltas(db, deltas):
+    """
+    Один UPDATE на порцию групп: note_count = note_count + CASE .. END, text_size — так же,
+    last_updated_at — максимум из прежнего и пришедших. SQL собираем сами, как _conditional_update в sync.
+    """
+    connection = connections[db]
+    qn = connection.ops.quote_name
+    meta = NoteStats._meta
+    column = (meta.get_field('author').column, meta.get_field('subject').column)
+    count_field, size_field, latest_field = (
+        meta.get_field(name) for name in ('note_count', 'text_size', 'last_updated_at'))
+    groups = list(deltas)
+
+    count_case, count_params = _case(connection, column, groups, [deltas[g][0] for g in groups], count_field)
+    size_case, size_params = _case(connection, column, groups, [deltas[g][1] for g in groups], size_field)
+    latest_sql, latest_params = 'NULL', []
+    added = [group for group in groups if deltas[group][2] is not None]
+    if added:
+        latest_sql, latest_params = _case(connection, column, added, [deltas[g][2] for g in added], latest_field)
+    latest_column = qn(latest_field.column)
+
+    sql = ('UPDATE %s SET %s = %s + %s, %s = %s + %s, '
+           '%s = CASE WHEN %s IS NULL OR %s < %s THEN %s ELSE %s END WHERE %s') % (
+        qn(meta.db_table),
+        qn(count_field.column), qn(count_field.column), count_case,
+        qn(size_field.column), qn(size_field.column), size_case,
+        latest_column, latest_column, latest_column, latest_sql, latest_sql, latest_column,
+        ' OR '.join(['(%s = %%s AND %s = %%s)' % (qn(column[0]), qn(column[1]))] * len(groups)),
+    )
+    params = [*count_params, *size_params, *latest_params, *latest_params]
+    for group in groups:
+        params += group
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def update_stats(removed=(), added=(), using=None):
+    """
+    removed / added — строки (id автора, предмет, text_length, updated_at): прежние версии
+    перезаписанных и удалённых заметок и новые версии сохранённых. Вызывается в транзакции
+    записи, после изменения Note. Приращения всех групп — одним UPDATE на порцию
+    NOTES_SYNC_UPDATE_CHUNK групп; last_updated_at пересчитывается по Note, только если из группы
+    ушла строка с максимальным updated_at, а новой не пришло.
+    Свою транзакцию не открывает: точка сохранения — два лишних запроса на каждое удаление.
+    """
+    deltas = defaultdict(lambda: [0, 0, None, None])  # count, size, max пришедших, max ушедших
+    for author_id, subject, text_length, updated_at in added:
+        delta = deltas[author_id, subject]
+        delta[0] += 1
+        delta[1] += text_length
+        delta[2] = updated_at if delta[2] is None else max(delta[2], updated_at)
+    for author_id, subject, text_length, updated_at in removed:
+        delta = deltas[author_id, subject]
+        delta[0] -= 1
+        delta[1] -= text_length
+        delta[3] = updated_at if delta[3] is None else max(delta[3], updated_at)
+    deltas = {group: delta for group, delta in deltas.items() if group[0] is not None}
+    if not deltas:
+        return
+    db = using or router.db_for_write(NoteStats)
+    stats = NoteStats.objects.using(db)
+    chunk = settings.NOTES_SYNC_UPDATE_CHUNK
+
+    with transaction.atomic(using=db, savepoint=False):
+        # Новые группы — пустой строкой; приращения ниже одинаковы для новых и старых
+        new = [group for group, delta in deltas.items() if delta[2] is not None]
+        if new:
+            stats.bulk_create([NoteStats(author_id=author_id, subject=subject) for author_id, subject in new],
+                              batch_size=settings.NOTES_SYNC_BATCH_SIZE, ignore_conflicts=True)
+
+        groups = list(deltas)
+        for start in range(0, len(groups), chunk):
+            _apply_deltas(db, {group: deltas[group] for group in groups[start:start + chunk]})
+
+        # Группы, откуда ушла строка с максимумом: один UPDATE с коррелированным подзапросом к Note
+        recompute = [(group, delta[3]) for group, delta in deltas.items()
+                     if delta[3] is not None and (delta[2] is None or delta[2] < delta[3])]
+        latest = (Note.objects.using(db).filter(author_id=OuterRef('author_id'), subject=OuterRef('subject'))
+                  .order_by().values('author_id').annotate(last=Max('updated_at')).values('last'))
+        for start in range(0, len(recompute), chunk):
+            condition = Q()
+            for (author_id, subject), removed_max in recompute[start:start + chunk]:
+                condition |= Q(author_id=author_id, subject=subject, last_updated_at__lte=removed_max)
+            stats.filter(condition).update(last_updated_at=Subquery(latest))
+
+        # Группы, где заметок не осталось, удаляем
+        emptied = [group for group, delta in deltas.items() if delta[0] < 0]
+        for start in range(0, len(emptied), chunk):
+            stats.filter(_group_filter(emptied[start:start + chunk]), note_count__lte=0).delete()
+
+
+def rebuild_stats(using=None):
+    db = using or router.db_for_write(NoteStats)
+    total = 0
+    with transaction.atomic(using=db):
+        NoteStats.objects.using(db).all().delete()
+        batch = []
+        for row in _aggregate(Note.objects.using(db)).iterator(chunk_size=settings.NOTES_SYNC_BATCH_SIZE):
+            batch.append(row)
+            if len(batch) == settings.NOTES_SYNC_BATCH_SIZE:
+                _save(batch, db)
+                total += len(batch)
+                batch = []
+        _save(batch, db)
+    return total + len(batch)
+
+
+def list_stats(author=None, subject=None, group_by=None):
+    """
+    Строки сводки; group_by='author' или 'subject' — свёртка по одному измерению.
+    Читается только NoteStats: время не зависит от числа заметок.
+    """
+    queryset = NoteStats.objects.all()
+    if author is not None:
+        queryset = queryset.filter(author_id=author)
+    if subject is not None:
+        queryset = queryset.filter(subject=subject)
+
+    if group_by == 'author':
+        keys = ['author_id', 'author__username']
+    elif group_by == 'subject':
+        keys = ['subject']
+    else:
+        return list(queryset.order_by('author_id', 'subject').values(
+            'author_id', 'author__username', 'subject', 'note_count', 'text_size', 'last_updated_at'))
+
+    return list(queryset.order_by(*keys).values(*keys).annotate(
+        note_count=Sum('note_count'), text_size=Sum('text_size'), last_updated_at=Max('last_updated_at')))
@@ -0,0 +1,70 @@
+# journal/subscriptions.py
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+
+from .models import FeedSubscription
+from .routers import mark_written
+from . import watermark
+
+
+def _key(user_id):
+    return f'feed:subscription:{user_id}'
+
+
+def get_subscription(user):
+    # (subjects, authors); пустые списки — подписки нет, лента общая
+    data = cache.get(_key(user.pk))
+    if data is None:
+        subscription = FeedSubscription.objects.filter(user=user).values_list('subjects', 'authors').first()
+        data = subscription or ([], [])
+        cache.set(_key(user.pk), data, settings.FEED_SUBSCRIPTION_CACHE_TTL)
+    return data
+
+
+async def aget_subscription(user):
+    data = await cache.aget(_key(user.pk))
+    if data is None:
+        subscription = await FeedSubscription.objects.filter(user=user).values_list('subjects', 'authors').afirst()
+        data = subscription or ([], [])
+        await cache.aset(_key(user.pk), data, settings.FEED_SUBSCRIPTION_CACHE_TTL)
+    return data
+
+
+def save_subscription(user, subjects, authors):
+    FeedSubscription.objects.update_or_create(user=user, defaults={"subjects": subjects, "authors": authors})
+    cache.delete(_key(user.pk))
+    mark_written(user.pk)
+    # Подписка меняет содержимое ленты — сбрасываем ETag (подписки меняются редко)
+    watermark.touch()
+
+
+def delete_subscription(user):
+    FeedSubscription.objects.filter(user=user).delete()
+    cache.delete(_key(user.pk))
+    mark_written(user.pk)
+    watermark.touch()
+
+
+def subscription_filter(subjects, authors):
+    # OR по двум условиям: каждое попадает в свой индекс (subject, updated_at) / (author, updated_at)
+    condition = Q()
+    if subjects:
+        condition |= Q(subject__in=subjects)
+    if authors:
+        condition |= Q(author_id__in=authors)
+    return condition
+
+
+def parse_subscription(data):
+    subjects = data.get("subjects", [])
+    authors = data.get("authors", [])
+    if not isinstance(subjects, list) or not all(isinstance(subject, str) for subject in subjects):
+        raise ValueError("subjects must be a list of strings")
+    if not isinstance(authors, list):
+        raise ValueError("authors must be a list of user ids")
+    try:
+        authors = [int(author) for author in authors]
+    except (TypeError, ValueError):
+        raise ValueError("authors must be a list of user ids")
+    return sorted(set(subjects)), sorted(set(authors))
@@ -0,0 +1,260 @@
+# journal/sync.py
+import uuid
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from .models import Note
+from .notifier import get_notifier
+from .routers import mark_written
+from .search import index_notes, unindex_notes
+from .serializers import NOTE_ACK_FIELDS, NoteRowMapper, NoteSerializer
+from .stats import update_stats
+from .tombstones import forget_deletions, record_deletions
+from . import watermark
+
+# Поля, которые перезаписываются при повторной синхронизации заметки (author — отдельно)
+SYNC_UPDATE_FIELDS = ['author_name', 'subject', 'text', 'text_length', 'created_at', 'updated_at', 'uploaded_at']
+
+# Что нужно об удаляемой заметке: владелец — для проверки прав и надгробия, остальное — для сводки NoteStats
+DELETE_FIELDS = ('id', 'author_id', 'subject', 'text_length', 'updated_at')
+
+
+def now_ms():
+    return int(timezone.now().timestamp() * 1000)
+
+
+def notify_notes_changed(kind, server_time, using=None):
+    # Будим long-poll/SSE-клиентов только после коммита транзакции
+    event = {"type": kind, "serverTime": server_time}
+    watermark.touch(using=using)
+    transaction.on_commit(lambda: get_notifier().publish(event), using=using)
+
+
+def delete_notes(rows, using=None):
+    """
+    Удаляет заметки одним DELETE, оставляет надгробия, чистит индекс поиска, вычитает заметки
+    из сводки и сдвигает водяной знак. rows — строки DELETE_FIELDS, прочитанные под блокировкой
+    в той же транзакции. Сюда сходятся все пути удаления: API, Note.delete(), QuerySet.delete(), админка.
+    Возвращает число удалённых.
+    """
+    note_ids = [row[0] for row in rows]
+    if not note_ids:
+        return 0
+    db = using or router.db_for_write(Note)
+    now = now_ms()
+    with transaction.atomic(using=db, savepoint=False):
+        # _base_manager — обычный QuerySet.delete(): у Note нет обработчиков удаления, это один DELETE
+        deleted, _ = Note._base_manager.using(db).filter(id__in=note_ids).delete()
+        unindex_notes(note_ids, using=db)
+        record_deletions([row[:2] for row in rows], now)
+        update_stats(removed=[row[1:] for row in rows], using=db)
+        notify_notes_changed("delete", now, using=db)
+    return deleted
+
+
+def _base_version(value):
+    # Версия, от которой клиент делал правку; None — клиент версий не знает (старый клиент).
+    # Мусор ("x", 1.5, true) — ValueError: молча превратить его в None значило бы перезаписать
+    # заметку без проверки версии
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        raise ValueError(value)
+    if isinstance(value, float):
+        if not value.is_integer():
+            raise ValueError(value)
+        return int(value)
+    try:
+        return int(value)
+    except TypeError:
+        raise ValueError(value)
+
+
+def build_notes(user, raw_notes, now):
+    # Превращаем сырые заметки клиента в объекты Note (без запросов к БД).
+    # Если id повторяется в пачке, побеждает последняя версия — как при update_or_create.
+    # Возвращает (заметки, id заметок с нечисловой version) — последние не сохраняются.
+    notes = {}
+    invalid = set()
+    for n in raw_notes:
+        if not isinstance(n, dict):
+            continue
+
+        note_id = n.get("id")
+        try:
+            if note_id:
+                note_uuid = uuid.UUID(str(note_id))
+            else:
+                note_uuid = uuid.uuid4()
+        except ValueError:
+            continue
+
+        notes.pop(note_uuid, None)
+        invalid.discard(note_uuid)
+        try:
+            base_version = _base_version(n.get("version"))
+        except ValueError:
+            invalid.add(note_uuid)
+            continue
+
+        note = Note(
+            id=note_uuid,
+            author=user,
+            # bulk_create не вызывает Note.save(), поэтому подставляем имя автора сами
+            author_name=n.get("author", user.username) or user.username,
+            subject=n.get("subject", ""),
+            text=n.get("text", ""),
+            created_at=n.get("created_at", now),
+            updated_at=n.get("updated_at", now),
+            uploaded_at=n.get("uploaded_at", now),
+        )
+        # Длину считаем здесь: в БД хранится сжатый текст, и Length('text') дал бы его длину
+        note.text_length = len(str(note.text))
+        note.base_version = base_version
+        notes[note_uuid] = note
+    return list(notes.values()), sorted(invalid, key=str)
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _conditional_update(db, user, notes, expected_version):
+    """
+    Один UPDATE ... SET <поле> = CASE id WHEN ... END, version = version + 1
+    WHERE id IN (...) AND version = <expected_version> на группу заметок с одной базовой версией.
+    SQL собираем сами: выражения ORM (Case/When) на сотнях заметок тратят больше времени, чем сама БД.
+    Возвращает id заметок, которые не обновились (их версию успели сменить).
+    """
+    connection = connections[db]
+    qn = connection.ops.quote_name
+    pk = Note._meta.pk
+    ids = [pk.get_db_prep_value(note.id, connection) for note in notes]
+    id_placeholders = ', '.join(['%s'] * len(ids))
+
+    assignments = []
+    params = []
+    for name in SYNC_UPDATE_FIELDS:
+        field = Note._meta.get_field(name)
+        case = 'CASE %s %s END' % (qn(pk.column), ' '.join(['WHEN %s THEN %s'] * len(notes)))
+        if connection.features.requires_casted_case_in_updates:
+            case = 'CAST(%s AS %s)' % (case, field.db_type(connection))
+        assignments.append('%s = %s' % (qn(field.column), case))
+        for note_id, note in zip(ids, notes):
+            params += [note_id, field.get_db_prep_save(getattr(note, field.attname), connection)]
+
+    version_column = qn(Note._meta.get_field('version').column)
+    sql = 'UPDATE %s SET %s, %s = %s, %s = %%s WHERE %s IN (%s) AND %s = %%s' % (
+        qn(Note._meta.db_table),
+        ', '.join(assignments),
+        qn(Note._meta.get_field('author').column), '%s',
+        version_column,
+        qn(pk.column), id_placeholders,
+        version_column,
+    )
+    params += [user.pk, expected_version + 1, *ids, expected_version]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        updated = cursor.rowcount
+    if updated == len(ids):
+        return set()
+
+    new_version = expected_version + 1
+    current = Note.objects.using(db).filter(id__in=[note.id for note in notes]).values_list('id', 'version')
+    return {note_id for note_id, version in current if version != new_version}
+
+
+def bulk_upsert_notes(user, raw_notes, now):
+    """
+    Сохраняет пачку заметок с оптимистичной блокировкой по Note.version.
+    Число запросов зависит от числа различных базовых версий в пачке и от числа порций
+    (NOTES_SYNC_BATCH_SIZE / NOTES_SYNC_UPDATE_CHUNK), а не от числа заметок или предметов в порции.
+    Возвращает (сохранённые объекты Note, id конфликтующих заметок, id заметок с неверной version).
+    """
+    notes, invalid_ids = build_notes(user, raw_notes, now)
+    if not notes:
+        return notes, [], invalid_ids
+
+    db = router.db_for_write(Note)
+    batch_size = settings.NOTES_SYNC_BATCH_SIZE
+
+    with transaction.atomic(using=db):
+        current = {}
+        previous = {}
+        for chunk in _chunks(notes, batch_size):
+            rows = (Note.objects.using(db).select_for_update()
+                    .filter(id__in=[note.id for note in chunk])
+                    .values_list('id', 'version', 'author_id', 'subject', 'text_length', 'updated_at'))
+            for note_id, version, *stats_row in rows:
+                current[note_id] = version
+                previous[note_id] = tuple(stats_row)
+
+        to_create = []
+        groups = defaultdict(list)
+        conflicts = set()
+        for note in notes:
+            if note.id not in current:
+                note.version = 1
+                to_create.append(note)
+            elif note.base_version is not None and note.base_version != current[note.id]:
+                conflicts.add(note.id)
+            else:
+                # Условная запись: применится, только если версия в БД не изменилась
+                note.version = current[note.id] + 1
+                groups[current[note.id]].append(note)
+
+        if to_create:
+            Note.objects.using(db).bulk_create(to_create, batch_size=batch_size)
+        for expected_version, group in groups.items():
+            for chunk in _chunks(group, settings.NOTES_SYNC_UPDATE_CHUNK):
+                conflicts |= _conditional_update(db, user, chunk, expected_version)
+
+        saved = [note for note in notes if note.id not in conflicts]
+        for chunk in _chunks(saved, batch_size):
+            forget_deletions([note.id for note in chunk], using=db)
+            index_notes(chunk, using=db)
+
+        if saved:
+            # Сводка: прежние версии перезаписанных заметок уходят из своих групп, новые приходят
+            update_stats(
+                removed=[previous[note.id] for note in saved if note.id in previous],
+                added=[(user.pk, note.subject, note.text_length, note.updated_at) for note in saved],
+                using=db,
+            )
+            notify_notes_changed("sync", now, using=db)
+
+    # Дальнейшие чтения этого пользователя — с default, пока реплика не догонит
+    mark_written(user.pk)
+    return saved, [note.id for note in notes if note.id in conflicts], invalid_ids
+
+
+def apply_sync_batch(user, raw_notes, now, ack=False):
+    """
+    Запись пачки + тело ответа sync: сохранённые заметки (целиком или только ack-поля)
+    и конфликты с текущей серверной копией. Общая для SyncNotesView и воркеров очереди.
+    """
+    saved, conflict_ids, invalid_ids = bulk_upsert_notes(user, raw_notes, now)
+
+    fields = NOTE_ACK_FIELDS if ack else None
+    saved_notes = NoteSerializer(saved, many=True, fields=fields).data
+
+    # Конфликты: клиент правил устаревшую версию — отдаём текущую серверную копию,
+    # переотправить нужно только эти заметки
+    conflicts = []
+    if conflict_ids:
+        mapper = NoteRowMapper()
+        rows = mapper.rows(Note.objects.filter(id__in=conflict_ids))
+        conflicts = [
+            {"id": server["id"], "status": "conflict", "server": server}
+            for server in map(mapper.to_dict, rows)
+        ]
+
+    # version не число — заметку не трогаем, клиенту нужно переотправить её с верной версией
+    conflicts += [{"id": str(note_id), "status": "invalid_version"} for note_id in invalid_ids]
+
+    return {"notes": saved_notes, "conflicts": conflicts}
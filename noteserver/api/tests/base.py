@@ -0,0 +1,47 @@
+# journal/tests/base.py
+# Общая обвязка тестов API: пользователи с постоянным токеном и чистые кэши на каждый тест.
+import json
+import uuid
+
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from rest_framework.test import APIClient, APITestCase
+
+from api import token_cache
+from api.models import NoteStats, PermanentToken
+
+
+class NotesAPITestCase(APITestCase):
+    def setUp(self):
+        # Ведра лимитов, токены, роли и водяной знак живут в кэше — между тестами не переносим
+        cache.clear()
+        token_cache.clear()
+
+    def make_user(self, username, groups=('teachers',), **extra):
+        # (пользователь, клиент с его токеном); пароль не задаём — хеш в тестах не нужен
+        user = User.objects.create(username=username, **extra)
+        for name in groups:
+            user.groups.add(Group.objects.get_or_create(name=name)[0])
+        token = PermanentToken.objects.create(user=user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token.token}')
+        return user, client
+
+    def sync(self, client, notes, query='', **extra):
+        return client.post(f'/api/notes/sync{query}', {"notes": notes}, format='json', **extra)
+
+
+def note_id():
+    return str(uuid.uuid4())
+
+
+def body(response):
+    # JSON ответа; потоковые ответы собираем целиком
+    if response.streaming:
+        return json.loads(b''.join(response.streaming_content))
+    return response.json()
+
+
+def stats_rows():
+    # Содержимое сводки NoteStats в сравнимом виде
+    return sorted(NoteStats.objects.values_list('author_id', 'subject', 'note_count', 'text_size', 'last_updated_at'))
@@ -0,0 +1,61 @@
+# journal/tests/test_api_profile.py
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from django.test import SimpleTestCase, override_settings
+from django.utils.module_loading import import_string
+
+from noteserver import settings_api
+
+from .base import NotesAPITestCase, body, note_id
+
+PROJECT_DIR = Path(__file__).resolve().parents[2]
+
+
+class ApiProfileSettingsTests(SimpleTestCase):
+    def test_middleware_chain_is_short_and_async_capable(self):
+        for path in settings_api.MIDDLEWARE:
+            with self.subTest(middleware=path):
+                self.assertTrue(getattr(import_string(path), 'async_capable', False))
+        for dropped in ('SessionMiddleware', 'CsrfViewMiddleware', 'MessageMiddleware', 'WhiteNoiseMiddleware'):
+            self.assertFalse([path for path in settings_api.MIDDLEWARE if path.endswith(dropped)])
+
+    def test_no_admin_or_browsable_api(self):
+        self.assertNotIn('django.contrib.admin', settings_api.INSTALLED_APPS)
+        self.assertEqual(settings_api.REST_FRAMEWORK["DEFAULT_RENDERER_CLASSES"], ("api.renderers.FastJSONRenderer",))
+        # Остальное — как в полном профиле
+        self.assertEqual(settings_api.REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"]["sync"], "60/min")
+
+    def test_cold_start_skips_unused_apps(self):
+        # Отдельный процесс: профиль выбирается при старте, а DRF читает рендереры при импорте вьюх
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE='noteserver.settings_api')
+        env.setdefault('DATABASE_URL', 'sqlite:///:memory:')
+        script = (
+            "import sys, django; django.setup();"
+            "from django.core.wsgi import get_wsgi_application; get_wsgi_application();"
+            "from django.urls import get_resolver; get_resolver().url_patterns;"
+            "from django.apps import apps; from api.views import UpdatesView;"
+            "print(apps.is_installed('django.contrib.admin'),"
+            " sorted(m for m in ('django.contrib.sessions.models', 'whitenoise') if m in sys.modules),"
+            " [r.__name__ for r in UpdatesView.renderer_classes])"
+        )
+        proc = subprocess.run([sys.executable, '-c', script], cwd=PROJECT_DIR, env=env,
+                              capture_output=True, text=True)
+
+        self.assertEqual(proc.returncode, 0, proc.stderr)
+        self.assertEqual(proc.stdout.strip(), "False [] ['FastJSONRenderer']")
+
+
+@override_settings(ROOT_URLCONF=settings_api.ROOT_URLCONF, MIDDLEWARE=settings_api.MIDDLEWARE,
+                   REST_FRAMEWORK=settings_api.REST_FRAMEWORK)
+class ApiProfileRequestTests(NotesAPITestCase):
+    def test_api_served_admin_not(self):
+        _, client = self.make_user('teacher')
+        nid = note_id()
+
+        self.assertEqual(self.sync(client, [{"id": nid}]).status_code, 200)
+        self.assertEqual([note["id"] for note in body(client.get('/api/notes/updates?since=0&limit=5'))["notes"]],
+                         [nid])
+        self.assertEqual(client.get('/admin/').status_code, 404)
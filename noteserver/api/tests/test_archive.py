@@ -0,0 +1,119 @@
+# journal/tests/test_archive.py
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+
+from api.archive import import_lines
+from api.models import Note, NoteStats, NoteTombstone
+from api.tombstones import record_deletions
+
+from .base import NotesAPITestCase, note_id, stats_rows
+
+LONG_TEXT = "Конспект урока. " * 300
+
+
+class ExportEndpointTests(NotesAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user, self.client = self.make_user('teacher')
+        _, self.other = self.make_user('other')
+        self.mine, self.theirs = note_id(), note_id()
+        self.sync(self.client, [{"id": self.mine, "text": LONG_TEXT, "updated_at": 100}])
+        self.sync(self.other, [{"id": self.theirs, "updated_at": 200}])
+
+    def export(self, client, query=''):
+        response = client.get(f'/api/notes/export{query}')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        return [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+
+    def test_user_exports_own_notes(self):
+        record, = self.export(self.client)
+
+        self.assertEqual((record["id"], record["author_username"], record["text"]), (self.mine, "teacher", LONG_TEXT))
+
+    def test_staff_exports_everything_in_order(self):
+        _, admin = self.make_user('admin', is_staff=True)
+
+        self.assertEqual([record["id"] for record in self.export(admin)], [self.mine, self.theirs])
+        self.assertEqual([record["id"] for record in self.export(admin, '?since=100')], [self.theirs])
+
+    def test_rejects_bad_since(self):
+        self.assertEqual(self.client.get('/api/notes/export?since=yesterday').status_code, 400)
+
+
+class ExportImportCommandTests(NotesAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user, self.client = self.make_user('teacher')
+        self.ids = [note_id() for _ in range(5)]
+        self.sync(self.client, [
+            {"id": nid, "subject": f"S{n % 2}", "text": LONG_TEXT if n == 0 else f"note {n}", "updated_at": 100 + n}
+            for n, nid in enumerate(self.ids)
+        ])
+        self.sync(self.client, [{"id": self.ids[1], "text": "edited", "version": 1, "updated_at": 150}])
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        self.path = os.path.join(tmp, 'notes.ndjson.gz')
+
+    def snapshot(self):
+        return sorted(Note.objects.values_list('id', 'author_id', 'subject', 'text', 'text_length',
+                                               'updated_at', 'version'))
+
+    def test_round_trip_through_gzip(self):
+        before, stats_before = self.snapshot(), stats_rows()
+        call_command('export_notes', self.path, stderr=StringIO())
+        Note.objects.all().delete()
+        NoteStats.objects.all().delete()
+
+        call_command('import_notes', self.path, '--chunk-size', '2', stdout=StringIO())
+
+        self.assertEqual(self.snapshot(), before)
+        self.assertEqual(stats_rows(), stats_before)
+        self.assertFalse(os.path.exists(f'{self.path}.checkpoint'))
+
+    def test_import_overwrites_and_forgets_tombstones(self):
+        call_command('export_notes', self.path, stderr=StringIO())
+        Note.objects.filter(id=self.ids[0]).delete()
+        record_deletions([(self.ids[0], self.user.pk)], 1)
+        Note.objects.filter(id=self.ids[1]).update(text="changed meanwhile")
+
+        call_command('import_notes', self.path, stdout=StringIO())
+
+        self.assertEqual(Note.objects.get(id=self.ids[0]).text, LONG_TEXT)
+        self.assertEqual(Note.objects.get(id=self.ids[1]).text, "edited")
+        self.assertFalse(NoteTombstone.objects.exists())
+
+    def test_resumes_after_checkpoint(self):
+        call_command('export_notes', self.path, stderr=StringIO())
+        Note.objects.all().delete()
+        with open(f'{self.path}.checkpoint', 'w') as f:
+            json.dump({"line": 3}, f)
+
+        out = StringIO()
+        call_command('import_notes', self.path, stdout=out)
+
+        self.assertIn("Resuming after line 3", out.getvalue())
+        self.assertEqual(Note.objects.count(), 2)
+
+    def test_unknown_authors_skipped(self):
+        lines = [json.dumps({"id": note_id(), "author_username": "ghost", "created_at": 1, "updated_at": 1,
+                             "uploaded_at": 1}).encode()]
+
+        self.assertEqual(import_lines(lines), (0, 1))
+        self.assertEqual(Note.objects.count(), 5)
+
+    def test_duplicate_ids_in_chunk_keep_last(self):
+        nid = note_id()
+        lines = [json.dumps({"id": nid, "author_username": "teacher", "subject": "S0", "text": text,
+                             "created_at": 1, "updated_at": updated, "uploaded_at": 1}).encode()
+                 for text, updated in (("first", 300), ("second", 301))]
+
+        self.assertEqual(import_lines(lines), (1, 1))
+        self.assertEqual(Note.objects.get(id=nid).text, "second")
+        incremental = stats_rows()
+        call_command('rebuild_note_stats', stdout=StringIO())
+        self.assertEqual(stats_rows(), incremental)
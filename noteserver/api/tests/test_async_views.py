@@ -0,0 +1,141 @@
+# journal/tests/test_async_views.py
+# urls.py выбирает вьюхи при импорте (NOTES_ASYNC_VIEWS) — здесь свой urlconf с async-вьюхами,
+# а запросы идут через AsyncClient (ASGIHandler), как под uvicorn.
+import json
+from unittest import mock
+
+from django.test import AsyncClient, Client, override_settings
+from django.urls import include, path
+
+from api import async_views
+from api.models import Note, PermanentToken
+from api.throttling import BucketThrottle
+
+from .base import NotesAPITestCase, body, note_id
+
+urlpatterns = [
+    path('api/notes/sync', async_views.sync_notes),
+    path('api/notes/updates', async_views.updates),
+    path('api/', include('api.urls')),
+]
+
+
+async def read(response):
+    if response.streaming:
+        return json.loads(b''.join([chunk async for chunk in response.streaming_content]))
+    return json.loads(response.content)
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncViewsTests(NotesAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user, self.drf_client = self.make_user('teacher')
+        self.auth = {"Authorization": f"Bearer {PermanentToken.objects.get(user=self.user).token}"}
+        self.async_client = AsyncClient()
+
+    def aget(self, url, **headers):
+        # Заголовки — на каждый запрос: AsyncClient(headers=...) сбрасывает их в __init__
+        return self.async_client.get(url, headers={**self.auth, **headers})
+
+    def apost(self, notes, query='', **headers):
+        return self.async_client.post(f'/api/notes/sync{query}', {"notes": notes},
+                                      content_type='application/json', headers={**self.auth, **headers})
+
+    def client_for_async(self):
+        # Синхронный Client тоже дойдёт до async-вьюх (через async_to_sync) — для сравнения ответов
+        return Client(headers=self.auth)
+
+    async def test_sync_saves_notes(self):
+        nid = note_id()
+
+        response = await self.apost([{"id": nid, "subject": "Math", "text": "async"}])
+
+        self.assertEqual(response.status_code, 200)
+        data = await read(response)
+        self.assertEqual([note["id"] for note in data["notes"]], [nid])
+        self.assertEqual(data["conflicts"], [])
+        self.assertEqual((await Note.objects.aget(id=nid)).text, "async")
+
+    async def test_sync_ack_and_async_modes(self):
+        data = await read(await self.apost([{"id": note_id()}], '?response=ack'))
+        self.assertNotIn("text", data["notes"][0])
+
+        response = await self.apost([{"id": note_id()}], '?mode=async')
+        self.assertEqual(response.status_code, 202)
+        self.assertIn("jobId", await read(response))
+
+    def test_feed_matches_drf_view(self):
+        self.sync(self.drf_client, [{"id": note_id(), "updated_at": 100 + n} for n in range(3)])
+        query = '/api/notes/updates?since=0&limit=2'
+
+        expected = body(self.drf_client.get(query))
+        actual = body(self.client_for_async().get(query))
+
+        for data in (expected, actual):
+            data.pop("serverTime")
+        self.assertEqual(actual, expected)
+
+    async def test_streamed_feed(self):
+        await self.apost([{"id": note_id(), "updated_at": 100 + n} for n in range(3)])
+
+        response = await self.aget('/api/notes/updates?since=0')
+
+        self.assertTrue(response.streaming)
+        data = await read(response)
+        self.assertEqual(len(data["notes"]), 3)
+        self.assertIsNone(data["next_cursor"])
+
+    async def test_etag_not_modified(self):
+        first = await self.aget('/api/notes/updates?since=0&limit=5')
+
+        again = await self.aget('/api/notes/updates?since=0&limit=5', **{"If-None-Match": first['ETag']})
+
+        self.assertEqual(again.status_code, 304)
+
+    async def test_errors_match_drf(self):
+        anonymous = AsyncClient()
+        self.assertEqual((await anonymous.post('/api/notes/sync', {}, content_type='application/json')).status_code,
+                         403)
+        self.assertEqual((await anonymous.get('/api/notes/updates')).status_code, 403)
+        self.assertEqual((await self.aget('/api/notes/updates?since=x')).status_code, 400)
+        self.assertEqual((await self.aget('/api/notes/sync')).status_code, 405)
+        bad_json = await self.async_client.post('/api/notes/sync', '{', content_type='application/json',
+                                                headers=self.auth)
+        self.assertEqual(bad_json.status_code, 400)
+
+    def test_students_forbidden(self):
+        student, _ = self.make_user('student', groups=('students',))
+        token = PermanentToken.objects.get(user=student).token
+
+        response = self.client_for_async().post('/api/notes/sync', {"notes": [{"id": note_id()}]},
+                                                content_type='application/json',
+                                                headers={"Authorization": f"Bearer {token}"})
+
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Note.objects.exists())
+
+    async def test_throttled(self):
+        with mock.patch.dict(BucketThrottle.THROTTLE_RATES, {"sync": "1/min"}):
+            await self.apost([])
+            response = await self.apost([])
+
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+
+    async def test_idempotent_replay(self):
+        notes = [{"id": note_id()}]
+        first = await self.apost(notes, **{"Idempotency-Key": "k1"})
+        again = await self.apost(notes, **{"Idempotency-Key": "k1"})
+
+        self.assertEqual(again.content, first.content)
+        self.assertEqual(again['Idempotent-Replayed'], 'true')
+
+    async def test_event_stream_under_asgi(self):
+        response = await self.aget('/api/notes/events')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), b'retry: 3000\n\n')
+        await stream.aclose()
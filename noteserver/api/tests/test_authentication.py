@@ -0,0 +1,57 @@
+# journal/tests/test_authentication.py
+from rest_framework.test import APIClient
+
+from api.models import PermanentToken
+
+from .base import NotesAPITestCase
+
+
+class TokenCacheTests(NotesAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user, self.client = self.make_user('teacher')
+
+    def test_warm_token_costs_no_queries(self):
+        self.assertEqual(self.client.get('/api/user/group/').status_code, 200)
+
+        # Пользователь из кэша токенов, роли — из кэша ролей
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/user/group/')
+        self.assertEqual(response.json(), {"group": "teachers"})
+
+    def test_reset_token_invalidates_cached_token(self):
+        old = PermanentToken.objects.get(user=self.user).token
+        self.client.get('/api/user/group/')
+
+        new = self.client.post('/api/reset-token').json()["token"]
+
+        stale = APIClient()
+        stale.credentials(HTTP_AUTHORIZATION=f'Bearer {old}')
+        self.assertEqual(stale.get('/api/user/group/').status_code, 403)
+        fresh = APIClient()
+        fresh.credentials(HTTP_AUTHORIZATION=f'Bearer {new}')
+        self.assertEqual(fresh.get('/api/user/group/').status_code, 200)
+
+    def test_deleted_user_token_stops_working(self):
+        self.client.get('/api/user/group/')
+
+        self.user.delete()
+
+        self.assertEqual(self.client.get('/api/user/group/').status_code, 403)
+
+    def test_unknown_token_is_rejected(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Bearer nope')
+        response = client.get('/api/user/group/')
+
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.json(), {"detail": "Invalid token"})
+
+    def test_verify_token(self):
+        token = PermanentToken.objects.get(user=self.user).token
+
+        ok = APIClient().post('/api/verify-token', {"token": token}, format='json')
+        bad = APIClient().post('/api/verify-token', {"token": "nope"}, format='json')
+
+        self.assertEqual(ok.json(), {"success": True, "username": "teacher"})
+        self.assertEqual(bad.status_code, 400)
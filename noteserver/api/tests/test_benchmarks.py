@@ -0,0 +1,63 @@
+# journal/tests/test_benchmarks.py
+# Бенчмарки не входят в прогон тестов — проверяем, что обвязка и сценарии работают на малых размерах.
+from django.test import SimpleTestCase, override_settings
+
+from api.models import Note
+from benchmarks import bench_api, bench_serializers, bench_sync
+from benchmarks.harness import count_queries
+
+from .base import NotesAPITestCase
+
+
+class SummaryTests(SimpleTestCase):
+    def test_percentiles(self):
+        values = list(range(1, 101))
+
+        self.assertEqual(bench_api.percentile(values, 50), 51)
+        self.assertEqual(bench_api.percentile(values, 99), 99)
+        self.assertIsNone(bench_api.percentile([], 50))
+
+    def test_summarize_counts_errors(self):
+        samples = [{"ms": 1, "queries": 2, "status": 200}, {"ms": 3, "queries": 4, "status": 429}]
+
+        summary = bench_api.summarize(samples, elapsed=0.5)
+
+        self.assertEqual((summary["requests"], summary["errors"]), (2, 1))
+        self.assertEqual(summary["throughput_rps"], 4.0)
+        self.assertEqual(summary["queries_per_request"], 3)
+        self.assertEqual(summary["latency_ms"]["max"], 3)
+
+
+@override_settings(NOTES_THROTTLE_ENABLED=False)
+class BenchmarkRunTests(NotesAPITestCase):
+    def test_count_queries(self):
+        with count_queries() as counter:
+            list(Note.objects.all())
+            Note.objects.count()
+
+        self.assertEqual(counter.count, 2)
+
+    def test_sync_bulk_path_is_flat(self):
+        # 2 и 20 заметок — 2 и 10 групп сводки: приращения всё равно одним UPDATE
+        small, large = bench_sync.run([2, 20])
+
+        self.assertEqual(small["bulk_update"]["queries"], large["bulk_update"]["queries"])
+        self.assertGreater(large["legacy_update"]["queries"], large["bulk_update"]["queries"])
+        self.assertFalse(Note.objects.exists())
+
+    def test_serializer_paths_agree(self):
+        # run сам сверяет JSON старого и нового пути
+        result, = bench_serializers.run([15])
+
+        self.assertEqual(result["new"]["queries"], 1)
+
+    def test_api_scenarios(self):
+        accounts, delete_ids, now = bench_api.seed(users=2, notes=10, delete_pool=3)
+        scenarios = bench_api.make_scenarios(accounts, delete_ids, since=now - 5, sync_batch=2)
+
+        for name in ("notes/sync", "notes/updates", "notes/<uuid>/ DELETE"):
+            with self.subTest(name=name):
+                samples, _ = bench_api.run_requests(scenarios[name], requests=3, concurrency=1)
+
+                self.assertEqual([sample["status"] for sample in samples], [200] * 3)
+                self.assertTrue(all(sample["queries"] > 0 for sample in samples))
@@ -0,0 +1,91 @@
+# journal/tests/test_compression.py
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from api.fields import MARKER, compress_text, decompress_text
+from api.models import Note
+
+from .base import NotesAPITestCase, body, note_id
+
+LONG_TEXT = "Лекция: интегралы и производные. " * 200
+
+
+def stored_text(nid):
+    # Значение колонки как есть, мимо from_db_value
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT text FROM {Note._meta.db_table} WHERE id = %s",
+                       [Note._meta.pk.get_db_prep_value(nid, connection)])
+        return cursor.fetchone()[0]
+
+
+class CompressedTextTests(NotesAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user, self.client = self.make_user('teacher')
+
+    def test_long_text_stored_compressed_and_read_back(self):
+        nid = note_id()
+        self.sync(self.client, [{"id": nid, "text": LONG_TEXT}])
+
+        raw = stored_text(nid)
+        self.assertTrue(raw.startswith(MARKER + 'zlib:'))
+        self.assertLess(len(raw), len(LONG_TEXT))
+
+        note = Note.objects.get(id=nid)
+        self.assertEqual(note.text, LONG_TEXT)
+        self.assertEqual(note.text_length, len(LONG_TEXT))
+        feed = body(self.client.get('/api/notes/updates?since=0&limit=10'))
+        self.assertEqual(feed["notes"][0]["text"], LONG_TEXT)
+
+    def test_short_text_stored_plain(self):
+        nid = note_id()
+        self.sync(self.client, [{"id": nid, "text": "short"}])
+
+        self.assertEqual(stored_text(nid), "short")
+
+    def test_headers_feed_skips_text_column(self):
+        self.sync(self.client, [{"id": note_id(), "subject": "Math", "text": LONG_TEXT}])
+
+        with CaptureQueriesContext(connection) as captured:
+            data = body(self.client.get('/api/notes/updates?since=0&limit=10&fields=headers'))
+
+        note, = data["notes"]
+        self.assertNotIn("text", note)
+        self.assertEqual(note["subject"], "Math")
+        note_queries = [q["sql"] for q in captured if 'FROM "api_note"' in q["sql"]]
+        self.assertTrue(note_queries)
+        self.assertFalse(any('"api_note"."text"' in sql for sql in note_queries))
+
+    def test_bodies_endpoint(self):
+        nid, missing = note_id(), note_id()
+        self.sync(self.client, [{"id": nid, "text": LONG_TEXT}])
+
+        data = self.client.post('/api/notes/bodies', {"ids": [nid, missing]}, format='json').json()
+
+        self.assertEqual([(note["id"], note["text"]) for note in data["notes"]], [(nid, LONG_TEXT)])
+        self.assertEqual(set(data["notes"][0]), {"id", "text", "updated_at", "version"})
+        self.assertEqual(data["missing"], [missing])
+
+    @override_settings(NOTES_BODIES_MAX_IDS=2)
+    def test_bodies_rejects_bad_ids(self):
+        post = lambda ids: self.client.post('/api/notes/bodies', {"ids": ids}, format='json').status_code
+
+        self.assertEqual(post("not a list"), 400)
+        self.assertEqual(post([note_id() for _ in range(3)]), 400)
+        self.assertEqual(post(["nope"]), 400)
+
+
+class CompressTextTests(SimpleTestCase):
+    def test_round_trip(self):
+        for value in ("", "plain", LONG_TEXT, MARKER + "starts with marker", MARKER + "zlib:looks packed"):
+            with self.subTest(value=value[:20]):
+                self.assertEqual(decompress_text(compress_text(value)), value)
+
+    def test_incompressible_text_kept_as_is(self):
+        noise = ''.join(chr(0x4e00 + (i * 7919) % 20000) for i in range(3000))
+
+        self.assertEqual(compress_text(noise), noise)
+
+    def test_legacy_marker_string_read_as_is(self):
+        self.assertEqual(decompress_text(MARKER + "old"), MARKER + "old")
@@ -0,0 +1,154 @@
+# journal/tests/test_delete.py
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from api.models import Note, NoteTombstone
+from api.stats import rebuild_stats
+
+from .base import NotesAPITestCase, note_id, stats_rows
+
+
+class BatchDeleteTests(NotesAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user, self.client = self.make_user('teacher')
+        self.other, other_client = self.make_user('other')
+        self.mine = [note_id() for _ in range(3)]
+        self.theirs = note_id()
+        self.sync(self.client, [{"id": nid, "subject": "Math", "text": "abc"} for nid in self.mine])
+        self.sync(other_client, [{"id": self.theirs}])
+
+    def delete(self, ids, client=None):
+        return (client or self.client).post('/api/notes/delete', {"ids": ids}, format='json')
+
+    def test_statuses_per_id(self):
+        missing = note_id()
+
+        response = self.delete([self.mine[0], self.theirs, missing, self.mine[1], self.mine[0]])
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["deleted"], 2)
+        self.assertEqual(data["results"], [
+            {"id": self.mine[0], "status": "deleted"},
+            {"id": self.theirs, "status": "forbidden"},
+            {"id": missing, "status": "not_found"},
+            {"id": self.mine[1], "status": "deleted"},
+        ])
+        self.assertEqual(set(map(str, Note.objects.values_list('id', flat=True))), {self.mine[2], self.theirs})
+        self.assertCountEqual(map(str, NoteTombstone.objects.values_list('id', flat=True)), self.mine[:2])
+
+    def test_stats_follow_deletion(self):
+        self.delete(self.mine[:2])
+        after = stats_rows()
+
+        rebuild_stats()
+
+        self.assertEqual(after, stats_rows())
+
+    def test_query_count_does_not_grow_with_batch(self):
+        def queries(ids):
+            with CaptureQueriesContext(connection) as captured:
+                self.assertEqual(self.delete(ids).status_code, 200)
+            return len(captured)
+
+        more = [note_id() for _ in range(20)]
+        self.sync(self.client, [{"id": nid, "subject": "Math"} for nid in more])
+
+        self.assertEqual(queries(self.mine[:1]), queries(more))
+
+    def test_students_forbidden(self):
+        _, student = self.make_user('student', groups=('students',))
+
+        response = self.delete([self.mine[0]], student)
+
+        self.assertEqual(response.status_code, 403)
+        self.assertTrue(Note.objects.filter(id=self.mine[0]).exists())
+
+    @override_settings(NOTES_DELETE_MAX_IDS=2)
+    def test_rejects_bad_payloads(self):
+        self.assertEqual(self.delete(self.mine).status_code, 400)
+        self.assertEqual(self.delete("all").status_code, 400)
+        self.assertEqual(self.delete(["nope"]).status_code, 400)
+        self.assertEqual(Note.objects.count(), 4)
+
+
+class DeleteNoteTests(NotesAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user, self.client = self.make_user('teacher')
+        self.id = note_id()
+        self.sync(self.client, [{"id": self.id}])
+
+    def test_owner_deletes(self):
+        response = self.client.delete(f'/api/notes/{self.id}/')
+
+        self.assertEqual(response.json(), {"success": True, "id": self.id})
+        self.assertFalse(Note.objects.exists())
+        self.assertTrue(NoteTombstone.objects.filter(id=self.id).exists())
+
+    def test_other_user_forbidden_and_missing_404(self):
+        _, other = self.make_user('other')
+
+        self.assertEqual(other.delete(f'/api/notes/{self.id}/').status_code, 403)
+        self.assertEqual(self.client.delete(f'/api/notes/{note_id()}/').status_code, 404)
+        self.assertTrue(Note.objects.filter(id=self.id).exists())
+
+    def test_author_without_teacher_role(self):
+        # Роль снята после синхронизации — кэш ролей сбрасывается сигналом
+        self.user.groups.clear()
+
+        self.assertEqual(self.client.delete(f'/api/notes/{self.id}/').status_code, 403)
+        self.assertTrue(Note.objects.filter(id=self.id).exists())
+
+    def test_role_checked_before_lookup(self):
+        # IsTeacher срабатывает до поиска заметки: студенту 403 и на несуществующую
+        _, student = self.make_user('student', groups=('students',))
+
+        response = student.delete(f'/api/notes/{note_id()}/')
+
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.json(), {"error": "You do not have permission to perform this action"})
+
+
+class ModelDeletePathTests(NotesAPITestCase):
+    # Удаление и запись в обход API (shell, админка) ведут тот же учёт
+    def setUp(self):
+        super().setUp()
+        self.user, self.client = self.make_user('teacher')
+        self.ids = [note_id() for _ in range(3)]
+        self.sync(self.client, [{"id": nid, "subject": "Math", "text": "abc"} for nid in self.ids])
+
+    def assert_matches_rebuild(self):
+        incremental = stats_rows()
+        rebuild_stats()
+        self.assertEqual(incremental, stats_rows())
+
+    def test_instance_delete(self):
+        Note.objects.get(id=self.ids[0]).delete()
+
+        self.assertEqual(list(map(str, NoteTombstone.objects.values_list('id', flat=True))), [self.ids[0]])
+        self.assert_matches_rebuild()
+
+    def test_queryset_delete(self):
+        deleted, _ = Note.objects.filter(id__in=self.ids[:2]).delete()
+
+        self.assertEqual(deleted, 2)
+        self.assertCountEqual(map(str, NoteTombstone.objects.values_list('id', flat=True)), self.ids[:2])
+        self.assert_matches_rebuild()
+
+    def test_admin_delete_and_model_save(self):
+        admin, _ = self.make_user('admin', is_staff=True, is_superuser=True)
+        self.client.force_login(admin)
+        self.client.post('/admin/api/note/', {"action": "delete_selected", "_selected_action": self.ids[:2],
+                                              "post": "yes"})
+        note = Note.objects.get(id=self.ids[2])
+        note.subject = "Art"
+        note.text = "longer text"
+        note.save()
+
+        self.assertEqual(Note.objects.count(), 1)
+        self.assertEqual(NoteTombstone.objects.count(), 2)
+        self.assertEqual([row[1:3] for row in stats_rows()], [("Art", 1)])
+        self.assert_matches_rebuild()
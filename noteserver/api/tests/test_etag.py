@@ -0,0 +1,100 @@
+# journal/tests/test_etag.py
+import time
+
+from django.core.cache import cache
+from django.utils.http import http_date
+
+from api.sync import now_ms
+from api.tombstones import DAY_MS
+
+from .base import NotesAPITestCase, body, note_id
+
+FEED = '/api/notes/updates?since=0&limit=10'
+
+
+class ConditionalFeedTests(NotesAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user, self.client = self.make_user('teacher')
+        self.sync(self.client, [{"id": note_id()}])
+
+    def write(self, func, *args):
+        # Водяной знак сдвигается после коммита и с точностью до миллисекунды
+        time.sleep(0.002)
+        with self.captureOnCommitCallbacks(execute=True):
+            return func(*args)
+
+    def test_unchanged_feed_is_304(self):
+        first = self.client.get(FEED)
+
+        self.assertEqual(first.status_code, 200)
+        self.assertTrue(first['ETag'])
+        self.assertIn('Last-Modified', first)
+
+        again = self.client.get(FEED, HTTP_IF_NONE_MATCH=first['ETag'])
+
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again['ETag'], first['ETag'])
+        self.assertEqual(again.content, b'')
+
+    def test_streamed_feed_is_304(self):
+        first = self.client.get('/api/notes/updates?since=0')
+        body(first)
+
+        self.assertEqual(self.client.get('/api/notes/updates?since=0', HTTP_IF_NONE_MATCH=first['ETag']).status_code,
+                         304)
+
+    def test_sync_and_delete_change_etag(self):
+        etag = self.client.get(FEED)['ETag']
+        nid = note_id()
+        self.write(self.sync, self.client, [{"id": nid}])
+
+        response = self.client.get(FEED, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(nid, [note["id"] for note in body(response)["notes"]])
+
+        etag = response['ETag']
+        self.write(self.client.delete, f'/api/notes/{nid}/')
+
+        self.assertEqual(self.client.get(FEED, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_etag_depends_on_user_and_query(self):
+        _, other = self.make_user('other')
+        etag = self.client.get(FEED)['ETag']
+
+        self.assertEqual(other.get(FEED, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        self.assertEqual(self.client.get(FEED + '&fields=headers', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_if_modified_since(self):
+        self.write(self.sync, self.client, [{"id": note_id()}])
+        # Ответ — в следующей секунде после изменения
+        time.sleep(1.001 - time.time() % 1)
+        last_modified = self.client.get(FEED)['Last-Modified']
+
+        self.assertEqual(self.client.get(FEED, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+        self.write(self.sync, self.client, [{"id": note_id()}])
+        self.assertEqual(self.client.get(FEED, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 200)
+
+    def test_change_in_same_second_is_not_hidden(self):
+        # Last-Modified с точностью до секунды: запись в ту же секунду не должна дать 304
+        self.write(self.sync, self.client, [{"id": note_id()}])
+        same_second = http_date(now_ms() // 1000)
+
+        self.assertEqual(self.client.get(FEED, HTTP_IF_MODIFIED_SINCE=same_second).status_code, 200)
+
+    def test_lost_watermark_invalidates(self):
+        etag = self.client.get(FEED)['ETag']
+        time.sleep(0.002)
+        cache.clear()
+
+        self.assertEqual(self.client.get(FEED, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_full_resync_bypasses_304(self):
+        query = f'/api/notes/updates?since={now_ms() - 100 * DAY_MS}&limit=10'
+        etag = self.client.get(query)['ETag']
+
+        response = self.client.get(query, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(body(response)["fullResyncRequired"])
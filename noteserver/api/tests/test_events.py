@@ -0,0 +1,96 @@
+# journal/tests/test_events.py
+import asyncio
+import threading
+import time
+
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase, override_settings
+
+from api.notifier import InProcessNotifier
+
+from .base import NotesAPITestCase, note_id
+
+
+class PollUpdatesTests(NotesAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user, self.client = self.make_user('teacher')
+
+    def poll(self, query):
+        return self.client.get(f'/api/notes/poll{query}')
+
+    def test_returns_at_once_when_notes_changed(self):
+        self.sync(self.client, [{"id": note_id()}])
+
+        response = self.poll('?since=0&timeout=5')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()["changed"])
+
+    def test_deletion_counts_as_change(self):
+        nid = note_id()
+        self.sync(self.client, [{"id": nid}])
+        since = self.poll('?since=0').json()["serverTime"]
+        time.sleep(0.002)
+        self.assertFalse(self.poll(f'?since={since}&timeout=0').json()["changed"])
+
+        self.client.delete(f'/api/notes/{nid}/')
+
+        self.assertTrue(self.poll(f'?since={since}&timeout=0').json()["changed"])
+
+    @override_settings(NOTES_LONGPOLL_TIMEOUT=0.05)
+    def test_times_out_without_changes(self):
+        response = self.poll('?since=0&timeout=10')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.json()["changed"])
+
+    def test_rejects_bad_params(self):
+        self.assertEqual(self.poll('?since=abc').status_code, 400)
+        self.assertEqual(self.poll('?timeout=soon').status_code, 400)
+        self.assertEqual(self.poll('?timeout=nan').status_code, 400)
+        self.assertEqual(self.poll('?timeout=inf').status_code, 400)
+
+    def test_negative_timeout_returns_at_once(self):
+        started = time.monotonic()
+        response = self.poll(f'?since={self.poll("?timeout=0").json()["serverTime"]}&timeout=-5')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.json()["changed"])
+        self.assertLess(time.monotonic() - started, 1)
+
+    def test_requires_token(self):
+        # Как у DRF-представлений: 403
+        self.client.credentials()
+        self.assertEqual(self.poll('?timeout=0').status_code, 403)
+
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer wrong')
+        self.assertEqual(self.poll('?timeout=0').status_code, 403)
+
+
+class EventStreamTests(NotesAPITestCase):
+    def test_needs_asgi(self):
+        _, client = self.make_user('teacher')
+        self.assertEqual(client.get('/api/notes/events').status_code, 501)
+
+
+class InProcessNotifierTests(SimpleTestCase):
+    def test_publish_from_thread_wakes_waiter(self):
+        notifier = InProcessNotifier()
+
+        async def scenario():
+            version = notifier.version
+            loop = asyncio.get_running_loop()
+            loop.call_later(0.01, lambda: threading.Thread(target=notifier.publish, args=({"type": "sync"},)).start())
+            return await notifier.wait(version, 5)
+
+        self.assertEqual(async_to_sync(scenario)(), (1, {"type": "sync"}))
+
+    def test_missed_event_returned_immediately(self):
+        notifier = InProcessNotifier()
+        notifier.publish({"type": "delete"})
+
+        self.assertEqual(async_to_sync(notifier.wait)(0, 5), (1, {"type": "delete"}))
+
+    def test_wait_times_out(self):
+        self.assertIsNone(async_to_sync(InProcessNotifier().wait)(0, 0.01))
@@ -0,0 +1,77 @@
+# journal/tests/test_feed.py
+from django.test import override_settings
+
+from .base import NotesAPITestCase, body, note_id
+
+
+class UpdatesFeedTests(NotesAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user, self.client = self.make_user('teacher')
+
+    def fetch_all(self, query):
+        # Проходит ленту по next_cursor и возвращает id в порядке выдачи
+        seen = []
+        data = body(self.client.get(f'/api/notes/updates?{query}'))
+        while True:
+            seen += [note["id"] for note in data["notes"]]
+            if not data["next_cursor"]:
+                return seen
+            data = body(self.client.get(f'/api/notes/updates?{query}&cursor={data["next_cursor"]}'))
+
+    def test_cursor_never_skips_or_repeats_ties(self):
+        ids = [note_id() for _ in range(7)]
+        # Все заметки с одним updated_at — порядок держится только на id
+        self.sync(self.client, [{"id": i, "updated_at": 500} for i in ids])
+
+        self.assertEqual(self.fetch_all('since=0&limit=2'), sorted(ids))
+
+    def test_since_filters_older_notes(self):
+        old, new = note_id(), note_id()
+        self.sync(self.client, [{"id": old, "updated_at": 100}, {"id": new, "updated_at": 200}])
+
+        data = body(self.client.get('/api/notes/updates?since=100&limit=10'))
+
+        self.assertEqual([note["id"] for note in data["notes"]], [new])
+        self.assertIsNone(data["next_cursor"])
+
+    def test_without_limit_streams_whole_feed(self):
+        ids = [note_id() for _ in range(3)]
+        self.sync(self.client, [{"id": i, "updated_at": 100 + n} for n, i in enumerate(ids)])
+
+        response = self.client.get('/api/notes/updates?since=0')
+
+        self.assertTrue(response.streaming)
+        data = body(response)
+        self.assertTrue(data["success"])
+        self.assertEqual([note["id"] for note in data["notes"]], ids)
+        self.assertIsNone(data["next_cursor"])
+
+    def test_streamed_page_has_cursor(self):
+        self.sync(self.client, [{"id": note_id(), "updated_at": 100 + n} for n in range(3)])
+
+        response = self.client.get('/api/notes/updates?since=0&limit=2&stream=1')
+
+        self.assertTrue(response.streaming)
+        data = body(response)
+        self.assertEqual(len(data["notes"]), 2)
+        self.assertIsNotNone(data["next_cursor"])
+
+    @override_settings(NOTES_FEED_MAX_LIMIT=2)
+    def test_limit_is_capped(self):
+        self.sync(self.client, [{"id": note_id()} for _ in range(3)])
+
+        data = body(self.client.get('/api/notes/updates?since=0&limit=100'))
+
+        self.assertEqual(len(data["notes"]), 2)
+
+    def test_rejects_bad_parameters(self):
+        for query in ('since=x', 'limit=0', 'cursor=%%%'):
+            with self.subTest(query=query):
+                response = self.client.get(f'/api/notes/updates?{query}')
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("error", response.json())
+
+    def test_requires_authentication(self):
+        self.client.credentials()
+        self.assertEqual(self.client.get('/api/notes/updates').status_code, 403)
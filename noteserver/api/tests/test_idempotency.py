@@ -0,0 +1,98 @@
+# journal/tests/test_idempotency.py
+from unittest import mock
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api import idempotency
+from api.models import Note, SyncJob
+from api.throttling import BucketThrottle
+
+from .base import NotesAPITestCase, note_id
+
+
+class IdempotentSyncTests(NotesAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user, self.client = self.make_user('teacher')
+        self.notes = [{"id": note_id(), "text": "once"}]
+
+    def sync_with_key(self, key, notes=None, query='', client=None):
+        return self.sync(client or self.client, self.notes if notes is None else notes, query,
+                         HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_replay_returns_stored_response_without_writing(self):
+        first = self.sync_with_key('k1')
+
+        with CaptureQueriesContext(connection) as captured:
+            again = self.sync_with_key('k1')
+
+        self.assertEqual(again.status_code, 200)
+        self.assertEqual(again.content, first.content)
+        self.assertEqual(again['Idempotent-Replayed'], 'true')
+        self.assertNotIn('Idempotent-Replayed', first)
+        self.assertFalse([q for q in captured if 'api_note' in q["sql"]])
+        self.assertEqual(Note.objects.get().version, 1)
+
+    def test_same_key_different_body_is_422(self):
+        self.sync_with_key('k1')
+
+        other_body = self.sync_with_key('k1', [{"id": note_id()}])
+        other_mode = self.sync_with_key('k1', query='?response=ack')
+
+        self.assertEqual((other_body.status_code, other_mode.status_code), (422, 422))
+        self.assertEqual(Note.objects.count(), 1)
+
+    def test_request_in_flight_is_409(self):
+        digest = idempotency.request_digest(self.notes, False, False)
+        self.assertIsNone(idempotency.begin(self.user, 'k1', digest))
+
+        response = self.sync_with_key('k1')
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertFalse(Note.objects.exists())
+
+    def test_keys_are_per_user(self):
+        self.sync_with_key('shared')
+        _, other = self.make_user('other')
+
+        response = self.sync_with_key('shared', [{"id": note_id()}], client=other)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(Note.objects.count(), 2)
+
+    def test_rejects_bad_keys(self):
+        for key in ('', 'x' * 256, 'tab\tkey'):
+            with self.subTest(key=key):
+                self.assertEqual(self.sync_with_key(key).status_code, 400)
+        self.assertFalse(Note.objects.exists())
+
+    def test_throttled_request_can_be_retried(self):
+        notes = [{"id": note_id()} for _ in range(2)]
+        with mock.patch.dict(BucketThrottle.THROTTLE_RATES, {"sync_notes": "2/min"}):
+            # Квота на заметки исчерпана предыдущей пачкой
+            self.sync(self.client, [{"id": note_id()} for _ in range(2)])
+            self.assertEqual(self.sync_with_key('k1', notes).status_code, 429)
+
+        retry = self.sync_with_key('k1', notes)
+
+        self.assertEqual(retry.status_code, 200)
+        self.assertNotIn('Idempotent-Replayed', retry)
+        self.assertEqual(Note.objects.count(), 4)
+
+    def test_failed_request_releases_key(self):
+        with mock.patch('api.views.sync_notes_response', side_effect=RuntimeError("boom")), \
+                self.assertRaises(RuntimeError):
+            self.sync_with_key('k1')
+
+        self.assertEqual(self.sync_with_key('k1').status_code, 200)
+
+    def test_queued_batch_enqueued_once(self):
+        first = self.sync_with_key('k1', query='?mode=async')
+        again = self.sync_with_key('k1', query='?mode=async')
+
+        self.assertEqual(first.status_code, 202)
+        self.assertEqual(again.json()["jobId"], first.json()["jobId"])
+        self.assertEqual(SyncJob.objects.count(), 1)
@@ -0,0 +1,115 @@
+# journal/tests/test_jobs.py
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from api.jobs import claim_job, process_job, requeue_stale, retry_delay, run_pending
+from api.models import Note, SyncJob
+from api.sync import now_ms
+
+from .base import NotesAPITestCase, note_id
+
+
+class AsyncSyncTests(NotesAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user, self.client = self.make_user('teacher')
+
+    def enqueue(self, notes, query='?mode=async', **extra):
+        response = self.sync(self.client, notes, query, **extra)
+        self.assertEqual(response.status_code, 202)
+        return response.json()["jobId"]
+
+    def job_status(self, job_id, client=None):
+        return (client or self.client).get(f'/api/notes/sync/jobs/{job_id}')
+
+    def test_queues_and_worker_applies(self):
+        nid = note_id()
+        job_id = self.enqueue([{"id": nid, "text": "queued"}])
+
+        self.assertFalse(Note.objects.filter(id=nid).exists())
+        self.assertEqual(self.job_status(job_id).json()["status"], SyncJob.PENDING)
+
+        self.assertEqual(run_pending(), 1)
+
+        data = self.job_status(job_id).json()
+        self.assertEqual(data["status"], SyncJob.DONE)
+        self.assertEqual([note["id"] for note in data["result"]["notes"]], [nid])
+        self.assertEqual(Note.objects.get(id=nid).text, "queued")
+        self.assertEqual(SyncJob.objects.get(id=job_id).payload, [])
+
+    def test_prefer_header_and_ack_mode(self):
+        job_id = self.enqueue([{"id": note_id(), "text": "x"}], query='?response=ack',
+                              HTTP_PREFER='respond-async')
+        run_pending()
+
+        note, = self.job_status(job_id).json()["result"]["notes"]
+        self.assertNotIn("text", note)
+
+    def test_job_visible_only_to_owner(self):
+        job_id = self.enqueue([{"id": note_id()}])
+        _, stranger = self.make_user('stranger')
+
+        self.assertEqual(self.job_status(job_id, stranger).status_code, 404)
+
+    def test_jobs_run_oldest_first(self):
+        first = self.enqueue([{"id": note_id()}])
+        self.enqueue([{"id": note_id()}])
+
+        self.assertEqual(str(claim_job().id), first)
+
+    @override_settings(SYNC_JOBS={'MAX_ATTEMPTS': 2, 'STALE_AFTER': 300, 'RETRY_BACKOFF': 5, 'RETRY_BACKOFF_MAX': 300})
+    def test_failure_backs_off_then_fails(self):
+        job_id = self.enqueue([{"id": note_id()}])
+
+        with mock.patch('api.jobs.apply_sync_batch', side_effect=RuntimeError("db down")), \
+                self.assertLogs('api.jobs', 'ERROR'):
+            job = process_job(claim_job())
+            self.assertEqual(job.status, SyncJob.PENDING)
+            self.assertGreaterEqual(job.run_after, now_ms() + 4000)
+            # Пауза ещё не вышла — задачу не берут
+            self.assertIsNone(claim_job())
+
+            SyncJob.objects.filter(id=job_id).update(run_after=0)
+            job = process_job(claim_job())
+
+        self.assertEqual(job.status, SyncJob.FAILED)
+        data = self.job_status(job_id).json()
+        self.assertEqual((data["status"], data["error"]), (SyncJob.FAILED, "db down"))
+        self.assertIsNotNone(data["finishedAt"])
+
+    def test_requeue_stale_running_jobs(self):
+        job_id = self.enqueue([{"id": note_id()}])
+        claim_job()
+        now = now_ms()
+
+        self.assertEqual(requeue_stale(now), 0)
+        self.assertEqual(requeue_stale(now + 301 * 1000), 1)
+        self.assertEqual(SyncJob.objects.get(id=job_id).status, SyncJob.PENDING)
+
+    def test_stale_job_fails_after_max_attempts(self):
+        job_id = self.enqueue([{"id": note_id()}])
+        claim_job()
+        SyncJob.objects.filter(id=job_id).update(attempts=3)
+
+        with self.assertLogs('api.jobs', 'ERROR'):
+            self.assertEqual(requeue_stale(now_ms() + 301 * 1000), 0)
+
+        job = SyncJob.objects.get(id=job_id)
+        self.assertEqual(job.status, SyncJob.FAILED)
+        self.assertTrue(job.error)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_students_cannot_enqueue(self):
+        _, student = self.make_user('student', groups=('students',))
+
+        response = self.sync(student, [{"id": note_id()}], '?mode=async')
+
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(SyncJob.objects.exists())
+
+
+@override_settings(SYNC_JOBS={'RETRY_BACKOFF': 5, 'RETRY_BACKOFF_MAX': 30})
+class RetryDelayTests(SimpleTestCase):
+    def test_exponential_with_cap(self):
+        self.assertEqual([retry_delay(n) for n in (1, 2, 3, 4, 5)], [5000, 10000, 20000, 30000, 30000])
@@ -0,0 +1,104 @@
+# journal/tests/test_login.py
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api import passwords
+from api.models import PermanentToken
+from api.passwords import PasswordCheckBusy
+
+from .base import NotesAPITestCase
+
+PASSWORD = 'correct horse'
+
+
+class LoginTests(NotesAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('teacher', password=PASSWORD)
+        self.client = APIClient()
+
+    def login(self, username='teacher', password=PASSWORD):
+        return self.client.post('/api/custom-login', {"username": username, "password": password}, format='json')
+
+    def test_returns_existing_token(self):
+        token = PermanentToken.objects.create(user=self.user)
+
+        with CaptureQueriesContext(connection) as captured:
+            response = self.login()
+
+        self.assertEqual(response.json(), {"success": True, "token": token.token, "username": "teacher"})
+        # Пользователь с токеном — одним запросом
+        self.assertEqual(len([q for q in captured if 'permanenttoken' in q["sql"].lower()]), 1)
+
+    def test_creates_missing_token(self):
+        response = self.login()
+
+        self.assertEqual(response.json()["token"], PermanentToken.objects.get(user=self.user).token)
+
+    def test_rejects_bad_credentials(self):
+        for username, password in (('teacher', 'wrong'), ('nobody', PASSWORD), ('teacher', None)):
+            with self.subTest(username=username, password=password):
+                response = self.login(username, password)
+
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {"success": False, "error": "Invalid credentials"})
+
+    def test_legacy_hash_upgraded_on_login(self):
+        User.objects.filter(pk=self.user.pk).update(password=make_password(PASSWORD, hasher='pbkdf2_sha1'))
+
+        self.assertEqual(self.login().status_code, 200)
+
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('scrypt$'))
+        self.assertEqual(self.login().status_code, 200)
+
+    def test_busy_hash_pool_is_503(self):
+        with mock.patch('api.views.check_credentials', side_effect=PasswordCheckBusy):
+            response = self.login()
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+
+
+@override_settings(LOGIN_MAX_PENDING=1, LOGIN_QUEUE_TIMEOUT=0.01)
+class PasswordCheckLimitTests(NotesAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('teacher', password=PASSWORD)
+        # Семафоры создаются один раз на процесс — на время теста свои, по настройкам теста
+        for name in ('_slots', '_hashing'):
+            patcher = mock.patch.object(passwords, name, None)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_full_queue_is_busy(self):
+        slots, _ = passwords._limits()
+        slots.acquire()
+        try:
+            with self.assertRaises(PasswordCheckBusy):
+                passwords.check_credentials(None, 'teacher', PASSWORD)
+        finally:
+            slots.release()
+
+        self.assertEqual(passwords.check_credentials(None, 'teacher', PASSWORD), self.user)
+
+    def test_busy_hashing_times_out(self):
+        _, hashing = passwords._limits()
+        for _ in range(settings.LOGIN_HASH_WORKERS):
+            hashing.acquire()
+        try:
+            with self.assertRaises(PasswordCheckBusy):
+                passwords.check_credentials(None, 'teacher', PASSWORD)
+        finally:
+            for _ in range(settings.LOGIN_HASH_WORKERS):
+                hashing.release()
+
+        # Место в очереди вернулось и после отказа
+        self.assertEqual(passwords.check_credentials(None, 'teacher', PASSWORD), self.user)
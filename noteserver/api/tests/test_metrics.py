@@ -0,0 +1,78 @@
+# journal/tests/test_metrics.py
+from django.test import SimpleTestCase, override_settings
+
+from api.metrics import MetricsRegistry, registry
+
+from .base import NotesAPITestCase, note_id
+
+
+class MetricsEndpointTests(NotesAPITestCase):
+    def setUp(self):
+        super().setUp()
+        registry.reset()
+        self.admin, self.admin_client = self.make_user('admin', is_staff=True)
+        self.user, self.client = self.make_user('teacher')
+
+    def test_records_requests_per_route(self):
+        self.sync(self.client, [{"id": note_id()}])
+
+        response = self.admin_client.get('/api/metrics')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        text = response.content.decode()
+        self.assertIn('noteserver_responses_total{route="api/notes/sync",method="POST",status="200"} 1', text)
+        self.assertIn('noteserver_db_queries_count{route="api/notes/sync",method="POST"} 1', text)
+        self.assertIn('noteserver_request_duration_seconds_bucket{route="api/notes/sync",method="POST",le="+Inf"} 1', text)
+
+    def test_admin_only(self):
+        self.assertEqual(self.client.get('/api/metrics').status_code, 403)
+
+    @override_settings(REQUEST_METRICS_ENABLED=False)
+    def test_disabled(self):
+        self.sync(self.client, [{"id": note_id()}])
+
+        self.assertNotIn('api/notes/sync', self.admin_client.get('/api/metrics').content.decode())
+
+
+class ProfileParamTests(NotesAPITestCase):
+    def test_staff_gets_profile_dump(self):
+        _, client = self.make_user('admin', is_staff=True)
+
+        response = client.get('/api/notes/updates?since=0&limit=10&profile=1')
+
+        data = response.json()
+        self.assertEqual(data["status"], 200)
+        self.assertEqual(data["path"], '/api/notes/updates')
+        self.assertTrue(data["queries"])
+        self.assertIn('function calls', data["profile"])
+
+    def test_ignored_for_other_users(self):
+        _, client = self.make_user('teacher')
+
+        data = client.get('/api/notes/updates?since=0&limit=10&profile=1').json()
+
+        self.assertIn("notes", data)
+        self.assertNotIn("profile", data)
+
+    def test_ignored_with_bad_token(self):
+        response = self.client.get('/api/notes/updates?since=0&profile=1', HTTP_AUTHORIZATION='Bearer nope')
+
+        self.assertEqual(response.status_code, 403)
+        self.assertNotIn("profile", response.json())
+
+
+class MetricsRegistryTests(SimpleTestCase):
+    def test_histogram_buckets_are_cumulative(self):
+        metrics = MetricsRegistry()
+        for queries in (0, 2, 2, 700):
+            metrics.observe_request('r', 'GET', 200, {'noteserver_db_queries': queries})
+
+        text = metrics.render()
+
+        self.assertIn('noteserver_db_queries_bucket{route="r",method="GET",le="0"} 1', text)
+        self.assertIn('noteserver_db_queries_bucket{route="r",method="GET",le="2"} 3', text)
+        self.assertIn('noteserver_db_queries_bucket{route="r",method="GET",le="500"} 3', text)
+        self.assertIn('noteserver_db_queries_bucket{route="r",method="GET",le="+Inf"} 4', text)
+        self.assertIn('noteserver_db_queries_sum{route="r",method="GET"} 704', text)
+        self.assertIn('noteserver_responses_total{route="r",method="GET",status="200"} 4', text)
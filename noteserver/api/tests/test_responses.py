@@ -0,0 +1,82 @@
+# journal/tests/test_responses.py
+import gzip
+import json
+
+from api.middleware import brotli
+
+from .base import NotesAPITestCase, body, note_id
+
+
+class SyncResponseModeTests(NotesAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user, self.client = self.make_user('teacher')
+
+    def test_ack_mode_returns_only_acknowledgement_fields(self):
+        for query, headers in (('?response=ack', {}), ('', {'HTTP_PREFER': 'return=minimal'})):
+            with self.subTest(query=query, headers=headers):
+                response = self.sync(self.client, [{"id": note_id(), "text": "long body"}], query, **headers)
+
+                note, = response.json()["notes"]
+                self.assertEqual(set(note), {"id", "updated_at", "uploaded_at", "version"})
+
+    def test_full_mode_echoes_notes(self):
+        response = self.sync(self.client, [{"id": note_id(), "subject": "Math", "text": "body"}])
+
+        note, = response.json()["notes"]
+        self.assertEqual(note["text"], "body")
+        self.assertEqual(note["author_username"], "teacher")
+
+
+class FeedFieldSelectionTests(NotesAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user, self.client = self.make_user('teacher')
+        self.sync(self.client, [{"id": note_id(), "subject": "Math", "text": "body"}])
+
+    def test_fields_selector(self):
+        data = body(self.client.get('/api/notes/updates?since=0&limit=10&fields=subject,updated_at'))
+
+        self.assertEqual(set(data["notes"][0]), {"id", "subject", "updated_at"})
+
+    def test_headers_shortcut_drops_text(self):
+        data = body(self.client.get('/api/notes/updates?since=0&limit=10&fields=headers'))
+
+        self.assertNotIn("text", data["notes"][0])
+        self.assertIn("author_username", data["notes"][0])
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get('/api/notes/updates?since=0&fields=password')
+
+        self.assertEqual(response.status_code, 400)
+
+
+class CompressionTests(NotesAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user, self.client = self.make_user('teacher')
+        self.sync(self.client, [{"id": note_id(), "subject": "Math", "text": "lorem ipsum " * 50} for _ in range(5)])
+
+    def test_gzip(self):
+        response = self.client.get('/api/notes/updates?since=0&limit=10', HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(len(body_of(response, gzip.decompress)["notes"]), 5)
+
+    def test_brotli_preferred_when_available(self):
+        if brotli is None:
+            self.skipTest("brotli is not installed")
+        response = self.client.get('/api/notes/updates?since=0&limit=10', HTTP_ACCEPT_ENCODING='gzip, br')
+
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(len(body_of(response, brotli.decompress)["notes"]), 5)
+
+    def test_token_responses_are_not_compressed(self):
+        response = self.client.post('/api/reset-token', HTTP_ACCEPT_ENCODING='gzip, br')
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+
+def body_of(response, decompress):
+    raw = b''.join(response.streaming_content) if response.streaming else response.content
+    return json.loads(decompress(raw))
@@ -0,0 +1,53 @@
+# journal/tests/test_roles.py
+from django.contrib.auth.models import Group
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.models import Note
+
+from .base import NotesAPITestCase, note_id
+
+
+class RoleTests(NotesAPITestCase):
+    def test_student_cannot_sync(self):
+        _, client = self.make_user('student', groups=('students',))
+
+        response = self.sync(client, [{"id": note_id()}])
+
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.json(), {"error": "Forbidden: Students cannot sync notes to server"})
+        self.assertFalse(Note.objects.exists())
+
+    def test_membership_change_invalidates_cached_roles(self):
+        user, client = self.make_user('teacher')
+        self.assertEqual(self.sync(client, [{"id": note_id()}]).status_code, 200)
+
+        user.groups.add(Group.objects.get_or_create(name='students')[0])
+
+        self.assertEqual(self.sync(client, [{"id": note_id()}]).status_code, 403)
+
+    def test_group_side_change_invalidates_cached_roles(self):
+        user, client = self.make_user('teacher')
+        self.assertEqual(client.get('/api/user/group/').json(), {"group": "teachers"})
+
+        Group.objects.get(name='teachers').user_set.clear()
+
+        self.assertEqual(client.get('/api/user/group/').json(), {"group": None})
+
+    def test_only_teachers_delete(self):
+        user, client = self.make_user('plain', groups=())
+        self.sync(client, [{"id": (own := note_id())}])
+
+        response = client.delete(f'/api/notes/{own}/')
+
+        self.assertEqual(response.status_code, 403)
+        self.assertTrue(Note.objects.filter(id=own).exists())
+
+    def test_sync_does_not_query_groups(self):
+        _, client = self.make_user('teacher')
+        self.sync(client, [{"id": note_id()}])
+
+        # Роли уже в кэше: проверка IsNotStudent не ходит в auth_user_groups
+        with CaptureQueriesContext(connection) as captured:
+            self.assertEqual(self.sync(client, [{"id": note_id()}]).status_code, 200)
+        self.assertFalse([query for query in captured if 'auth_user_groups' in query['sql']])
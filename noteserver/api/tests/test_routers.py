@@ -0,0 +1,93 @@
+# journal/tests/test_routers.py
+# Реплики в тестовых настройках нет: включаем её подменой replica_enabled и проверяем
+# решения роутера, не выполняя запросов к алиасу replica.
+import contextvars
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.test import RequestFactory, SimpleTestCase
+
+from api import routers, watermark
+from api.middleware import PrimaryPinMiddleware
+from api.models import Note
+from api.routers import REPLICA_DATABASE, PrimaryReplicaRouter
+from api.sync import now_ms
+
+from .base import NotesAPITestCase, note_id
+
+
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.router = PrimaryReplicaRouter()
+        for target in ('api.routers.replica_enabled', 'api.watermark.replica_enabled'):
+            patcher = mock.patch(target, return_value=True)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def run(self, result=None):
+        # Флаг use_primary — ContextVar: каждый тест в своём контексте, как отдельный запрос
+        return contextvars.copy_context().run(super().run, result)
+
+    def test_reads_go_to_replica_and_writes_to_default(self):
+        self.assertEqual(self.router.db_for_read(Note), REPLICA_DATABASE)
+        self.assertEqual(self.router.db_for_write(Note), DEFAULT_DB_ALIAS)
+
+    def test_without_replica_everything_on_default(self):
+        with mock.patch('api.routers.replica_enabled', return_value=False):
+            routers.mark_written(1)
+
+            self.assertEqual(self.router.db_for_read(Note), DEFAULT_DB_ALIAS)
+            self.assertIsNone(cache.get(routers._key(1)))
+
+    def test_writer_reads_own_writes(self):
+        routers.mark_written(1)
+
+        self.assertEqual(self.router.db_for_read(Note), DEFAULT_DB_ALIAS)
+
+    def test_sticky_mark_pins_next_request(self):
+        contextvars.copy_context().run(routers.mark_written, 1)
+        self.assertEqual(self.router.db_for_read(Note), REPLICA_DATABASE)
+
+        self.assertFalse(routers.pin_if_recent_writer(2))
+        self.assertEqual(self.router.db_for_read(Note), REPLICA_DATABASE)
+        self.assertTrue(routers.pin_if_recent_writer(1))
+        self.assertEqual(self.router.db_for_read(Note), DEFAULT_DB_ALIAS)
+
+    def test_fresh_watermark_pins_feed_read(self):
+        watermark.pin_if_recent(now_ms() - 60 * 1000)
+        self.assertEqual(self.router.db_for_read(Note), REPLICA_DATABASE)
+
+        watermark.pin_if_recent(now_ms())
+        self.assertEqual(self.router.db_for_read(Note), DEFAULT_DB_ALIAS)
+
+    def test_middleware_scopes_pin_to_request(self):
+        seen = []
+
+        def view(request):
+            seen.append(self.router.db_for_read(Note))
+            routers.use_primary()
+            seen.append(self.router.db_for_read(Note))
+            return None
+
+        # Флаг, оставшийся в потоке от прошлого запроса, новый запрос не видит
+        routers.use_primary()
+        PrimaryPinMiddleware(view)(RequestFactory().get('/'))
+
+        self.assertEqual(seen, [REPLICA_DATABASE, DEFAULT_DB_ALIAS])
+        self.assertEqual(self.router.db_for_read(Note), DEFAULT_DB_ALIAS)
+
+
+class StickyAfterWriteTests(NotesAPITestCase):
+    def test_sync_and_delete_mark_writer(self):
+        user, client = self.make_user('teacher')
+        nid = note_id()
+
+        with mock.patch('api.routers.replica_enabled', return_value=True):
+            self.sync(client, [{"id": nid}])
+            self.assertTrue(cache.get(routers._key(user.pk)))
+
+            cache.clear()
+            client.delete(f'/api/notes/{nid}/')
+            self.assertTrue(cache.get(routers._key(user.pk)))
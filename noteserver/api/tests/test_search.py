@@ -0,0 +1,102 @@
+# journal/tests/test_search.py
+import importlib
+from io import StringIO
+
+from django.apps import apps
+from django.core.management import call_command
+from django.db import connection
+
+from api import search
+
+from .base import NotesAPITestCase, note_id
+
+backfill = importlib.import_module('api.migrations.0014_note_search_backfill')
+
+
+class SearchNotesTests(NotesAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user, self.client = self.make_user('teacher')
+        self.other, other_client = self.make_user('other')
+        self.algebra, self.poem, self.theirs = note_id(), note_id(), note_id()
+        self.sync(self.client, [
+            {"id": self.algebra, "subject": "Math", "text": "quadratic equations homework"},
+            {"id": self.poem, "subject": "Literature", "text": "a poem about equations"},
+        ])
+        self.sync(other_client, [{"id": self.theirs, "subject": "Math", "text": "equations quiz"}])
+
+    def search(self, query):
+        response = self.client.get(f'/api/notes/search?{query}')
+        self.assertEqual(response.status_code, 200)
+        return [note["id"] for note in response.json()["results"]]
+
+    def test_finds_by_text_and_subject(self):
+        self.assertEqual(self.search('q=quadratic'), [self.algebra])
+        self.assertCountEqual(self.search('q=math'), [self.algebra, self.theirs])
+
+    def test_prefix_of_last_word(self):
+        self.assertEqual(self.search('q=quadr'), [self.algebra])
+
+    def test_filters_by_author_and_subject(self):
+        self.assertCountEqual(self.search(f'q=equations&author={self.user.pk}'), [self.algebra, self.poem])
+        self.assertCountEqual(self.search('q=equations&subject=Math'), [self.algebra, self.theirs])
+
+    def test_pages_by_offset(self):
+        first = self.client.get('/api/notes/search?q=equations&limit=2').json()
+        second = self.client.get(f'/api/notes/search?q=equations&limit=2&offset={first["next_offset"]}').json()
+
+        ids = [note["id"] for note in first["results"] + second["results"]]
+        self.assertCountEqual(ids, [self.algebra, self.poem, self.theirs])
+        self.assertIsNone(second["next_offset"])
+
+    def test_reflects_updates_and_deletes(self):
+        self.sync(self.client, [{"id": self.algebra, "subject": "Math", "text": "geometry"}])
+        self.client.delete(f'/api/notes/{self.poem}/')
+
+        self.assertEqual(self.search('q=quadratic'), [])
+        self.assertEqual(self.search('q=geometry'), [self.algebra])
+        self.assertEqual(self.search(f'q=equations&author={self.user.pk}'), [])
+
+    def test_finds_long_compressed_text(self):
+        long_id = note_id()
+        self.sync(self.client, [{"id": long_id, "text": "filler " * 1000 + "needle"}])
+
+        self.assertEqual(self.search('q=needle'), [long_id])
+
+    def test_punctuation_does_not_break_query(self):
+        self.assertEqual(self.search('q=%22quadratic%22%20('), [self.algebra])
+        self.assertEqual(self.search('q=%2A%2A'), [])
+
+    def test_rejects_bad_params(self):
+        self.assertEqual(self.client.get('/api/notes/search').status_code, 400)
+        self.assertEqual(self.client.get('/api/notes/search?q=x&author=me').status_code, 400)
+
+
+class SearchIndexMaintenanceTests(NotesAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user, self.client = self.make_user('teacher')
+        self.id = note_id()
+        self.sync(self.client, [{"id": self.id, "text": "photosynthesis"}])
+        if search._backend(connection) is None:
+            self.skipTest("no full-text index on this database")
+
+    def drop_index(self):
+        with connection.cursor() as cursor:
+            table = search.POSTGRES_TABLE if connection.vendor == 'postgresql' else search.SQLITE_TABLE
+            cursor.execute(f"DELETE FROM {table}")
+        self.assertEqual(search.search_notes('photosynthesis'), [])
+
+    def test_rebuild_command(self):
+        self.drop_index()
+
+        call_command('rebuild_search_index', stdout=StringIO())
+
+        self.assertEqual([str(pk) for pk, _ in search.search_notes('photosynthesis')], [self.id])
+
+    def test_backfill_migration_indexes_existing_notes(self):
+        self.drop_index()
+
+        backfill.backfill_search_index(apps, type('SchemaEditor', (), {'connection': connection})())
+
+        self.assertEqual([str(pk) for pk, _ in search.search_notes('photosynthesis')], [self.id])
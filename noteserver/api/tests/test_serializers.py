@@ -0,0 +1,52 @@
+# journal/tests/test_serializers.py
+import json
+import uuid
+from unittest import mock
+
+from django.db import connection
+from django.test import SimpleTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+
+from api import renderers
+from api.models import Note
+from api.serializers import NoteRowMapper, NoteSerializer
+
+from .base import NotesAPITestCase, body, note_id
+
+
+class NoteRowMapperTests(NotesAPITestCase):
+    def test_same_shape_as_model_serializer(self):
+        user, client = self.make_user('teacher')
+        self.sync(client, [{"id": note_id(), "subject": "Math", "text": "ü body", "updated_at": 7}])
+        note = Note.objects.get()
+
+        mapper = NoteRowMapper()
+        row, = mapper.rows(Note.objects.all())
+
+        self.assertEqual(mapper.to_dict(row), NoteSerializer(note).data)
+
+    def test_feed_page_has_no_per_author_queries(self):
+        def page_queries(authors):
+            for n in range(authors):
+                _, client = self.make_user(f'author-{authors}-{n}')
+                self.sync(client, [{"id": note_id()}])
+            _, reader = self.make_user(f'reader-{authors}')
+            reader.get('/api/user/group/')
+            with CaptureQueriesContext(connection) as captured:
+                data = body(reader.get('/api/notes/updates?since=0&limit=100'))
+            self.assertTrue(all(note["author_username"] for note in data["notes"]))
+            return len(captured)
+
+        self.assertEqual(page_queries(2), page_queries(10))
+
+
+class DumpsTests(SimpleTestCase):
+    data = {"id": uuid.UUID(int=1), "text": "привет", "n": [1, None, True]}
+
+    def test_matches_drf_json_renderer(self):
+        self.assertEqual(json.loads(renderers.dumps(self.data)), json.loads(JSONRenderer().render(self.data)))
+
+    def test_falls_back_without_orjson(self):
+        with mock.patch.object(renderers, 'orjson', None):
+            self.assertEqual(renderers.dumps(self.data), JSONRenderer().render(self.data))
@@ -0,0 +1,139 @@
+# journal/tests/test_stats.py
+import random
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.models import NoteStats
+from api.stats import rebuild_stats, update_stats
+
+from .base import NotesAPITestCase, note_id, stats_rows
+
+SUBJECTS = ("Math", "Art", "History")
+
+
+class StatsMaintenanceTests(NotesAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user, self.client = self.make_user('teacher')
+        self.other, self.other_client = self.make_user('other')
+
+    def assert_matches_rebuild(self):
+        incremental = stats_rows()
+        rebuild_stats()
+        self.assertEqual(incremental, stats_rows())
+
+    def test_random_writes_match_rebuild(self):
+        rng = random.Random(23)
+        ids = [note_id() for _ in range(12)]
+        clients = [self.client, self.other_client]
+        for step in range(40):
+            action = rng.choice(("sync", "sync", "delete", "batch_delete"))
+            client = rng.choice(clients)
+            if action == "sync":
+                # Перезапись меняет предмет, длину и время, а чужой id переходит к отправителю
+                notes = [{"id": nid, "subject": rng.choice(SUBJECTS), "text": "x" * rng.randint(0, 40),
+                          "updated_at": rng.randint(1, 1000)} for nid in rng.sample(ids, rng.randint(1, 4))]
+                self.sync(client, notes)
+            elif action == "delete":
+                client.delete(f'/api/notes/{rng.choice(ids)}/')
+            else:
+                client.post('/api/notes/delete', {"ids": rng.sample(ids, 3)}, format='json')
+            with self.subTest(step=step, action=action):
+                self.assert_matches_rebuild()
+
+    def test_text_size_counts_characters_not_storage(self):
+        text = "Урок " * 1000
+        self.sync(self.client, [{"id": note_id(), "subject": "Math", "text": text}])
+
+        self.assertEqual(NoteStats.objects.get().text_size, len(text))
+
+    def test_last_updated_falls_back_when_latest_deleted(self):
+        old, new = note_id(), note_id()
+        self.sync(self.client, [{"id": old, "subject": "Math", "updated_at": 100},
+                                {"id": new, "subject": "Math", "updated_at": 200}])
+
+        self.client.delete(f'/api/notes/{new}/')
+
+        self.assertEqual(NoteStats.objects.get().last_updated_at, 100)
+
+    def test_emptied_group_removed(self):
+        nid = note_id()
+        self.sync(self.client, [{"id": nid, "subject": "Math"}])
+        self.sync(self.client, [{"id": nid, "subject": "Art"}])
+
+        self.assertEqual(list(NoteStats.objects.values_list('subject', 'note_count')), [("Art", 1)])
+
+    def test_query_count_does_not_grow_with_subjects(self):
+        def queries(subjects):
+            rows = [(self.user.pk, f"S{n}", 5, 100) for n in range(subjects)]
+            update_stats(added=rows)
+            moved = [(self.user.pk, f"T{n}", 3, 50) for n in range(subjects)]
+            with CaptureQueriesContext(connection) as context:
+                # Перенос: группы S теряют строку с максимумом и пустеют, группы T создаются
+                update_stats(removed=rows, added=moved)
+            return len(context.captured_queries)
+
+        few = queries(3)
+        NoteStats.objects.all().delete()
+        many = queries(40)
+
+        self.assertEqual(few, many)
+        self.assertEqual(NoteStats.objects.count(), 40)
+
+    def test_rebuild_command(self):
+        self.sync(self.client, [{"id": note_id(), "subject": s} for s in SUBJECTS])
+        expected = stats_rows()
+        NoteStats.objects.all().delete()
+
+        call_command('rebuild_note_stats', stdout=StringIO())
+
+        self.assertEqual(stats_rows(), expected)
+
+
+class StatsEndpointTests(NotesAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user, self.client = self.make_user('teacher')
+        self.other, other_client = self.make_user('other')
+        self.sync(self.client, [
+            {"id": note_id(), "subject": "Math", "text": "abc", "updated_at": 10},
+            {"id": note_id(), "subject": "Math", "text": "de", "updated_at": 20},
+            {"id": note_id(), "subject": "Art", "text": "f", "updated_at": 30},
+        ])
+        self.sync(other_client, [{"id": note_id(), "subject": "Math", "text": "ghij", "updated_at": 40}])
+
+    def stats(self, query=''):
+        response = self.client.get(f'/api/notes/stats{query}')
+        self.assertEqual(response.status_code, 200)
+        return response.json()["stats"]
+
+    def test_rows_per_author_and_subject(self):
+        self.assertEqual(self.stats(f'?author={self.user.pk}'), [
+            {"author_id": self.user.pk, "author__username": "teacher", "subject": "Art",
+             "note_count": 1, "text_size": 1, "last_updated_at": 30},
+            {"author_id": self.user.pk, "author__username": "teacher", "subject": "Math",
+             "note_count": 2, "text_size": 5, "last_updated_at": 20},
+        ])
+
+    def test_group_by_subject(self):
+        self.assertEqual(self.stats('?group_by=subject'), [
+            {"subject": "Art", "note_count": 1, "text_size": 1, "last_updated_at": 30},
+            {"subject": "Math", "note_count": 3, "text_size": 9, "last_updated_at": 40},
+        ])
+
+    def test_group_by_author_with_subject_filter(self):
+        rows = self.stats('?group_by=author&subject=Math')
+
+        self.assertEqual([(row["author__username"], row["note_count"]) for row in rows], [("teacher", 2), ("other", 1)])
+
+    def test_stats_read_without_scanning_notes(self):
+        with self.assertNumQueries(1):
+            # Токен и роль уже в кэше после setUp — остаётся один запрос к NoteStats
+            self.client.get('/api/notes/stats?group_by=subject')
+
+    def test_rejects_bad_params(self):
+        self.assertEqual(self.client.get('/api/notes/stats?group_by=day').status_code, 400)
+        self.assertEqual(self.client.get('/api/notes/stats?author=me').status_code, 400)
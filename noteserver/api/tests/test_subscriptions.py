@@ -0,0 +1,63 @@
+# journal/tests/test_subscriptions.py
+import time
+
+from .base import NotesAPITestCase, body, note_id
+
+
+class SubscriptionFeedTests(NotesAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user, self.client = self.make_user('teacher')
+        self.colleague, colleague_client = self.make_user('colleague')
+        self.math, self.art, self.theirs = note_id(), note_id(), note_id()
+        self.sync(self.client, [{"id": self.math, "subject": "Math"}, {"id": self.art, "subject": "Art"}])
+        self.sync(colleague_client, [{"id": self.theirs, "subject": "History"}])
+
+    def subscribe(self, **data):
+        return self.client.put('/api/notes/subscriptions', data, format='json')
+
+    def feed(self, query=''):
+        data = body(self.client.get(f'/api/notes/updates?since=0&limit=50{query}'))
+        return data["scoped"], {note["id"] for note in data["notes"]}
+
+    def test_without_subscription_feed_is_shared(self):
+        self.assertEqual(self.feed(), (False, {self.math, self.art, self.theirs}))
+
+    def test_subjects_or_authors(self):
+        self.subscribe(subjects=["Math"], authors=[self.colleague.pk])
+
+        self.assertEqual(self.feed(), (True, {self.math, self.theirs}))
+
+    def test_scope_all_bypasses_subscription(self):
+        self.subscribe(subjects=["Art"])
+
+        self.assertEqual(self.feed('&scope=all'), (False, {self.math, self.art, self.theirs}))
+
+    def test_round_trip_and_delete(self):
+        response = self.subscribe(subjects=["Math", "Math", "Art"], authors=[str(self.colleague.pk)])
+
+        self.assertEqual(response.json()["subjects"], ["Art", "Math"])
+        self.assertEqual(self.client.get('/api/notes/subscriptions').json(),
+                         {"subjects": ["Art", "Math"], "authors": [self.colleague.pk]})
+
+        self.client.delete('/api/notes/subscriptions')
+
+        self.assertEqual(self.client.get('/api/notes/subscriptions').json(), {"subjects": [], "authors": []})
+        self.assertFalse(self.feed()[0])
+
+    def test_rejects_malformed(self):
+        self.assertEqual(self.subscribe(subjects="Math").status_code, 400)
+        self.assertEqual(self.subscribe(subjects=[1]).status_code, 400)
+        self.assertEqual(self.subscribe(authors=["someone"]).status_code, 400)
+
+    def test_change_invalidates_cached_feed(self):
+        first = self.client.get('/api/notes/updates?since=0&limit=50')
+        time.sleep(0.002)
+        # Водяной знак ленты сдвигается после коммита
+        with self.captureOnCommitCallbacks(execute=True):
+            self.subscribe(subjects=["Math"])
+
+        response = self.client.get('/api/notes/updates?since=0&limit=50', HTTP_IF_NONE_MATCH=first['ETag'])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({note["id"] for note in body(response)["notes"]}, {self.math})
@@ -0,0 +1,67 @@
+# journal/tests/test_sync.py
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.models import Note
+
+from .base import NotesAPITestCase, note_id
+
+
+class BulkSyncTests(NotesAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user, self.client = self.make_user('teacher')
+
+    def test_creates_and_updates_in_one_batch(self):
+        existing = note_id()
+        self.sync(self.client, [{"id": existing, "subject": "Math", "text": "old"}])
+
+        fresh = note_id()
+        response = self.sync(self.client, [
+            {"id": existing, "subject": "Math", "text": "new"},
+            {"id": fresh, "subject": "Art", "text": "hello", "updated_at": 1000},
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertTrue(body["success"])
+        self.assertEqual({note["id"] for note in body["notes"]}, {existing, fresh})
+        self.assertEqual(Note.objects.get(id=existing).text, "new")
+        created = Note.objects.get(id=fresh)
+        self.assertEqual((created.subject, created.updated_at, created.author), ("Art", 1000, self.user))
+        self.assertEqual(created.author_name, "teacher")
+
+    def test_duplicate_ids_last_one_wins(self):
+        same = note_id()
+        self.sync(self.client, [{"id": same, "text": "first"}, {"id": same, "text": "second"}])
+
+        self.assertEqual(Note.objects.count(), 1)
+        self.assertEqual(Note.objects.get(id=same).text, "second")
+
+    def test_skips_malformed_entries(self):
+        response = self.sync(self.client, [{"id": "not-a-uuid"}, "text", {"subject": "No id"}])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["notes"]), 1)
+        self.assertEqual(Note.objects.get().subject, "No id")
+
+    def test_resync_takes_over_authorship(self):
+        other, other_client = self.make_user('other')
+        shared = note_id()
+        self.sync(other_client, [{"id": shared, "text": "theirs"}])
+
+        self.sync(self.client, [{"id": shared, "text": "mine"}])
+
+        self.assertEqual(Note.objects.get(id=shared).author, self.user)
+
+    def test_query_count_does_not_grow_with_batch(self):
+        def queries(size):
+            notes = [{"id": note_id(), "subject": "Math", "text": "x"} for _ in range(size)]
+            self.sync(self.client, notes)  # прогрев: вставка
+            for note in notes:
+                note["text"] = "y"
+            with CaptureQueriesContext(connection) as captured:
+                self.sync(self.client, notes)
+            return len(captured)
+
+        self.assertEqual(queries(5), queries(50))
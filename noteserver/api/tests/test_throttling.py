@@ -0,0 +1,122 @@
+# journal/tests/test_throttling.py
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from rest_framework.test import APIClient
+
+from api.models import Note
+from api.throttling import BucketThrottle, TokenBucket
+
+from .base import NotesAPITestCase, note_id
+
+
+def rates(**values):
+    # Ставки DRF читает один раз при импорте — подменяем словарь класса
+    return mock.patch.dict(BucketThrottle.THROTTLE_RATES, values)
+
+
+class TokenBucketTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_burst_then_refill(self):
+        bucket = TokenBucket('test', capacity=3, rate=1.0)
+
+        self.assertEqual([bucket.consume(now=100) for _ in range(3)], [None] * 3)
+        self.assertAlmostEqual(bucket.consume(now=100), 1.0)
+        self.assertIsNone(bucket.consume(now=101))
+        self.assertIsNotNone(bucket.consume(now=101))
+
+    def test_idle_time_does_not_overfill(self):
+        bucket = TokenBucket('test', capacity=2, rate=1.0)
+        bucket.consume(now=100)
+
+        results = [bucket.consume(now=150) for _ in range(3)]
+
+        self.assertEqual(results[:2], [None, None])
+        self.assertIsNotNone(results[2])
+
+    def test_multi_token_consume(self):
+        bucket = TokenBucket('test', capacity=10, rate=1.0)
+
+        self.assertIsNone(bucket.consume(7, now=100))
+        self.assertAlmostEqual(bucket.consume(7, now=100), 4.0)
+        self.assertIsNone(bucket.consume(3, now=100))
+
+
+class EndpointThrottleTests(NotesAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user, self.client = self.make_user('teacher')
+
+    def test_sync_rate_per_user(self):
+        _, other = self.make_user('other')
+        with rates(sync="2/min"):
+            codes = [self.sync(self.client, []).status_code for _ in range(3)]
+            response = self.sync(self.client, [])
+            other_code = self.sync(other, []).status_code
+
+        self.assertEqual(codes, [200, 200, 429])
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+        self.assertEqual(other_code, 200)
+
+    def test_updates_ip_rate_across_users(self):
+        _, other = self.make_user('other')
+        with rates(updates_ip="1/min"):
+            first = self.client.get('/api/notes/updates?since=0&limit=1').status_code
+            second = other.get('/api/notes/updates?since=0&limit=1').status_code
+
+        self.assertEqual((first, second), (200, 429))
+
+    def test_sync_notes_quota_counts_notes(self):
+        with rates(sync_notes="5/min"):
+            first = self.sync(self.client, [{"id": note_id()} for _ in range(3)])
+            rejected = [note_id() for _ in range(3)]
+            second = self.sync(self.client, [{"id": nid} for nid in rejected])
+
+        self.assertEqual((first.status_code, second.status_code), (200, 429))
+        self.assertIn('Retry-After', second)
+        self.assertFalse(Note.objects.filter(id__in=rejected).exists())
+
+    @override_settings(NOTES_THROTTLE_ENABLED=False)
+    def test_switch_disables_limits(self):
+        with rates(sync="1/min", sync_notes="1/min"):
+            codes = [self.sync(self.client, [{"id": note_id()}, {"id": note_id()}]).status_code for _ in range(3)]
+
+        self.assertEqual(codes, [200] * 3)
+
+
+class LoginThrottleTests(NotesAPITestCase):
+    def login(self, username='teacher', password='wrong', **extra):
+        return APIClient().post('/api/custom-login', {"username": username, "password": password},
+                                format='json', **extra).status_code
+
+    def test_login_ip_ignores_forwarded_for(self):
+        with rates(login_ip="2/min"):
+            codes = [self.login(HTTP_X_FORWARDED_FOR=f'10.0.0.{n}') for n in range(3)]
+
+        self.assertEqual(codes, [400, 400, 429])
+
+    def test_login_user_limit_per_address(self):
+        with rates(login_user="2/min"):
+            codes = [self.login(REMOTE_ADDR='10.0.0.1') for _ in range(3)]
+            other_name = self.login('someone-else', REMOTE_ADDR='10.0.0.1')
+            case_variant = self.login('TEACHER', REMOTE_ADDR='10.0.0.1')
+            other_address = self.login(REMOTE_ADDR='10.0.0.2')
+
+        self.assertEqual(codes, [400, 400, 429])
+        self.assertEqual(other_name, 400)
+        self.assertEqual(case_variant, 429)
+        self.assertEqual(other_address, 400)
+
+    def test_failures_elsewhere_do_not_lock_out_owner(self):
+        User.objects.create_user('teacher', password='secret')
+        with rates(login_user="2/min"):
+            attacker = [self.login(REMOTE_ADDR='10.0.0.1') for _ in range(3)]
+            # Удачные входы бюджет не тратят
+            owner = [self.login(password='secret', REMOTE_ADDR='10.0.0.2') for _ in range(3)]
+
+        self.assertEqual(attacker, [400, 400, 429])
+        self.assertEqual(owner, [200, 200, 200])
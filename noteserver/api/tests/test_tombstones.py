@@ -0,0 +1,109 @@
+# journal/tests/test_tombstones.py
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import override_settings
+
+from api.models import Note, NoteTombstone
+from api.sync import now_ms
+from api.tombstones import DAY_MS, record_deletions
+
+from .base import NotesAPITestCase, body, note_id
+
+
+class TombstoneFeedTests(NotesAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user, self.client = self.make_user('teacher')
+        # Недавний since: since=1 старше горизонта хранения и требует полной пересинхронизации
+        self.since = now_ms() - DAY_MS
+
+    def updates(self, query):
+        return body(self.client.get(f'/api/notes/updates?{query}'))
+
+    def create_and_delete(self, count):
+        ids = [note_id() for _ in range(count)]
+        self.sync(self.client, [{"id": i, "updated_at": 100} for i in ids])
+        for i in ids:
+            self.assertEqual(self.client.delete(f'/api/notes/{i}/').status_code, 200)
+        return ids
+
+    def test_delete_leaves_tombstone_in_feed(self):
+        nid, = self.create_and_delete(1)
+
+        data = self.updates(f'since={self.since}&limit=10')
+
+        self.assertFalse(Note.objects.filter(id=nid).exists())
+        self.assertEqual([row["id"] for row in data["deleted"]], [nid])
+        self.assertFalse(data["fullResyncRequired"])
+
+    def test_full_load_gets_no_deletions(self):
+        self.create_and_delete(1)
+
+        self.assertEqual(self.updates('since=0&limit=10')["deleted"], [])
+
+    def test_deleted_since_overrides_since(self):
+        self.create_and_delete(1)
+        later = now_ms() + 1
+
+        self.assertEqual(self.updates(f'since={self.since}&deleted_since={later}&limit=10')["deleted"], [])
+
+    @override_settings(NOTES_FEED_DELETIONS_LIMIT=2)
+    def test_deletions_paginate_by_deleted_cursor(self):
+        ids = self.create_and_delete(5)
+
+        seen = []
+        data = self.updates(f'since={self.since}&limit=10')
+        while True:
+            seen += [row["id"] for row in data["deleted"]]
+            if not data["deleted_cursor"]:
+                break
+            self.assertLessEqual(len(data["deleted"]), 2)
+            data = self.updates(f'since={self.since}&limit=10&deleted_cursor={data["deleted_cursor"]}')
+
+        self.assertCountEqual(seen, ids)
+        self.assertEqual(len(seen), len(set(seen)))
+
+    def test_notes_cursor_page_skips_deletions(self):
+        self.create_and_delete(1)
+        self.sync(self.client, [{"id": note_id(), "updated_at": now_ms() + n} for n in range(3)])
+
+        first = self.updates(f'since={self.since}&limit=1')
+        second = self.updates(f'since={self.since}&limit=1&cursor={first["next_cursor"]}')
+
+        self.assertEqual(len(first["deleted"]), 1)
+        self.assertEqual(len(second["notes"]), 1)
+        self.assertNotIn("deleted", second)
+        self.assertNotIn("fullResyncRequired", second)
+
+    def test_old_since_requires_full_resync(self):
+        stale = now_ms() - 100 * DAY_MS
+
+        self.assertTrue(self.updates(f'since={stale}&limit=10')["fullResyncRequired"])
+
+    def test_resync_forgets_tombstone(self):
+        nid, = self.create_and_delete(1)
+
+        self.sync(self.client, [{"id": nid, "updated_at": 300}])
+
+        self.assertFalse(NoteTombstone.objects.filter(id=nid).exists())
+        self.assertEqual(self.updates(f'since={self.since}&limit=10')["deleted"], [])
+
+    def test_repeated_deletion_moves_timestamp(self):
+        nid = note_id()
+        record_deletions([(nid, self.user.pk)], 1000)
+        record_deletions([(nid, self.user.pk)], 2000)
+
+        self.assertEqual(NoteTombstone.objects.get(id=nid).deleted_at, 2000)
+
+
+class PruneTombstonesTests(NotesAPITestCase):
+    def test_prunes_only_past_horizon(self):
+        user, _ = self.make_user('teacher')
+        old, fresh = note_id(), note_id()
+        record_deletions([(old, user.pk)], now_ms() - 91 * DAY_MS)
+        record_deletions([(fresh, user.pk)], now_ms())
+
+        call_command('prune_tombstones', stdout=StringIO())
+
+        self.assertEqual([str(pk) for pk in NoteTombstone.objects.values_list('id', flat=True)], [fresh])
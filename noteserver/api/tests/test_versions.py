@@ -0,0 +1,85 @@
+# journal/tests/test_versions.py
+from django.db import DEFAULT_DB_ALIAS
+from django.test import SimpleTestCase
+
+from api.models import Note
+from api.sync import _base_version, _conditional_update, build_notes, now_ms
+
+from .base import NotesAPITestCase, note_id
+
+
+class VersionedSyncTests(NotesAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user, self.client = self.make_user('teacher')
+        self.id = note_id()
+        self.sync(self.client, [{"id": self.id, "text": "v1"}])
+
+    def test_new_note_starts_at_version_one(self):
+        self.assertEqual(Note.objects.get(id=self.id).version, 1)
+
+    def test_matching_version_bumps_it(self):
+        response = self.sync(self.client, [{"id": self.id, "text": "v2", "version": 1}])
+
+        data = response.json()
+        self.assertEqual(data["conflicts"], [])
+        self.assertEqual(data["notes"][0]["version"], 2)
+        self.assertEqual(Note.objects.get(id=self.id).version, 2)
+
+    def test_stale_version_returns_server_copy(self):
+        self.sync(self.client, [{"id": self.id, "text": "v2", "version": 1}])
+
+        response = self.sync(self.client, [{"id": self.id, "text": "lost edit", "version": 1}])
+
+        data = response.json()
+        self.assertEqual(data["notes"], [])
+        conflict, = data["conflicts"]
+        self.assertEqual(conflict["status"], "conflict")
+        self.assertEqual((conflict["server"]["text"], conflict["server"]["version"]), ("v2", 2))
+        self.assertEqual(Note.objects.get(id=self.id).text, "v2")
+
+    def test_conflict_does_not_block_rest_of_batch(self):
+        self.sync(self.client, [{"id": self.id, "text": "v2", "version": 1}])
+        fresh = note_id()
+
+        data = self.sync(self.client, [{"id": self.id, "version": 1}, {"id": fresh, "text": "new"}]).json()
+
+        self.assertEqual([note["id"] for note in data["notes"]], [fresh])
+        self.assertEqual([c["id"] for c in data["conflicts"]], [self.id])
+
+    def test_without_version_last_write_wins(self):
+        self.sync(self.client, [{"id": self.id, "text": "v2", "version": 1}])
+
+        data = self.sync(self.client, [{"id": self.id, "text": "old client"}]).json()
+
+        self.assertEqual(data["conflicts"], [])
+        self.assertEqual(Note.objects.get(id=self.id).text, "old client")
+
+    def test_invalid_version_is_reported_and_skipped(self):
+        for version in ("x", 1.5, True, [1]):
+            with self.subTest(version=version):
+                data = self.sync(self.client, [{"id": self.id, "text": "junk", "version": version}]).json()
+
+                self.assertEqual(data["conflicts"], [{"id": self.id, "status": "invalid_version"}])
+                self.assertEqual(Note.objects.get(id=self.id).text, "v1")
+
+    def test_conditional_update_detects_concurrent_write(self):
+        # Между SELECT ... FOR UPDATE и UPDATE версию сменил другой писатель
+        notes, _ = build_notes(self.user, [{"id": self.id, "text": "late"}], now_ms())
+        Note.objects.filter(id=self.id).update(version=5)
+
+        conflicts = _conditional_update(DEFAULT_DB_ALIAS, self.user, notes, expected_version=1)
+
+        self.assertEqual({str(pk) for pk in conflicts}, {self.id})
+        self.assertEqual(Note.objects.get(id=self.id).text, "v1")
+
+
+class BaseVersionTests(SimpleTestCase):
+    def test_parses_integers_and_rejects_garbage(self):
+        self.assertIsNone(_base_version(None))
+        self.assertEqual(_base_version(3), 3)
+        self.assertEqual(_base_version("3"), 3)
+        self.assertEqual(_base_version(3.0), 3)
+        for value in ("x", 1.5, True, {}):
+            with self.subTest(value=value), self.assertRaises(ValueError):
+                _base_version(value)
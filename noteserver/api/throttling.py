@@ -0,0 +1,177 @@
+# journal/throttling.py
+# Token bucket в кэше Django: бюджеты на эндпоинт (throttle_scope вьюхи) отдельно
+# для пользователя и для IP. Ставки — в REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'].
+import hashlib
+import math
+import time
+from types import SimpleNamespace
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.exceptions import Throttled
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class TokenBucket:
+    """
+    Ведро на capacity токенов, пополняется со скоростью rate токенов в секунду.
+    В кэше два ключа: момент t0 (add) и число потраченных токенов (атомарные incr/decr).
+    К моменту now накоплено capacity + rate * (now - t0) токенов; лишнее сверх полного
+    ведра «сжигаем» прибавкой к счётчику, оба ключа живут, пока ведро не наполнится снова.
+    """
+
+    def __init__(self, key, capacity, rate):
+        self.key = key
+        self.capacity = capacity
+        self.rate = rate
+        self.ttl = math.ceil(capacity / rate) + 1
+
+    def consume(self, tokens=1, now=None):
+        """None — токены списаны; иначе сколько секунд ждать."""
+        now = time.time() if now is None else now
+        start_key, spent_key = f'{self.key}:t0', f'{self.key}:n'
+
+        if cache.add(start_key, now, self.ttl):
+            cache.set(spent_key, 0, self.ttl)
+            started = now
+        else:
+            started = cache.get(start_key, now)
+        cache.add(spent_key, 0, self.ttl)
+        try:
+            spent = cache.incr(spent_key, tokens)
+        except ValueError:
+            # Ключ истёк между add и incr — ведро полное
+            cache.set(spent_key, tokens, self.ttl)
+            spent = tokens
+
+        allowed = self.capacity + self.rate * (now - started)
+        if spent > allowed:
+            cache.decr(spent_key, tokens)
+            return max((spent - allowed) / self.rate, 1 / self.rate)
+
+        # В ведре не может быть больше capacity (до списания): излишек накопленного сжигаем
+        surplus = int(allowed - spent - (self.capacity - tokens))
+        if surplus > 0:
+            cache.incr(spent_key, surplus)
+        cache.touch(start_key, self.ttl)
+        cache.touch(spent_key, self.ttl)
+        return None
+
+    def refund(self, tokens=1):
+        # Вернуть списанное (попытка оказалась «бесплатной»); истёкшее ведро и так полное
+        try:
+            cache.decr(f'{self.key}:n', tokens)
+        except ValueError:
+            pass
+
+
+class BucketThrottle(SimpleRateThrottle):
+    """Общая часть: ставка по throttle_scope вьюхи (+ суффикс), без scope — не ограничиваем."""
+    scope_suffix = ''
+
+    def __init__(self):
+        # Ставка зависит от вьюхи, поэтому читаем её в allow_request
+        pass
+
+    def get_bucket(self, request, view):
+        scope = getattr(view, 'throttle_scope', None)
+        if not scope:
+            return None
+        rate = self.THROTTLE_RATES.get(scope + self.scope_suffix)
+        if rate is None:
+            return None
+        ident = self.get_bucket_ident(request)
+        if ident is None:
+            return None
+        num, duration = self.parse_rate(rate)
+        return TokenBucket(f'throttle:{scope}{self.scope_suffix}:{ident}', num, num / duration)
+
+    def get_bucket_ident(self, request):
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        if not settings.NOTES_THROTTLE_ENABLED:
+            return True
+        bucket = self.get_bucket(request, view)
+        if bucket is None:
+            return True
+        self._wait = bucket.consume()
+        return self._wait is None
+
+    def wait(self):
+        return self._wait
+
+
+class UserBucketThrottle(BucketThrottle):
+    # Бюджет аутентифицированного пользователя; анонимов ограничивает IPBucketThrottle
+    def get_bucket_ident(self, request):
+        if request.user and request.user.is_authenticated:
+            return request.user.pk
+        return None
+
+
+class IPBucketThrottle(BucketThrottle):
+    # Бюджет адреса: ставка "<scope>_ip"
+    scope_suffix = '_ip'
+
+    def get_bucket_ident(self, request):
+        return self.get_ident(request)
+
+
+def check_throttles(request, scope):
+    """
+    Для вьюх вне DRF (async_views): те же DEFAULT_THROTTLE_CLASSES, что у APIView
+    с throttle_scope=scope. Превышение — Throttled с самым долгим ожиданием.
+    """
+    view = SimpleNamespace(throttle_scope=scope)
+    waits = []
+    for throttle_class in api_settings.DEFAULT_THROTTLE_CLASSES:
+        throttle = throttle_class()
+        if not throttle.allow_request(request, view):
+            waits.append(throttle.wait())
+    if waits:
+        waits = [wait for wait in waits if wait is not None]
+        raise Throttled(wait=max(waits, default=None))
+
+
+async def acheck_throttles(request, scope):
+    # Для async-вьюх: ведро — несколько обращений к кэшу подряд, все уходят в поток одним переходом
+    await sync_to_async(check_throttles, thread_sensitive=False)(request, scope)
+
+
+def check_sync_quota(user, notes_count):
+    """
+    Квота на число заметок в sync (ставка "sync_notes"): переотправка всего блокнота
+    раз в секунду съедает её быстро, обычная работа — нет. Превышение — Throttled (429).
+    """
+    rate = BucketThrottle.THROTTLE_RATES.get('sync_notes')
+    if not settings.NOTES_THROTTLE_ENABLED or rate is None or not notes_count:
+        return
+    num, duration = BucketThrottle().parse_rate(rate)
+    # Пачка больше всего ведра не пройдёт никогда — списываем не больше capacity
+    wait = TokenBucket(f'throttle:sync_notes:{user.pk}', num, num / duration).consume(min(notes_count, num))
+    if wait is not None:
+        raise Throttled(wait=wait)
+
+
+def check_login_quota(request, username):
+    """
+    Неудачные попытки входа под одним именем с одного адреса (ставка "login_user"); вызывается
+    до проверки пароля. Ключ — пара (имя, адрес): ошибки с чужого адреса не запирают владельца,
+    а перебор с многих адресов упирается в login_ip каждого. Токен списывается сразу, чтобы
+    параллельные попытки не проскочили; при успешном входе вызывающий возвращает его —
+    bucket.refund(). Возвращает ведро (или None, если ограничение выключено); превышение — Throttled (429).
+    """
+    rate = BucketThrottle.THROTTLE_RATES.get('login_user')
+    if not settings.NOTES_THROTTLE_ENABLED or rate is None or not isinstance(username, str) or not username:
+        return None
+    num, duration = BucketThrottle().parse_rate(rate)
+    # Имя — произвольная строка клиента: в ключ кэша кладём хеш
+    ident = hashlib.sha256(f'{username.casefold()}\n{BucketThrottle().get_ident(request)}'.encode()).hexdigest()
+    bucket = TokenBucket(f'throttle:login_user:{ident}', num, num / duration)
+    wait = bucket.consume()
+    if wait is not None:
+        raise Throttled(wait=wait)
+    return bucket
@@ -0,0 +1,171 @@
+# journal/token_cache.py
+# Кэш token -> user для PermanentTokenAuthentication.
+# Два уровня: ограниченный LRU в памяти процесса и (опционально) общий кэш Django.
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+class LRUCache:
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_local = None
+_local_lock = threading.Lock()
+
+
+def _config():
+    return settings.TOKEN_CACHE
+
+
+def _local_cache():
+    global _local
+    if _local is None:
+        with _local_lock:
+            if _local is None:
+                config = _config()
+                _local = LRUCache(config['MAX_SIZE'], config['TTL'])
+    return _local
+
+
+def _shared_cache():
+    alias = _config().get('SHARED_ALIAS')
+    return caches[alias] if alias else None
+
+
+def _token_key(token):
+    # В ключах кэша не храним сам токен
+    return 'auth:token:' + hashlib.sha256(token.encode()).hexdigest()
+
+
+def _user_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def get_user(token):
+    key = _token_key(token)
+    local = _local_cache()
+    user = local.get(key)
+    if user is not None:
+        return user
+
+    shared = _shared_cache()
+    if shared is not None:
+        user = shared.get(key)
+        if user is not None:
+            local.set(key, user)
+            local.set(_user_key(user.pk), key)
+    return user
+
+
+def set_user(token, user):
+    key = _token_key(token)
+    local = _local_cache()
+    local.set(key, user)
+    # Обратный индекс user -> ключ токена, чтобы сбрасывать кэш по пользователю
+    local.set(_user_key(user.pk), key)
+
+    shared = _shared_cache()
+    if shared is not None:
+        shared.set(key, user, _config()['SHARED_TTL'])
+
+
+async def aget_user(token):
+    # Для async-вьюх: LRU в памяти не блокирует, общий кэш — через aget
+    key = _token_key(token)
+    local = _local_cache()
+    user = local.get(key)
+    if user is not None:
+        return user
+
+    shared = _shared_cache()
+    if shared is not None:
+        user = await shared.aget(key)
+        if user is not None:
+            local.set(key, user)
+            local.set(_user_key(user.pk), key)
+    return user
+
+
+async def aset_user(token, user):
+    key = _token_key(token)
+    local = _local_cache()
+    local.set(key, user)
+    local.set(_user_key(user.pk), key)
+
+    shared = _shared_cache()
+    if shared is not None:
+        await shared.aset(key, user, _config()['SHARED_TTL'])
+
+
+def invalidate_token(token):
+    key = _token_key(token)
+    _local_cache().delete(key)
+    shared = _shared_cache()
+    if shared is not None:
+        shared.delete(key)
+
+
+def invalidate_user(user_id):
+    invalidate_users([user_id])
+
+
+def invalidate_users(user_ids):
+    from django.db import router
+    from .models import PermanentToken
+
+    local = _local_cache()
+    # Токены читаем с default: на отстающей реплике может не быть только что выданного
+    tokens = (PermanentToken.objects.using(router.db_for_write(PermanentToken))
+              .filter(user_id__in=user_ids).values_list('token', flat=True))
+    keys = {_token_key(token) for token in tokens}
+    for user_id in user_ids:
+        indexed = local.get(_user_key(user_id))
+        if indexed:
+            keys.add(indexed)
+        local.delete(_user_key(user_id))
+
+    shared = _shared_cache()
+    for key in keys:
+        local.delete(key)
+    if shared is not None and keys:
+        shared.delete_many(list(keys))
+
+
+def clear():
+    _local_cache().clear()
@@ -0,0 +1,80 @@
+# journal/tombstones.py
+from django.conf import settings
+from django.db import router
+from django.db.models import Q
+
+from .feed import encode_cursor
+from .models import NoteTombstone
+
+DAY_MS = 24 * 60 * 60 * 1000
+
+
+def record_deletions(deleted, now):
+    # deleted — пары (id заметки, id автора)
+    deleted = list(deleted)
+    if not deleted:
+        return
+    # Один upsert: повторное удаление (заметку восстановили и снова удалили) обновляет метку
+    NoteTombstone.objects.using(router.db_for_write(NoteTombstone)).bulk_create(
+        [NoteTombstone(id=note_id, author_id=author_id, deleted_at=now) for note_id, author_id in deleted],
+        batch_size=settings.NOTES_SYNC_BATCH_SIZE,
+        update_conflicts=True, unique_fields=['id'], update_fields=['author', 'deleted_at'],
+    )
+
+
+def forget_deletions(ids, using=None):
+    # Заметку снова прислали через sync — она больше не удалена
+    NoteTombstone.objects.using(using).filter(id__in=ids).delete()
+
+
+def _deletions(since, cursor, limit):
+    queryset = NoteTombstone.objects.order_by('deleted_at', 'id')
+    if cursor is not None:
+        deleted_at, note_id = cursor
+        queryset = queryset.filter(Q(deleted_at__gt=deleted_at) | Q(deleted_at=deleted_at, id__gt=note_id))
+    else:
+        queryset = queryset.filter(deleted_at__gt=since)
+    # На одну строку больше, чтобы понять, есть ли следующая порция
+    return queryset.values_list('id', 'deleted_at')[:limit + 1]
+
+
+def _deletions_page(rows, limit):
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        note_id, deleted_at = rows[-1]
+        next_cursor = encode_cursor(deleted_at, note_id)
+    return [{"id": str(note_id), "deleted_at": deleted_at} for note_id, deleted_at in rows], next_cursor
+
+
+def list_deletions(since, cursor=None, limit=None):
+    """
+    Надгробия новее since (или после cursor) порцией не больше limit:
+    (список, курсор следующей порции или None). since=0 без курсора — полная загрузка,
+    у такого клиента удалять нечего.
+    """
+    if not since and cursor is None:
+        return [], None
+    limit = limit or settings.NOTES_FEED_DELETIONS_LIMIT
+    return _deletions_page(list(_deletions(since, cursor, limit)), limit)
+
+
+async def alist_deletions(since, cursor=None, limit=None):
+    if not since and cursor is None:
+        return [], None
+    limit = limit or settings.NOTES_FEED_DELETIONS_LIMIT
+    return _deletions_page([row async for row in _deletions(since, cursor, limit)], limit)
+
+
+def retention_horizon(now):
+    return now - settings.NOTE_TOMBSTONE_RETENTION_DAYS * DAY_MS
+
+
+def needs_full_resync(since, now):
+    # Надгробия старше горизонта удаляются, поэтому клиенту с таким since их уже не увидеть
+    return 0 < since < retention_horizon(now)
+
+
+def prune(before):
+    deleted, _ = NoteTombstone.objects.filter(deleted_at__lt=before).delete()
+    return deleted
@@ -1,15 +1,35 @@
 # journal/urls.py
+from django.conf import settings
 from django.urls import path
-from .views import (RegisterView, SyncNotesView, UpdatesView, DeleteNoteView,
-                   get_user_group, CustomLoginView, CustomTokenVerifyView, ResetTokenView)
+from .views import (BatchDeleteNotesView, RegisterView, SyncNotesView, UpdatesView, DeleteNoteView,
+                   get_user_group, CustomLoginView, CustomTokenVerifyView, ResetTokenView,
+                   ExportNotesView, MetricsView, NoteBodiesView, NoteStatsView, SearchNotesView, SubscriptionView, SyncJobView)
+from .events import event_stream, poll_updates
+from . import async_views
+
+# Под ASGI (NOTES_ASYNC_VIEWS) sync и лента обслуживаются async-вьюхами без перехода в поток
+if settings.NOTES_ASYNC_VIEWS:
+    sync_view, updates_view = async_views.sync_notes, async_views.updates
+else:
+    sync_view, updates_view = SyncNotesView.as_view(), UpdatesView.as_view()
 
 urlpatterns = [
     path('register', RegisterView.as_view()),
     path('custom-login', CustomLoginView.as_view()),
     path('verify-token', CustomTokenVerifyView.as_view()),
     path('reset-token', ResetTokenView.as_view()),
-    path('notes/sync', SyncNotesView.as_view()),
-    path('notes/updates', UpdatesView.as_view()),
+    path('notes/sync', sync_view),
+    path('notes/sync/jobs/<uuid:pk>', SyncJobView.as_view(), name='sync_job'),
+    path('notes/updates', updates_view),
+    path('notes/subscriptions', SubscriptionView.as_view(), name='subscriptions'),
+    path('notes/search', SearchNotesView.as_view(), name='search_notes'),
+    path('notes/bodies', NoteBodiesView.as_view(), name='note_bodies'),
+    path('notes/stats', NoteStatsView.as_view(), name='note_stats'),
+    path('notes/export', ExportNotesView.as_view(), name='export_notes'),
+    path('notes/delete', BatchDeleteNotesView.as_view(), name='batch_delete_notes'),
+    path('notes/poll', poll_updates, name='poll_updates'),
+    path('notes/events', event_stream, name='event_stream'),
     path('notes/<uuid:pk>/', DeleteNoteView.as_view(), name='delete_note'),
     path('user/group/', get_user_group, name='get_user_group'),
+    path('metrics', MetricsView.as_view(), name='metrics'),
 ]
\ No newline at end of file
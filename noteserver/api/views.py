@@ -3,30 +3,72 @@ import uuid
 import secrets
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from rest_framework import status
-from django.utils import timezone
+from django.conf import settings
+from django.db import router, transaction
+from django.http import StreamingHttpResponse
 from django.contrib.auth.models import User
-from django.contrib.auth import authenticate
 from rest_framework.decorators import api_view, authentication_classes, permission_classes
-from .models import Note, PermanentToken
-from .serializers import NoteSerializer, RegisterSerializer
-from .authentication import PermanentTokenAuthentication
+from .models import Note, PermanentToken, SyncJob
+from .serializers import NOTE_BODY_FIELDS, NoteRowMapper, RegisterSerializer, parse_note_fields
+from .archive import export_lines, export_queryset
+from .authentication import PermanentTokenAuthentication, load_token_user
+from .metrics import registry as metrics_registry
+from .passwords import PasswordCheckBusy, check_credentials
+from .permissions import IsNotStudent, IsTeacher
+from .renderers import PrometheusRenderer
+from .roles import get_roles
+from .routers import mark_written
+from . import idempotency, token_cache, watermark
+from .search import search_notes
+from .stats import list_stats
+from .subscriptions import (delete_subscription, get_subscription, parse_subscription, save_subscription,
+                            subscription_filter)
+from .jobs import enqueue_sync_job
+from .sync import DELETE_FIELDS, apply_sync_batch, delete_notes, now_ms
+from .throttling import check_login_quota, check_sync_quota
+from .tombstones import list_deletions, needs_full_resync
+from .feed import feed_queryset, paginate, parse_feed_params, parse_limit, stream_notes
 
 
 # ====== Кастомная аутентификация =======
 class CustomLoginView(APIView):
+    # Публичные эндпоинты не аутентифицируют: лишняя работа, а устаревший токен клиента помешал бы входу
+    authentication_classes = []
     permission_classes = [AllowAny]
+    # Проверка пароля дорогая — ограничиваем по адресу до проверки пароля
+    throttle_scope = 'login'
 
     def post(self, request):
         username = request.data.get('username')
         password = request.data.get('password')
+        # Кроме адреса (login_ip) — бюджет неудачных попыток на имя с этого адреса, тоже до проверки пароля
+        quota = check_login_quota(request, username)
 
-        user = authenticate(username=username, password=password)
+        # Хеш пароля считается в ограниченном пуле (api/passwords.py)
+        try:
+            user = check_credentials(request, username, password)
+        except PasswordCheckBusy:
+            # Пароль не проверяли — попытка не считается
+            if quota is not None:
+                quota.refund()
+            response = Response({
+                'success': False,
+                'error': 'Too many concurrent logins, retry later'
+            }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            response['Retry-After'] = '1'
+            return response
 
         if user is not None:
-            # Создаем или получаем постоянный токен
-            token_obj, created = PermanentToken.objects.get_or_create(user=user)
+            # Удачный вход бюджет неудачных попыток не тратит
+            if quota is not None:
+                quota.refund()
+            # Токен уже загружен вместе с пользователем (TokenModelBackend); создаём, если его нет
+            try:
+                token_obj = user.permanenttoken
+            except PermanentToken.DoesNotExist:
+                token_obj = PermanentToken.objects.create(user=user)
 
             return Response({
                 'success': True,
@@ -41,16 +83,17 @@ class CustomLoginView(APIView):
 
 
 class CustomTokenVerifyView(APIView):
+    authentication_classes = []
     permission_classes = [AllowAny]
 
     def post(self, request):
         token = request.data.get('token')
 
         try:
-            permanent_token = PermanentToken.objects.get(token=token)
+            user = load_token_user(token)
             return Response({
                 'success': True,
-                'username': permanent_token.user.username
+                'username': user.username
             })
         except PermanentToken.DoesNotExist:
             return Response({
@@ -65,9 +108,11 @@ class ResetTokenView(APIView):
 
     def post(self, request):
         user = request.user
-        # Удаляем старый токен и создаем новый
+        # Удаляем старый токен и создаем новый, старый сразу убираем из кэша
+        token_cache.invalidate_user(user.pk)
         PermanentToken.objects.filter(user=user).delete()
         new_token = PermanentToken.objects.create(user=user)
+        mark_written(user.pk)
 
         return Response({
             'success': True,
@@ -77,6 +122,8 @@ class ResetTokenView(APIView):
 
 # ====== Регистрация (остается без изменений) =======
 class RegisterView(APIView):
+    authentication_classes = []
+
     def post(self, request):
         serializer = RegisterSerializer(data=request.data)
         if serializer.is_valid():
@@ -92,103 +139,369 @@ class RegisterView(APIView):
 
 
 # ====== API с постоянной аутентификацией =======
+def wants_ack(request):
+    # request.GET — годится и для DRF Request, и для HttpRequest (async_views)
+    if request.GET.get("response") == "ack":
+        return True
+    return "return=minimal" in request.headers.get("Prefer", "")
+
+
+def wants_async(request):
+    if request.GET.get("mode") == "async":
+        return True
+    return "respond-async" in request.headers.get("Prefer", "")
+
+
 class SyncNotesView(APIView):
     authentication_classes = [PermanentTokenAuthentication]
-    permission_classes = [IsAuthenticated]
+    # ПРОВЕРКА: студенты не могут отправлять заметки на сервер (IsNotStudent)
+    permission_classes = [IsAuthenticated, IsNotStudent]
+    throttle_scope = 'sync'
 
     def post(self, request):
         user = request.user
 
-        # ПРОВЕРКА: студенты не могут отправлять заметки на сервер
-        if user.groups.filter(name='students').exists():
-            return Response({
-                "error": "Forbidden: Students cannot sync notes to server"
-            }, status=status.HTTP_403_FORBIDDEN)
-
         notes = request.data.get("notes", [])
-        now = int(timezone.now().timestamp() * 1000)
-        saved_notes = []
+        if not isinstance(notes, list):
+            notes = []
+        try:
+            key = idempotency.request_key(request)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        ack, queued = wants_ack(request), wants_async(request)
+
+        # Повтор с тем же Idempotency-Key — копия сохранённого ответа: ни записи, ни квоты
+        if key is not None:
+            digest = idempotency.request_digest(notes, ack, queued)
+            replay = idempotency.begin(user, key, digest)
+            if replay is not None:
+                return replay
+        try:
+            data, code = sync_notes_response(user, notes, ack, queued)
+        except Exception:
+            if key is not None:
+                idempotency.abort(user, key)
+            raise
+
+        if key is not None:
+            return idempotency.finish(user, key, digest, data, code)
+        return Response(data, status=code)
+
+
+def sync_notes_response(user, notes, ack, queued):
+    # (тело, статус) ответа sync; общая для SyncNotesView и async_views.sync_notes
+    check_sync_quota(user, len(notes))
+    now = now_ms()
+
+    # ?mode=async или "Prefer: respond-async" — ставим пачку в очередь и сразу отвечаем 202
+    if queued:
+        job = enqueue_sync_job(user, notes, now, ack=ack)
+        return {
+            "success": True,
+            "jobId": str(job.id),
+            "status": job.status,
+            "serverTime": now,
+        }, status.HTTP_202_ACCEPTED
+
+    # Пакетная запись с проверкой версий: запросы на порцию заметок и на базовую версию, не на заметку
+    # ?response=ack или "Prefer: return=minimal" — только id, метки времени и версия
+    result = apply_sync_batch(user, notes, now, ack=ack)
+
+    return {
+        "success": True,
+        **result,
+        "serverTime": now
+    }, status.HTTP_200_OK
 
-        for n in notes:
-            note_id = n.get("id")
-            try:
-                if note_id:
-                    note_uuid = uuid.UUID(str(note_id))
-                else:
-                    note_uuid = uuid.uuid4()
-            except ValueError:
-                continue
-
-            # Получаем имя автора из запроса или используем имя текущего пользователя
-            author_name = n.get("author", user.username)
-
-            note, created = Note.objects.update_or_create(
-                id=note_uuid,
-                defaults={
-                    "author": user,
-                    "author_name": author_name,
-                    "subject": n.get("subject", ""),
-                    "text": n.get("text", ""),
-                    "created_at": n.get("created_at", now),
-                    "updated_at": n.get("updated_at", now),
-                    "uploaded_at": n.get("uploaded_at", now),
-                }
-            )
-            saved_notes.append(NoteSerializer(note).data)
+
+class SyncJobView(APIView):
+    authentication_classes = [PermanentTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        # Статус меняют воркеры, а не этот пользователь, — метка read-your-writes его не покрывает:
+        # задачу читаем с default, иначе отставшая реплика ответит 404 или старым статусом
+        job = SyncJob.objects.using(router.db_for_write(SyncJob)).filter(id=pk, user=request.user).first()
+        if job is None:
+            return Response({"error": "Job not found"}, status=status.HTTP_404_NOT_FOUND)
 
         return Response({
             "success": True,
-            "notes": saved_notes,
-            "serverTime": now
+            "jobId": str(job.id),
+            "status": job.status,
+            "result": job.result,
+            "error": job.error or None,
+            "createdAt": job.created_at,
+            "finishedAt": job.finished_at,
         })
 
 
 class UpdatesView(APIView):
     authentication_classes = [PermanentTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    throttle_scope = 'updates'
 
     def get(self, request):
-        since = int(request.query_params.get("since", 0))
+        try:
+            since, deleted_since, cursor, deleted_cursor, limit, fields = parse_feed_params(request.query_params)
+        except ValueError:
+            return Response({"error": "Invalid since, cursor, limit or fields"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Условный GET: пока водяной знак не сдвинулся, отвечаем 304 по одному чтению кэша.
+        # Клиенту за горизонтом надгробий всегда нужен полный ответ (fullResyncRequired)
+        mark = watermark.current()
+        etag = watermark.feed_etag(request.user.pk, request.get_full_path(), mark)
+        if not needs_full_resync(deleted_since, now_ms()):
+            not_modified = watermark.not_modified(request, etag, mark)
+            if not_modified is not None:
+                return not_modified
+        watermark.pin_if_recent(mark)
+
+        # Если устройство подписано на предметы/авторов — отдаём только их заметки,
+        # иначе (или с scope=all) показываем ВСЕ заметки всех пользователей.
+        # Базу выбираем сейчас: поток читается уже после PrimaryPinMiddleware, без метки default
+        queryset = Note.objects.using(router.db_for_read(Note))
+        scoped = False
+        if request.query_params.get("scope") != "all":
+            subjects, authors = get_subscription(request.user)
+            if subjects or authors:
+                queryset = queryset.filter(subscription_filter(subjects, authors))
+                scoped = True
+
+        notes = feed_queryset(queryset, since, cursor)
+        mapper = NoteRowMapper(fields)
+        server_time = now_ms()
+
+        head = {
+            "success": True,
+            "serverTime": server_time,
+            "scoped": scoped,
+        }
+        # Удаления отдаём на первой странице порцией до NOTES_FEED_DELETIONS_LIMIT; продолжение —
+        # по deleted_cursor (его можно передавать вместе с cursor следующей страницы заметок)
+        if cursor is None or deleted_cursor is not None:
+            head["deleted"], head["deleted_cursor"] = list_deletions(deleted_since, deleted_cursor)
+        if cursor is None:
+            head["fullResyncRequired"] = needs_full_resync(deleted_since, server_time)
+
+        # Полная лента (без limit) или явный stream=1 — отдаём потоком
+        if limit is None or request.query_params.get("stream") == "1":
+            return watermark.set_validators(stream_notes(notes, head, mapper, limit), etag, server_time)
+
+        page, next_cursor = paginate(notes, limit, mapper)
+        response = Response({
+            **head,
+            "notes": page,
+            "next_cursor": next_cursor,
+        })
+        return watermark.set_validators(response, etag, server_time)
+
+
+class SubscriptionView(APIView):
+    authentication_classes = [PermanentTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        subjects, authors = get_subscription(request.user)
+        return Response({"subjects": subjects, "authors": authors})
+
+    def put(self, request):
+        try:
+            subjects, authors = parse_subscription(request.data)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        save_subscription(request.user, subjects, authors)
+        return Response({"success": True, "subjects": subjects, "authors": authors})
 
-        # Показываем ВСЕ заметки всех пользователей
-        notes = Note.objects.filter(
-            updated_at__gt=since
-        ).order_by('updated_at')
+    def delete(self, request):
+        delete_subscription(request.user)
+        return Response({"success": True})
+
+
+class SearchNotesView(APIView):
+    authentication_classes = [PermanentTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        query = request.query_params.get("q", "").strip()
+        try:
+            author = request.query_params.get("author")
+            author = int(author) if author else None
+            limit = parse_limit(request.query_params.get("limit")) or settings.NOTES_SEARCH_PAGE_SIZE
+            offset = max(int(request.query_params.get("offset", 0)), 0)
+            fields = parse_note_fields(request.query_params.get("fields"))
+        except ValueError:
+            return Response({"error": "Invalid author, limit, offset or fields"}, status=status.HTTP_400_BAD_REQUEST)
+        if not query:
+            return Response({"error": "Query parameter q is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Берём на одну строку больше, чтобы понять, есть ли следующая страница
+        hits = search_notes(query, author=author, subject=request.query_params.get("subject") or None,
+                            limit=limit + 1, offset=offset)
+        next_offset = offset + limit if len(hits) > limit else None
+        ranks = dict(hits[:limit])
+
+        mapper = NoteRowMapper(fields)
+        rows = mapper.rows(Note.objects.filter(id__in=list(ranks)))
+        notes = {note["id"]: note for note in map(mapper.to_dict, rows)}
+        # Порядок — по релевантности из индекса
+        results = [
+            {**notes[str(note_id)], "rank": rank}
+            for note_id, rank in ranks.items() if str(note_id) in notes
+        ]
 
-        serializer = NoteSerializer(notes, many=True)
-        server_time = int(timezone.now().timestamp() * 1000)
         return Response({
             "success": True,
-            "notes": serializer.data,
-            "serverTime": server_time
+            "results": results,
+            "next_offset": next_offset,
         })
 
 
-class DeleteNoteView(APIView):
+class NoteBodiesView(APIView):
     authentication_classes = [PermanentTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
+    def post(self, request):
+        # Тексты заметок пачкой — к заголовкам из ленты (?fields=headers)
+        ids = request.data.get("ids")
+        if not isinstance(ids, list) or len(ids) > settings.NOTES_BODIES_MAX_IDS:
+            return Response({"error": f"ids must be a list of at most {settings.NOTES_BODIES_MAX_IDS} note ids"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            note_ids = {uuid.UUID(str(note_id)) for note_id in ids}
+        except ValueError:
+            return Response({"error": "Invalid note id"}, status=status.HTTP_400_BAD_REQUEST)
+
+        mapper = NoteRowMapper(NOTE_BODY_FIELDS)
+        notes = [mapper.to_dict(row) for row in mapper.rows(Note.objects.filter(id__in=note_ids))]
+        found = {note["id"] for note in notes}
+
+        return Response({
+            "success": True,
+            "notes": notes,
+            "missing": sorted(str(note_id) for note_id in note_ids if str(note_id) not in found),
+        })
+
+
+class NoteStatsView(APIView):
+    authentication_classes = [PermanentTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        # Сводка из NoteStats: ?author=, ?subject=, ?group_by=author|subject
+        try:
+            author = request.query_params.get("author")
+            author = int(author) if author else None
+        except ValueError:
+            return Response({"error": "Invalid author"}, status=status.HTTP_400_BAD_REQUEST)
+        group_by = request.query_params.get("group_by") or None
+        if group_by not in (None, "author", "subject"):
+            return Response({"error": "group_by must be author or subject"}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            "success": True,
+            "stats": list_stats(author=author, subject=request.query_params.get("subject") or None,
+                                group_by=group_by),
+        })
+
+
+class ExportNotesView(APIView):
+    authentication_classes = [PermanentTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        # NDJSON потоком; администратор выгружает весь журнал, остальные — свои заметки
+        try:
+            since = request.query_params.get("since")
+            since = int(since) if since else None
+        except ValueError:
+            return Response({"error": "Invalid since"}, status=status.HTTP_400_BAD_REQUEST)
+
+        author = None if request.user.is_staff else request.user
+        # Базу выбираем до ответа: строки читаются после PrimaryPinMiddleware, без метки default
+        queryset = export_queryset(author=author, since=since).using(router.db_for_read(Note))
+        response = StreamingHttpResponse(export_lines(queryset),
+                                         content_type='application/x-ndjson')
+        response['Content-Disposition'] = 'attachment; filename="notes.ndjson"'
+        return response
+
+
+def lock_notes(note_ids):
+    # {id: строка DELETE_FIELDS}; вызывается в транзакции удаления — строки не поменяются до DELETE
+    rows = Note.objects.select_for_update().filter(id__in=note_ids).values_list(*DELETE_FIELDS)
+    return {row[0]: row for row in rows}
+
+
+class BatchDeleteNotesView(APIView):
+    authentication_classes = [PermanentTokenAuthentication]
+    # Удалять могут только учителя; роль одна на весь запрос (из кэша)
+    permission_classes = [IsAuthenticated, IsTeacher]
+
+    def post(self, request):
+        ids = request.data.get("ids")
+        if not isinstance(ids, list) or len(ids) > settings.NOTES_DELETE_MAX_IDS:
+            return Response({"error": f"ids must be a list of at most {settings.NOTES_DELETE_MAX_IDS} note ids"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            note_ids = list(dict.fromkeys(uuid.UUID(str(note_id)) for note_id in ids))
+        except ValueError:
+            return Response({"error": "Invalid note id"}, status=status.HTTP_400_BAD_REQUEST)
+
+        user = request.user
+        # Владельцев — одним запросом
+        with transaction.atomic():
+            notes = lock_notes(note_ids)
+            own = [row for row in notes.values() if row[1] == user.pk]
+            deleted = delete_notes(own) if own else 0
+        if own:
+            mark_written(user.pk)
+        authors = {note_id: row[1] for note_id, row in notes.items()}
+
+        results = []
+        for note_id in note_ids:
+            if note_id not in authors:
+                result = "not_found"
+            elif authors[note_id] != user.pk:
+                result = "forbidden"
+            else:
+                result = "deleted"
+            results.append({"id": str(note_id), "status": result})
+
+        return Response({
+            "success": True,
+            "deleted": deleted,
+            "results": results,
+        })
+
+
+class DeleteNoteView(APIView):
+    authentication_classes = [PermanentTokenAuthentication]
+    # Роль проверяется до поиска заметки: не-учитель получает 403 и на несуществующую
+    permission_classes = [IsAuthenticated, IsTeacher]
+
     def delete(self, request, pk):
         try:
             note_uuid = uuid.UUID(str(pk))
-            note = Note.objects.get(id=note_uuid)
-        except (ValueError, Note.DoesNotExist):
+        except ValueError:
             return Response({"error": "Note not found or invalid ID"}, status=status.HTTP_404_NOT_FOUND)
 
         user = request.user
-        if note.author != user:
-            return Response({"error": "Forbidden"}, status=status.HTTP_403_FORBIDDEN)
-
-        if not user.groups.filter(name='teachers').exists():
-            return Response({"error": "You do not have permission to delete this note"},
-                            status=status.HTTP_403_FORBIDDEN)
-
-        # Жёсткое удаление (hard delete) - физически удаляет из БД
-        note.delete()
+        # Одна строка читается один раз: и для проверки прав, и для сводки (текст не читаем)
+        with transaction.atomic():
+            row = lock_notes([note_uuid]).get(note_uuid)
+            if row is None:
+                return Response({"error": "Note not found or invalid ID"}, status=status.HTTP_404_NOT_FOUND)
+            if row[1] != user.pk:
+                return Response({"error": "Forbidden"}, status=status.HTTP_403_FORBIDDEN)
+
+            # Жёсткое удаление (hard delete) - физически удаляет из БД,
+            # клиенты узнают об удалении по надгробию в ленте /notes/updates
+            delete_notes([row])
+        mark_written(user.pk)
 
         return Response({
             "success": True,
-            "id": str(note.id),
+            "id": str(note_uuid),
         })
 
 
@@ -197,7 +510,17 @@ class DeleteNoteView(APIView):
 @permission_classes([IsAuthenticated])
 def get_user_group(request):
     user = request.user
-    group_names = [g.name for g in user.groups.all()]
+    group_names = get_roles(user)
     return Response({
         "group": group_names[0] if group_names else None
-    })
\ No newline at end of file
+    })
+
+
+# ====== Метрики (только для администраторов) =======
+class MetricsView(APIView):
+    authentication_classes = [PermanentTokenAuthentication]
+    permission_classes = [IsAdminUser]
+    renderer_classes = [PrometheusRenderer]
+
+    def get(self, request):
+        return Response(metrics_registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
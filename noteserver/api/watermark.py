@@ -0,0 +1,86 @@
+# journal/watermark.py
+# Глобальный «водяной знак» ленты: время (мс) последнего изменения заметок, хранится в кэше.
+# По нему /notes/updates отвечает 304 на условные GET, не обращаясь к таблице Note.
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .routers import replica_enabled, use_primary
+
+KEY = 'notes:watermark'
+
+
+def _now_ms():
+    # Своё время вместо sync.now_ms: sync импортирует этот модуль
+    return int(time.time() * 1000)
+
+
+def _cache():
+    return caches[settings.NOTES_WATERMARK_CACHE]
+
+
+def touch(using=None):
+    # Метку ставим после коммита: до него клиент всё равно не увидит изменений
+    transaction.on_commit(lambda: _cache().set(KEY, _now_ms(), None), using=using)
+
+
+def current():
+    value = _cache().get(KEY)
+    if value is None:
+        # Кэш очищен или вытеснен — считаем, что всё изменилось только что
+        _cache().add(KEY, _now_ms(), None)
+        value = _cache().get(KEY)
+    return value
+
+
+async def acurrent():
+    # То же для async-вьюх: кэш — через aget/aadd, цикл событий не ждёт сети
+    cache = _cache()
+    value = await cache.aget(KEY)
+    if value is None:
+        await cache.aadd(KEY, _now_ms(), None)
+        value = await cache.aget(KEY)
+    return value
+
+
+def pin_if_recent(mark):
+    """
+    ETag строится по водяному знаку, который сдвигается при коммите в default, а строки
+    читаются с реплики. Пока реплика может отставать (DATABASE_REPLICA_STICKY_SECONDS после
+    изменения), ленту читаем с default — иначе клиент получит новый ETag на старые строки
+    и дальше будет получать 304, так и не увидев изменения.
+    """
+    if replica_enabled() and _now_ms() - mark < settings.DATABASE_REPLICA_STICKY_SECONDS * 1000:
+        use_primary()
+
+
+def feed_etag(user_id, full_path, mark):
+    # Ответ зависит от пользователя (подписка) и всех параметров запроса
+    digest = hashlib.md5(f'{user_id}:{full_path}'.encode(), usedforsecurity=False).hexdigest()[:16]
+    return f'"{mark:x}-{digest}"'
+
+
+def not_modified(request, etag, mark):
+    """
+    HttpResponseNotModified, если у клиента актуальная версия, иначе None.
+    If-Modified-Since сравниваем с точностью до секунды: 304 только если последнее изменение
+    случилось в более ранней секунде, чем Last-Modified прошлого ответа.
+    """
+    response = get_conditional_response(request, etag=etag, last_modified=mark // 1000 + 1)
+    if response is not None:
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def set_validators(response, etag, server_time):
+    # Last-Modified — момент ответа: всё, что изменилось до него, клиент уже получил
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(server_time // 1000)
+    response['Cache-Control'] = 'private, no-cache'
+    return response
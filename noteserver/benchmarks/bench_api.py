@@ -0,0 +1,243 @@
+# benchmarks/bench_api.py
+# Нагрузочный бенчмарк горячих эндпоинтов API: notes/sync, notes/updates,
+# custom-login и DELETE notes/<uuid>/. Для каждого эндпоинта — перцентили задержки,
+# пропускная способность и число SQL-запросов на запрос; результаты пишутся в JSON.
+#
+#   python -m benchmarks.bench_api --users 10 --notes 5000 --json bench_api.json
+#   python -m benchmarks.bench_api --backends sqlite postgres
+#
+# PostgreSQL берётся из BENCH_POSTGRES_URL (по умолчанию локальный postgres);
+# если он недоступен, прогон для него пропускается.
+import argparse
+import itertools
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.harness import QueryCounter, make_user, setup_django, test_database
+
+DEFAULT_POSTGRES_URL = 'postgres://postgres@localhost:5432/noteserver_bench'
+PASSWORD = 'bench-password'
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(q / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(samples, elapsed):
+    latencies = sorted(sample['ms'] for sample in samples)
+    queries = [sample['queries'] for sample in samples]
+    return {
+        "requests": len(samples),
+        "errors": sum(1 for sample in samples if sample['status'] >= 400),
+        "throughput_rps": round(len(samples) / elapsed, 1) if elapsed else None,
+        "latency_ms": {
+            "p50": percentile(latencies, 50),
+            "p90": percentile(latencies, 90),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "max": latencies[-1] if latencies else None,
+        },
+        "queries_per_request": round(sum(queries) / len(queries), 2) if queries else None,
+    }
+
+
+# ====== Данные =======
+def seed(users, notes, delete_pool):
+    from api.models import Note
+    from api.sync import now_ms
+
+    accounts = [make_user(f'bench-user-{i}', groups=['teachers']) for i in range(users)]
+    now = now_ms()
+    rows = [
+        Note(
+            id=uuid.uuid4(),
+            author=accounts[i % users][0],
+            author_name=accounts[i % users][0].username,
+            subject=f"Subject {i % 25}",
+            text="Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 8,
+            created_at=now - i,
+            updated_at=now - i,
+            uploaded_at=now - i,
+        )
+        for i in range(notes)
+    ]
+    Note.objects.bulk_create(rows, batch_size=1000)
+
+    # Отдельный пул заметок под DELETE: каждая удаляется ровно один раз
+    owner = accounts[0][0]
+    pool = [
+        Note(id=uuid.uuid4(), author=owner, author_name=owner.username, subject="to delete",
+             text="x", created_at=now, updated_at=now, uploaded_at=now)
+        for _ in range(delete_pool)
+    ]
+    Note.objects.bulk_create(pool, batch_size=1000)
+    return accounts, [note.id for note in pool], now
+
+
+def make_scenarios(accounts, delete_ids, since, sync_batch):
+    delete_iter = iter(delete_ids)
+    delete_lock = threading.Lock()
+
+    def sync(client, i):
+        user, token = accounts[i % len(accounts)]
+        notes = [{"subject": f"Bench {i}", "text": "payload " * 20} for _ in range(sync_batch)]
+        return client.post('/api/notes/sync', {"notes": notes}, content_type='application/json',
+                           HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def updates(client, i):
+        _, token = accounts[i % len(accounts)]
+        return client.get('/api/notes/updates', {"since": since, "limit": 500},
+                          HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def login(client, i):
+        user, _ = accounts[i % len(accounts)]
+        return client.post('/api/custom-login', {"username": user.username, "password": PASSWORD},
+                           content_type='application/json')
+
+    def delete(client, i):
+        _, token = accounts[0]
+        with delete_lock:
+            note_id = next(delete_iter)
+        return client.delete(f'/api/notes/{note_id}/', HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    return {"notes/sync": sync, "notes/updates": updates, "custom-login": login, "notes/<uuid>/ DELETE": delete}
+
+
+# ====== Прогон =======
+def run_requests(scenario, requests, concurrency):
+    from django.db import connection
+    from django.test import Client
+
+    counter = itertools.count()
+    local = threading.local()
+
+    def one(_):
+        # У каждого потока — свой клиент и своё соединение с БД
+        if not hasattr(local, 'client'):
+            local.client = Client()
+            local.queries = QueryCounter()
+            connection.execute_wrappers.append(local.queries)
+        i = next(counter)
+        before = local.queries.count
+        started = time.perf_counter()
+        response = scenario(local.client, i)
+        if getattr(response, 'streaming', False):
+            b''.join(response.streaming_content)
+        return {
+            "ms": round((time.perf_counter() - started) * 1000, 2),
+            "queries": local.queries.count - before,
+            "status": response.status_code,
+        }
+
+    def close(_):
+        connection.close()
+
+    started = time.perf_counter()
+    if concurrency == 1:
+        samples = [one(i) for i in range(requests)]
+        connection.execute_wrappers.remove(local.queries)
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            samples = list(pool.map(one, range(requests)))
+            pool.map(close, range(concurrency))
+    return samples, time.perf_counter() - started
+
+
+def run(args):
+    from django.db import connection
+
+    results = {"vendor": connection.vendor, "users": args.users, "notes": args.notes, "endpoints": {}}
+    delete_pool = args.requests * 2 + args.login_requests
+    accounts, delete_ids, now = seed(args.users, args.notes, delete_pool)
+    scenarios = make_scenarios(accounts, delete_ids, since=now - args.notes // 2, sync_batch=args.sync_batch)
+
+    for name, scenario in scenarios.items():
+        requests = args.login_requests if name == 'custom-login' else args.requests
+        endpoint = {}
+        for mode, concurrency in (("sequential", 1), ("concurrent", args.concurrency)):
+            samples, elapsed = run_requests(scenario, requests, concurrency)
+            endpoint[mode] = summarize(samples, elapsed)
+        results["endpoints"][name] = endpoint
+    return results
+
+
+def run_backend(backend, args):
+    # Каждая БД — в отдельном процессе: DATABASES читается один раз при импорте настроек
+    env = dict(os.environ)
+    if backend == 'postgres':
+        env['DATABASE_URL'] = os.environ.get('BENCH_POSTGRES_URL', DEFAULT_POSTGRES_URL)
+    else:
+        env.pop('DATABASE_URL', None)
+
+    with tempfile.NamedTemporaryFile(suffix='.json') as out:
+        command = [
+            sys.executable, '-m', 'benchmarks.bench_api', '--single',
+            '--users', str(args.users), '--notes', str(args.notes),
+            '--requests', str(args.requests), '--login-requests', str(args.login_requests),
+            '--concurrency', str(args.concurrency), '--sync-batch', str(args.sync_batch),
+            '--json', out.name,
+        ]
+        proc = subprocess.run(command, env=env, capture_output=True, text=True)
+        if proc.returncode != 0:
+            return {"skipped": True, "reason": proc.stderr.strip().splitlines()[-1:] or ['failed']}
+        with open(out.name) as f:
+            return json.load(f)
+
+
+def print_report(backend, result):
+    if result.get("skipped"):
+        print(f"[{backend}] skipped: {result['reason'][0]}")
+        return
+    print(f"[{backend}] users={result['users']} notes={result['notes']}")
+    print(f"  {'endpoint':<22} {'mode':<11} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'q/req':>6} {'err':>4}")
+    for name, endpoint in result["endpoints"].items():
+        for mode, stats in endpoint.items():
+            latency = stats["latency_ms"]
+            print(
+                f"  {name:<22} {mode:<11} {stats['throughput_rps']:>8} {latency['p50']:>8} "
+                f"{latency['p95']:>8} {latency['p99']:>8} {stats['queries_per_request']:>6} {stats['errors']:>4}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Notes API load benchmark")
+    parser.add_argument('--backends', nargs='+', default=['sqlite', 'postgres'], choices=['sqlite', 'postgres'])
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--notes', type=int, default=5000)
+    parser.add_argument('--requests', type=int, default=200, help='Запросов на эндпоинт и режим')
+    parser.add_argument('--login-requests', type=int, default=20, help='custom-login дорогой: хеширование пароля')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--sync-batch', type=int, default=50, help='Заметок в одном notes/sync')
+    parser.add_argument('--json', help='Записать результаты в JSON-файл')
+    parser.add_argument('--single', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        setup_django()
+        with test_database():
+            results = run(args)
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump(results, f, indent=2)
+        return
+
+    results = {backend: run_backend(backend, args) for backend in args.backends}
+    for backend, result in results.items():
+        print_report(backend, result)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+# benchmarks/bench_asgi.py
+# notes/updates и notes/sync при большом числе медленных клиентов: WSGI (DRF-вьюхи, пул из
+# --threads потоков, как gunicorn gthread) против ASGI (async-вьюхи api/async_views.py, один
+# event loop, как uvicorn). Сервер моделируется в процессе: клиент передаёт запрос и читает ответ
+# с задержкой --client-delay (половина до вьюхи, половина после). Под WSGI всё это время занят
+# поток, под ASGI — только корутина. Каждый режим — отдельный процесс (NOTES_ASYNC_VIEWS).
+#
+#   python -m benchmarks.bench_asgi --clients 200 --requests 2000 --client-delay 0.1
+#
+# Под ASGI каждое middleware на MiddlewareMixin — переход в поток на запрос; запускайте с
+# DJANGO_SETTINGS_MODULE=noteserver.settings_api (короткая цепочка), как и боевые ASGI-воркеры.
+import argparse
+import asyncio
+import io
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from benchmarks.bench_api import percentile
+from benchmarks.harness import make_user, setup_django, test_database
+
+MODES = ('wsgi', 'asgi')
+SYNC_BATCH = 5
+
+
+# ====== Данные и запросы =======
+def seed(notes):
+    from api.sync import bulk_upsert_notes, now_ms
+
+    user, token = make_user('bench-asgi', groups=['teachers'])
+    raw = [{"id": str(uuid.uuid4()), "subject": f"Subject {i % 10}", "text": f"note {i}"} for i in range(notes)]
+    for start in range(0, len(raw), 500):
+        bulk_upsert_notes(user, raw[start:start + 500], now_ms())
+    return token
+
+
+def build_requests(count, sync_share):
+    # Каждый sync_share-й запрос — запись пачки новых заметок, остальные — страница ленты
+    every = round(1 / sync_share) if sync_share else 0
+    requests = []
+    for i in range(count):
+        if every and i % every == 0:
+            notes = [{"id": str(uuid.uuid4()), "subject": "Bench", "text": f"sync {i}"} for _ in range(SYNC_BATCH)]
+            requests.append(('POST', '/api/notes/sync?response=ack', json.dumps({"notes": notes}).encode()))
+        else:
+            requests.append(('GET', '/api/notes/updates?since=0&limit=50', b''))
+    return requests
+
+
+# ====== WSGI =======
+def run_wsgi(requests, token, args):
+    from django.core.wsgi import get_wsgi_application
+
+    application = get_wsgi_application()
+    workers = threading.BoundedSemaphore(args.threads)
+    half_delay = args.client_delay / 2
+
+    def call(spec):
+        method, url, body = spec
+        parts = urlsplit(url)
+        started = time.perf_counter()
+        with workers:
+            # Поток сервера ждёт, пока медленный клиент передаст запрос
+            time.sleep(half_delay)
+            environ = {
+                'REQUEST_METHOD': method,
+                'PATH_INFO': parts.path,
+                'QUERY_STRING': parts.query,
+                'SERVER_NAME': 'testserver',
+                'SERVER_PORT': '80',
+                'HTTP_HOST': 'testserver',
+                'REMOTE_ADDR': '127.0.0.1',
+                'HTTP_AUTHORIZATION': f'Bearer {token}',
+                'CONTENT_TYPE': 'application/json',
+                'CONTENT_LENGTH': str(len(body)),
+                'wsgi.input': io.BytesIO(body),
+                'wsgi.url_scheme': 'http',
+                'wsgi.errors': sys.stderr,
+                'wsgi.multithread': True,
+                'wsgi.multiprocess': False,
+                'wsgi.run_once': False,
+                'wsgi.version': (1, 0),
+            }
+            status = []
+            result = application(environ, lambda line, headers, exc_info=None: status.append(int(line[:3])))
+            try:
+                for index, _ in enumerate(result):
+                    if index == 0:
+                        # ...и пока он читает ответ
+                        time.sleep(half_delay)
+            finally:
+                if hasattr(result, 'close'):
+                    result.close()
+        return {'status': status[0], 'ms': round((time.perf_counter() - started) * 1000, 3)}
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients) as pool:
+        samples = list(pool.map(call, requests))
+    return samples, time.perf_counter() - started
+
+
+# ====== ASGI =======
+def run_asgi(requests, token, args):
+    from django.core.asgi import get_asgi_application
+
+    application = get_asgi_application()
+    half_delay = args.client_delay / 2
+
+    async def call(spec, clients):
+        method, url, body = spec
+        parts = urlsplit(url)
+        async with clients:
+            started = time.perf_counter()
+            scope = {
+                'type': 'http',
+                'asgi': {'version': '3.0'},
+                'http_version': '1.1',
+                'method': method,
+                'scheme': 'http',
+                'path': parts.path,
+                'raw_path': parts.path.encode(),
+                'query_string': parts.query.encode(),
+                'root_path': '',
+                'headers': [
+                    (b'host', b'testserver'),
+                    (b'authorization', f'Bearer {token}'.encode()),
+                    (b'content-type', b'application/json'),
+                    (b'content-length', str(len(body)).encode()),
+                ],
+                'client': ('127.0.0.1', 50000),
+                'server': ('testserver', 80),
+            }
+            received = False
+            state = {'status': None, 'body_sent': False}
+
+            async def receive():
+                nonlocal received
+                if not received:
+                    received = True
+                    await asyncio.sleep(half_delay)
+                    return {'type': 'http.request', 'body': body, 'more_body': False}
+                # Клиент не отключается: Django отменит ожидание после ответа
+                await asyncio.Future()
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    state['status'] = message['status']
+                elif message['type'] == 'http.response.body' and not state['body_sent']:
+                    state['body_sent'] = True
+                    await asyncio.sleep(half_delay)
+
+            await application(scope, receive, send)
+            return {'status': state['status'], 'ms': round((time.perf_counter() - started) * 1000, 3)}
+
+    async def main():
+        clients = asyncio.Semaphore(args.clients)
+        return await asyncio.gather(*(call(spec, clients) for spec in requests))
+
+    started = time.perf_counter()
+    samples = asyncio.run(main())
+    return samples, time.perf_counter() - started
+
+
+def summarize(samples, elapsed):
+    latencies = sorted(sample['ms'] for sample in samples)
+    return {
+        "requests": len(samples),
+        "errors": sum(1 for sample in samples if sample['status'] >= 400),
+        "throughput_rps": round(len(samples) / elapsed, 1) if elapsed else None,
+        "p50_ms": percentile(latencies, 50),
+        "p99_ms": percentile(latencies, 99),
+        "max_ms": latencies[-1] if latencies else None,
+    }
+
+
+def measure(mode, args):
+    setup_django()
+    with test_database():
+        token = seed(args.notes)
+        requests = build_requests(args.requests, args.sync_share)
+        # Прогрев: кэш токена, ролей и подписки, импорт urlconf
+        run = run_wsgi if mode == 'wsgi' else run_asgi
+        run(requests[:5], token, argparse.Namespace(**{**vars(args), 'client_delay': 0}))
+        samples, elapsed = run(requests, token, args)
+    return summarize(samples, elapsed)
+
+
+def run_mode(mode, args):
+    env = dict(os.environ, NOTES_ASYNC_VIEWS='1' if mode == 'asgi' else '0')
+    command = [sys.executable, '-m', 'benchmarks.bench_asgi', '--single', mode,
+               '--clients', str(args.clients), '--requests', str(args.requests),
+               '--threads', str(args.threads), '--client-delay', str(args.client_delay),
+               '--notes', str(args.notes), '--sync-share', str(args.sync_share)]
+    proc = subprocess.run(command, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        return {"skipped": True, "reason": proc.stderr.strip().splitlines()[-1:] or ['failed']}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Slow-client throughput: sync WSGI vs async ASGI views")
+    parser.add_argument('--modes', nargs='+', default=list(MODES), choices=MODES)
+    parser.add_argument('--clients', type=int, default=200, help='Одновременных клиентов')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=8, help='Потоков WSGI-воркера')
+    parser.add_argument('--client-delay', type=float, default=0.1, help='Секунд на передачу запроса и ответа')
+    parser.add_argument('--notes', type=int, default=1000)
+    parser.add_argument('--sync-share', type=float, default=0.2, help='Доля запросов notes/sync')
+    parser.add_argument('--json', help='Записать результаты в JSON-файл')
+    parser.add_argument('--single', choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        print(json.dumps(measure(args.single, args)))
+        return
+
+    results = {mode: run_mode(mode, args) for mode in args.modes}
+    print(f"{'mode':<6} {'rps':>8} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9} {'errors':>7}")
+    for mode, result in results.items():
+        if result.get("skipped"):
+            print(f"{mode:<6} skipped: {result['reason'][0]}")
+            continue
+        print(f"{mode:<6} {result['throughput_rps']:>8} {result['p50_ms']:>9} {result['p99_ms']:>9} "
+              f"{result['max_ms']:>9} {result['errors']:>7}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+# benchmarks/bench_serializers.py
+# Микробенчмарк чтения ленты: NoteSerializer(many=True) + JSONRenderer
+# против NoteRowMapper (values_list + JOIN) + FastJSONRenderer.
+#
+#   python -m benchmarks.bench_serializers --sizes 1000 10000 100000
+import argparse
+import json
+import time
+import uuid
+
+from benchmarks.harness import count_queries, make_user, setup_django, test_database
+
+
+def seed(size, authors):
+    from api.models import Note
+
+    notes = [
+        Note(
+            id=uuid.uuid4(),
+            author=authors[i % len(authors)],
+            author_name=authors[i % len(authors)].username,
+            subject=f"Subject {i % 20}",
+            text="Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 10,
+            created_at=i,
+            updated_at=i,
+            uploaded_at=i,
+        )
+        for i in range(size)
+    ]
+    Note.objects.bulk_create(notes, batch_size=1000)
+
+
+def old_path():
+    from rest_framework.renderers import JSONRenderer
+    from api.models import Note
+    from api.serializers import NoteSerializer
+
+    notes = Note.objects.filter(updated_at__gt=-1).order_by('updated_at')
+    return JSONRenderer().render(NoteSerializer(notes, many=True).data)
+
+
+def new_path():
+    from api.models import Note
+    from api.renderers import FastJSONRenderer
+    from api.serializers import NoteRowMapper
+
+    mapper = NoteRowMapper()
+    rows = mapper.rows(Note.objects.filter(updated_at__gt=-1).order_by('updated_at', 'id'))
+    return FastJSONRenderer().render([mapper.to_dict(row) for row in rows])
+
+
+def measure(func):
+    with count_queries() as counter:
+        started = time.perf_counter()
+        body = func()
+        elapsed = time.perf_counter() - started
+    return body, {"ms": round(elapsed * 1000, 2), "queries": counter.count, "bytes": len(body)}
+
+
+def run(sizes):
+    from api.models import Note
+
+    authors = [make_user(f'bench-author-{i}')[0] for i in range(5)]
+    results = []
+    for size in sizes:
+        seed(size, authors)
+        old_body, old = measure(old_path)
+        new_body, new = measure(new_path)
+        # Форма JSON должна совпадать один в один (порядок при равных updated_at не важен)
+        key = lambda note: note['id']
+        assert sorted(json.loads(old_body), key=key) == sorted(json.loads(new_body), key=key)
+        results.append({"size": size, "old": old, "new": new})
+        Note.objects.all().delete()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Note serializer microbenchmark")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--json', help='Записать результаты в JSON-файл')
+    args = parser.parse_args()
+
+    setup_django()
+    with test_database():
+        results = run(args.sizes)
+
+    print(f"{'size':>7} | {'NoteSerializer':>26} | {'NoteRowMapper':>26} | speedup")
+    for row in results:
+        old, new = row['old'], row['new']
+        print(
+            f"{row['size']:>7} | {old['ms']:>11} ms {old['queries']:>7} q | "
+            f"{new['ms']:>11} ms {new['queries']:>7} q | {old['ms'] / max(new['ms'], 0.01):.1f}x"
+        )
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
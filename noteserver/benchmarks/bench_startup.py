@@ -0,0 +1,102 @@
+# benchmarks/bench_startup.py
+# Холодный старт воркера для двух профилей: полного (noteserver.settings) и API-only
+# (noteserver.settings_api). Каждый прогон — свежий процесс: время django.setup() с импортом
+# urlconf и WSGI-приложения, число загруженных модулей, первый запрос и «тёплые» запросы.
+#
+#   python -m benchmarks.bench_startup --runs 5 --json bench_startup.json
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.harness import make_user, setup_django, test_database
+
+PROFILES = {
+    'full': 'noteserver.settings',
+    'api': 'noteserver.settings_api',
+}
+
+
+def measure(warm_requests):
+    started = time.perf_counter()
+    setup_django()
+    from django.conf import settings
+    from django.core.wsgi import get_wsgi_application
+    from django.urls import get_resolver
+    get_wsgi_application()
+    get_resolver().url_patterns
+    startup = time.perf_counter() - started
+    modules = len(sys.modules)
+    settings.NOTES_THROTTLE_ENABLED = False
+
+    with test_database():
+        _, token = make_user('bench-startup', groups=['teachers'])
+        from django.test import Client
+        client = Client(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+        started = time.perf_counter()
+        status = client.get('/api/notes/updates?since=0&limit=10').status_code
+        first = time.perf_counter() - started
+
+        timings = []
+        for _ in range(warm_requests):
+            started = time.perf_counter()
+            client.get('/api/notes/updates?since=0&limit=10')
+            timings.append(time.perf_counter() - started)
+
+    return {
+        "startup_ms": round(startup * 1000, 1),
+        "modules": modules,
+        "first_request_ms": round(first * 1000, 2),
+        "warm_request_ms": round(statistics.median(timings) * 1000, 3),
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "status": status,
+    }
+
+
+def run_profile(settings_module, args):
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings_module)
+    runs = []
+    for _ in range(args.runs):
+        command = [sys.executable, '-m', 'benchmarks.bench_startup', '--single',
+                   '--warm-requests', str(args.warm_requests)]
+        proc = subprocess.run(command, env=env, capture_output=True, text=True)
+        if proc.returncode != 0:
+            return {"skipped": True, "reason": proc.stderr.strip().splitlines()[-1:] or ['failed']}
+        runs.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+    # Медиана по прогонам: холодный старт сильно шумит
+    return {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker startup benchmark: full vs API-only profile")
+    parser.add_argument('--profiles', nargs='+', default=list(PROFILES), choices=list(PROFILES))
+    parser.add_argument('--runs', type=int, default=5, help='Процессов на профиль')
+    parser.add_argument('--warm-requests', type=int, default=200)
+    parser.add_argument('--json', help='Записать результаты в JSON-файл')
+    parser.add_argument('--single', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        print(json.dumps(measure(args.warm_requests)))
+        return
+
+    results = {name: run_profile(PROFILES[name], args) for name in args.profiles}
+    print(f"{'profile':<8} {'startup ms':>11} {'modules':>8} {'first req ms':>13} {'warm req ms':>12} {'rss MB':>7}")
+    for name, result in results.items():
+        if result.get("skipped"):
+            print(f"{name:<8} skipped: {result['reason'][0]}")
+            continue
+        print(f"{name:<8} {result['startup_ms']:>11} {result['modules']:>8} {result['first_request_ms']:>13} "
+              f"{result['warm_request_ms']:>12} {result['max_rss_mb']:>7}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
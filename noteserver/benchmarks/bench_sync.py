@@ -0,0 +1,109 @@
+# benchmarks/bench_sync.py
+# Сравнение старого пути синхронизации (update_or_create на каждую заметку)
+# с пакетным bulk_upsert_notes: время и число SQL-запросов на размер пачки.
+#
+#   python -m benchmarks.bench_sync --sizes 10 100 1000
+import argparse
+import json
+import time
+import uuid
+
+from benchmarks.harness import count_queries, make_user, setup_django, test_database
+
+
+def make_payload(size, now):
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "subject": f"Subject {i % 10}",
+            "text": "Lorem ipsum dolor sit amet " * 20,
+            "created_at": now,
+            "updated_at": now + i,
+            "uploaded_at": now,
+        }
+        for i in range(size)
+    ]
+
+
+def legacy_sync(user, notes, now):
+    from api.models import Note
+    from api.serializers import NoteSerializer
+
+    saved = []
+    for n in notes:
+        note, _ = Note.objects.update_or_create(
+            id=uuid.UUID(n["id"]),
+            defaults={
+                "author": user,
+                "author_name": n.get("author", user.username),
+                "subject": n.get("subject", ""),
+                "text": n.get("text", ""),
+                "created_at": n.get("created_at", now),
+                "updated_at": n.get("updated_at", now),
+                "uploaded_at": n.get("uploaded_at", now),
+            }
+        )
+        saved.append(NoteSerializer(note).data)
+    return saved
+
+
+def bulk_sync(user, notes, now):
+    from api.serializers import NoteSerializer
+    from api.sync import bulk_upsert_notes
+
+    saved, _, _ = bulk_upsert_notes(user, notes, now)
+    return NoteSerializer(saved, many=True).data
+
+
+def measure(func, user, notes, now):
+    with count_queries() as counter:
+        started = time.perf_counter()
+        func(user, notes, now)
+        elapsed = time.perf_counter() - started
+    return {"ms": round(elapsed * 1000, 2), "queries": counter.count}
+
+
+def run(sizes):
+    from api.models import Note
+    from api.sync import now_ms
+
+    user, _ = make_user('bench-teacher', groups=['teachers'])
+    results = []
+    for size in sizes:
+        now = now_ms()
+        row = {"size": size}
+        for name, func in (("legacy", legacy_sync), ("bulk", bulk_sync)):
+            notes = make_payload(size, now)
+            row[f"{name}_insert"] = measure(func, user, notes, now)
+            # Повторная отправка тех же заметок — путь обновления
+            row[f"{name}_update"] = measure(func, user, notes, now)
+            Note.objects.all().delete()
+        results.append(row)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync path benchmark")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 500, 1000])
+    parser.add_argument('--json', help='Записать результаты в JSON-файл')
+    args = parser.parse_args()
+
+    setup_django()
+    with test_database():
+        results = run(args.sizes)
+
+    print(f"{'size':>6} | {'legacy insert':>20} | {'legacy update':>20} | {'bulk insert':>20} | {'bulk update':>20}")
+    for row in results:
+        cells = [
+            f"{row[key]['ms']:>9} ms {row[key]['queries']:>5} q"
+            for key in ("legacy_insert", "legacy_update", "bulk_insert", "bulk_update")
+        ]
+        print(f"{row['size']:>6} | " + " | ".join(cells))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+# benchmarks/harness.py
+# Общая обвязка для бенчмарков: поднимает Django и временную тестовую БД.
+# Запуск из каталога noteserver: python -m benchmarks.<имя_бенчмарка>
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def setup_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'noteserver.settings')
+    # Без DATABASE_URL бенчмарк идёт на SQLite; для PostgreSQL задайте DATABASE_URL
+    os.environ.setdefault('DATABASE_URL', f'sqlite:///{BASE_DIR / "db.sqlite3"}')
+
+    import django
+    django.setup()
+
+    # Бенчмарки намеренно шлют запросы быстрее любых лимитов
+    from django.conf import settings
+    settings.NOTES_THROTTLE_ENABLED = False
+
+    from django.test.utils import setup_test_environment
+    setup_test_environment()
+
+
+@contextmanager
+def test_database():
+    from django.db import connection, connections
+
+    if connection.vendor == 'sqlite':
+        # Файловая БД вместо in-memory, чтобы её видели потоки конкурентного клиента
+        tmp_dir = tempfile.mkdtemp(prefix='noteserver-bench-')
+        connection.settings_dict.setdefault('TEST', {})['NAME'] = os.path.join(tmp_dir, 'bench.sqlite3')
+        # WAL + IMMEDIATE-транзакции: конкурентные записи ждут блокировку, а не падают с "database is locked"
+        connection.settings_dict['OPTIONS'].update({
+            'timeout': 30,
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': 'PRAGMA journal_mode=WAL;',
+        })
+
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    # Реплика (DATABASE_REPLICA_URL) в тестах смотрит в ту же тестовую БД
+    for alias in connections:
+        if connections[alias].settings_dict.get('TEST', {}).get('MIRROR') == connection.alias:
+            connections[alias].creation.set_as_test_mirror(connection.settings_dict)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def make_user(username, groups=()):
+    from django.contrib.auth.models import Group, User
+    from api.models import PermanentToken
+
+    user = User.objects.create_user(username=username, password='bench-password')
+    for name in groups:
+        group, _ = Group.objects.get_or_create(name=name)
+        user.groups.add(group)
+    token = PermanentToken.objects.create(user=user)
+    return user, token.token
+
+
+class QueryCounter:
+    # Счётчик SQL-запросов через execute_wrapper: в отличие от CaptureQueriesContext
+    # не ограничен размером queries_log (9000 запросов)
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def count_queries():
+    from django.db import connection
+
+    counter = QueryCounter()
+    with connection.execute_wrapper(counter):
+        yield counter
@@ -3,6 +3,9 @@ ASGI config for noteserver project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Long-poll (api/notes/poll) and SSE (api/notes/events) change feeds are meant
+to be served through this entry point, e.g. ``uvicorn noteserver.asgi:application``.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -12,5 +15,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'noteserver.settings')
+# notes/sync и notes/updates — async-версии (api/async_views.py); NOTES_ASYNC_VIEWS=0 вернёт DRF-вьюхи
+os.environ.setdefault('NOTES_ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
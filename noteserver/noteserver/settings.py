@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from corsheaders.defaults import default_headers
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -44,24 +47,54 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'rest_framework',
-    'rest_framework_simplejwt',
     'api',
     'corsheaders',
 ]
 
 REST_FRAMEWORK = {
+    # Все вьюхи работают с постоянным токеном (api/authentication.py)
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "api.authentication.PermanentTokenAuthentication",
+    ),
+    "DEFAULT_RENDERER_CLASSES": (
+        "api.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
     ),
+    # Token bucket в кэше (api/throttling.py): "<scope>" — на пользователя, "<scope>_ip" — на адрес;
+    # scope задаёт throttle_scope вьюхи. Объём ведра = число запросов, пополнение — за период
+    "DEFAULT_THROTTLE_CLASSES": (
+        "api.throttling.UserBucketThrottle",
+        "api.throttling.IPBucketThrottle",
+    ),
+    "DEFAULT_THROTTLE_RATES": {
+        "sync": "60/min",
+        "sync_ip": "300/min",
+        # Сколько заметок пользователь может отправить через sync
+        "sync_notes": "20000/hour",
+        "updates": "120/min",
+        "updates_ip": "600/min",
+        "login_ip": "10/min",
+        # Неудачные попытки входа под одним именем с одного адреса: чужие ошибки не запирают владельца
+        "login_user": "5/min",
+    },
+    # Сколько доверенных прокси стоит перед приложением. 0 — адрес клиента берём из REMOTE_ADDR,
+    # а X-Forwarded-For игнорируем: его присылает сам клиент, и по нему обходится "<scope>_ip".
+    # За балансировщиком задайте NUM_PROXIES=1 (и т. д.) — тогда берётся адрес, добавленный им
+    "NUM_PROXIES": int(os.environ.get('NUM_PROXIES', 0)),
 }
+# Выключатель ограничений (бенчмарки выключают его в benchmarks/harness.py).
+# Ведра живут в кэше default: при нескольких процессах он должен быть общим
+NOTES_THROTTLE_ENABLED = True
 
 
 MIDDLEWARE = [
+    'api.middleware.ProfilingMiddleware',
+    'api.middleware.PrimaryPinMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    'api.middleware.CompressionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
-    'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -69,6 +102,8 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 CORS_ALLOW_ALL_ORIGINS = True
+# Idempotency-Key для notes/sync — браузерным клиентам его нужно разрешить явно
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
 STATIC_ROOT = BASE_DIR / "staticfiles"
 STATIC_URL = "/static/"
 
@@ -102,7 +137,56 @@ DATABASES = {
   "default": dj_database_url.config(conn_max_age=600)
 }
 
+# Реплика для чтения (DATABASE_REPLICA_URL): ленту, роли и проверку токена читаем с неё,
+# запись и всё внутри transaction.atomic — в default (api/routers.py).
+# Локально можно подставить второй файл SQLite; в тестах реплика зеркалит default.
+if os.environ.get('DATABASE_REPLICA_URL'):
+    DATABASES['replica'] = dj_database_url.config(env='DATABASE_REPLICA_URL', conn_max_age=600)
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+
+DATABASE_ROUTERS = ['api.routers.PrimaryReplicaRouter']
 
+# Сколько секунд после записи (sync, удаление, сброс токена) читать данные пользователя
+# с default, пока реплика догоняет
+DATABASE_REPLICA_STICKY_SECONDS = 5
+
+# Пул соединений psycopg 3 (DATABASE_POOL=1, нужен psycopg[pool]); с пулом CONN_MAX_AGE должен быть 0
+DATABASE_POOL = {
+    'min_size': 2,
+    'max_size': 10,
+    'timeout': 10,
+}
+if os.environ.get('DATABASE_POOL') == '1':
+    for db in DATABASES.values():
+        if db['ENGINE'] == 'django.db.backends.postgresql':
+            db['CONN_MAX_AGE'] = 0
+            db.setdefault('OPTIONS', {})['pool'] = dict(DATABASE_POOL)
+
+
+
+# Хешер паролей для новых и обновляемых хешей: 'scrypt' (по умолчанию), 'argon2'
+# (нужен argon2-cffi) или 'pbkdf2'. Остальные хешеры только проверяют старые хеши —
+# при успешном входе пароль перехешируется выбранным
+PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'scrypt')
+_PASSWORD_HASHERS = {
+    'argon2': 'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'scrypt': 'django.contrib.auth.hashers.ScryptPasswordHasher',
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+}
+PASSWORD_HASHERS = [_PASSWORD_HASHERS[PASSWORD_HASHER]] + [
+    hasher for name, hasher in _PASSWORD_HASHERS.items() if name != PASSWORD_HASHER
+] + [
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+
+# Вход: пользователь грузится вместе с PermanentToken (api/backends.py)
+AUTHENTICATION_BACKENDS = ['api.backends.TokenModelBackend']
+
+# Проверка паролей (api/passwords.py): сколько хешей считать одновременно, сколько
+# входов может ждать или считаться сразу и сколько секунд ждать места, прежде чем ответить 503
+LOGIN_HASH_WORKERS = 4
+LOGIN_MAX_PENDING = 64
+LOGIN_QUEUE_TIMEOUT = 2
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -144,3 +228,116 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Notes sync
+# Размер батча для bulk_create/bulk_update в SyncNotesView
+NOTES_SYNC_BATCH_SIZE = 500
+# Сколько заметок обновлять одним условным UPDATE (CASE по id растёт квадратично)
+NOTES_SYNC_UPDATE_CHUNK = 100
+
+# Асинхронный sync (?mode=async, manage.py run_sync_workers): число процессов, пауза при
+# пустой очереди (сек), попыток на задачу и через сколько секунд running-задача считается брошенной
+SYNC_JOBS = {
+    'PROCESSES': 2,
+    'POLL_INTERVAL': 1.0,
+    'MAX_ATTEMPTS': 3,
+    'STALE_AFTER': 300,
+    # Пауза перед повтором упавшей задачи: RETRY_BACKOFF * 2^(попытка-1) секунд, не больше RETRY_BACKOFF_MAX
+    'RETRY_BACKOFF': 5,
+    'RETRY_BACKOFF_MAX': 300,
+    # Как часто (секунд) воркер возвращает в очередь задачи умерших воркеров
+    'REQUEUE_INTERVAL': 60,
+}
+
+# Idempotency-Key для notes/sync (api/idempotency.py): ответ хранится в кэше CACHE_ALIAS
+# TTL секунд, метка «запрос выполняется» — LOCK_TTL. При нескольких процессах кэш должен быть общим
+NOTES_IDEMPOTENCY = {
+    'CACHE_ALIAS': 'default',
+    'TTL': 24 * 60 * 60,
+    'LOCK_TTL': 120,
+    'MAX_KEY_LENGTH': 255,
+}
+
+# Сжатие Note.text в БД (api/fields.py): тексты от THRESHOLD символов жмутся zlib
+# или zstd (если установлен zstandard); читаются оба формата
+NOTES_TEXT_COMPRESSION = {
+    'ALGORITHM': 'zlib',
+    'THRESHOLD': 2048,
+    'LEVEL': 6,
+}
+# Сколько заметок можно удалить одним POST /notes/delete
+NOTES_DELETE_MAX_IDS = 1000
+
+# Порция чтения/записи для export_notes, import_notes и /notes/export
+NOTES_EXPORT_CHUNK_SIZE = 2000
+
+# Сколько заметок можно запросить за раз через /notes/bodies
+NOTES_BODIES_MAX_IDS = 500
+
+# Лента /notes/updates: размер страницы по умолчанию (при cursor без limit),
+# потолок для limit и размер порции чтения из БД при потоковой выдаче
+NOTES_FEED_PAGE_SIZE = 500
+NOTES_FEED_MAX_LIMIT = 5000
+NOTES_FEED_CHUNK_SIZE = 500
+# Сколько надгробий отдавать за один ответ ленты (дальше — по deleted_cursor)
+NOTES_FEED_DELETIONS_LIMIT = 1000
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# В проде default можно направить на Redis/Memcached — его используют все процессы
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Кэш token -> user для PermanentTokenAuthentication.
+# TTL/MAX_SIZE — локальный LRU процесса (после сброса токена в других процессах
+# старый токен живёт не дольше TTL), SHARED_ALIAS — общий уровень (None — выключен).
+TOKEN_CACHE = {
+    'TTL': 60,
+    'MAX_SIZE': 10000,
+    'SHARED_ALIAS': 'default',
+    'SHARED_TTL': 300,
+}
+
+# Кэш водяного знака ленты (ETag/304 на /notes/updates). При нескольких процессах
+# (gunicorn, run_sync_workers) должен быть общим — иначе процесс не увидит чужих записей
+NOTES_WATERMARK_CACHE = 'default'
+
+# Сколько секунд роли пользователя (группы) живут в общем кэше
+ROLE_CACHE_TTL = 300
+
+# Сжатие ответов (gzip/brotli) только для этих путей
+COMPRESSION_PATH_PREFIXES = ['/api/notes/']
+
+# Лента изменений (long-poll / SSE, см. api/events.py).
+# InProcessNotifier работает в пределах одного процесса ASGI-сервера.
+NOTES_NOTIFIER = {
+    'BACKEND': 'api.notifier.InProcessNotifier',
+}
+NOTES_LONGPOLL_TIMEOUT = 25
+NOTES_SSE_HEARTBEAT = 15
+NOTES_SSE_MAX_AGE = 300
+
+# notes/sync и notes/updates как async-вьюхи (api/async_views.py). noteserver/asgi.py включает
+# их по умолчанию; под WSGI async-вьюха шла бы через async_to_sync, поэтому там — DRF-вьюхи
+NOTES_ASYNC_VIEWS = os.environ.get('NOTES_ASYNC_VIEWS') == '1'
+
+# Сколько дней хранить надгробия удалённых заметок (manage.py prune_tombstones).
+# Клиенту с более старым since лента вернёт fullResyncRequired
+NOTE_TOMBSTONE_RETENTION_DAYS = 90
+
+# Метрики запросов (ProfilingMiddleware, /api/metrics) и профилирование одного
+# запроса через ?profile=1 (дамп отдаётся только is_staff)
+REQUEST_METRICS_ENABLED = True
+REQUEST_PROFILING_PARAM = 'profile'
+
+# Полнотекстовый поиск /notes/search: конфигурация to_tsvector на PostgreSQL
+# ('simple' — без стемминга, годится для смеси русского и английского) и размер страницы
+NOTES_SEARCH_CONFIG = 'simple'
+NOTES_SEARCH_PAGE_SIZE = 50
+
+# Сколько секунд подписка устройства (FeedSubscription) живёт в кэше
+FEED_SUBSCRIPTION_CACHE_TTL = 300
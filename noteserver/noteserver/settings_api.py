@@ -0,0 +1,40 @@
+"""
+API-only профиль для воркеров, которые обслуживают только /api/.
+
+    DJANGO_SETTINGS_MODULE=noteserver.settings_api gunicorn noteserver.wsgi
+    DJANGO_SETTINGS_MODULE=noteserver.settings_api uvicorn noteserver.asgi:application
+
+Админка, сессии, сообщения, CSRF, статика (whitenoise) и Browsable API не загружаются:
+процесс стартует быстрее, а запрос проходит короткую цепочку middleware, где каждое звено
+умеет async. /admin/ и /static/ обслуживают воркеры с полным noteserver.settings.
+"""
+
+from .settings import *  # noqa: F401,F403
+from .settings import REST_FRAMEWORK
+
+INSTALLED_APPS = [
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'rest_framework',
+    'api',
+    'corsheaders',
+]
+
+MIDDLEWARE = [
+    'api.middleware.ProfilingMiddleware',
+    'api.middleware.PrimaryPinMiddleware',
+    'corsheaders.middleware.CorsMiddleware',
+    'api.middleware.CompressionMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'django.middleware.common.CommonMiddleware',
+]
+
+ROOT_URLCONF = 'noteserver.urls_api'
+
+# Только JSON: BrowsableAPIRenderer тянет шаблоны и статику
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    "DEFAULT_RENDERER_CLASSES": (
+        "api.renderers.FastJSONRenderer",
+    ),
+}
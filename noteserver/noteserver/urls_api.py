@@ -0,0 +1,8 @@
+"""
+URL configuration for the API-only profile (noteserver.settings_api): без админки.
+"""
+from django.urls import include, path
+
+urlpatterns = [
+    path('api/', include('api.urls')),
+]